@@ -0,0 +1,36 @@
+"""Template tags for progressive (HTMX) loading of item cards in batches."""
+
+from django import template
+
+register = template.Library()
+
+# Number of item cards fetched by one HTMX request
+ITEM_CARD_BATCH_SIZE = 10
+
+
+@register.filter
+def batched(values, size=ITEM_CARD_BATCH_SIZE):
+    """
+    Split a list into consecutive chunks of at most `size` elements.
+
+    Usage: {% for batch in item_hashes|batched:10 %}
+    """
+    values = list(values or [])
+    size = max(int(size), 1)
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+@register.inclusion_tag('partials/_item_card_batch_placeholder.html')
+def item_card_placeholders(item_hashes, batch_url_name, batch_size=ITEM_CARD_BATCH_SIZE):
+    """
+    Render loading placeholders for item cards, grouped into batches.
+
+    Each batch is fetched with a single HTMX request to `batch_url_name`
+    when it scrolls into view, and replaced by the rendered cards.
+
+    Usage: {% item_card_placeholders item_hashes 'load_item_cards' %}
+    """
+    return {
+        'batches': batched(item_hashes, batch_size),
+        'batch_url_name': batch_url_name,
+    }
@@ -331,14 +331,12 @@ class MediaFileAdmin(BerylModelAdmin):
         """
         Admin action to verify if selected files exist in storage
         """
-        verified_count = 0
-        for media_file in queryset:
-            if media_file.verify_file_exists():
-                verified_count += 1
+        from web.media_verification import verify_media_files
+        result = verify_media_files(queryset)
         
         self.message_user(
             request,
-            f"Verified {verified_count} out of {queryset.count()} files."
+            f"Verified {result['found']} out of {result['checked'] + result['errors']} files."
         )
     verify_files_exist.short_description = "Verify selected files exist in storage"
     
@@ -0,0 +1,175 @@
+"""
+Attribute Value Autocomplete
+============================
+
+Suggests values a user has already entered for an attribute, most used
+first. Suggestions come from the ATTRIBUTE rows of the precomputed facet
+summary (web/facets.py), summed over the user's collections, so a lookup
+never joins or counts attribute values.
+
+Collections whose facet summary is not built yet (built on the first
+detail view, or by `manage.py rebuild_collection_facets`) are counted from
+their attribute values directly; a keystroke never builds facets.
+
+The distinct values of one (user, attribute) pair are kept in a small
+in-process LRU, so the keystrokes after the first one are answered from
+memory. Entries carry a per-user generation counter stored in the database
+(see web/cache_generations.py), so a change made in any process, including
+the import worker, invalidates the suggestions cached in every process;
+signals bump it whenever an attribute value of the user changes.
+
+Matching is case-insensitive: values starting with the query come first,
+then values with a word starting with it, then any other substring match.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from django.db.models import Count, Sum
+
+from web.cache_generations import bump_generations, get_generation
+
+logger = logging.getLogger("webapp")
+
+CACHE_PREFIX = "attr_autocomplete"
+
+# (user, attribute) pairs kept in memory per process
+LRU_SIZE = 256
+
+# Suggestions returned per query
+MAX_SUGGESTIONS = 10
+
+
+class SuggestionLRU:
+    """Thread-safe least-recently-used mapping of (user_id, attribute_id) to (generation, values)"""
+
+    def __init__(self, maxsize=LRU_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, generation, values):
+        with self._lock:
+            self._entries[key] = (generation, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_lru = SuggestionLRU()
+
+
+def _generation_scope(user_id) -> str:
+    return f"{CACHE_PREFIX}:user:{user_id}"
+
+
+def bump_user_generation(user_ids) -> None:
+    """Invalidate cached suggestions of the given users (in every process)"""
+    bump_generations(_generation_scope(user_id) for user_id in set(user_ids) if user_id is not None)
+
+
+def _get_generation(user_id) -> int:
+    return get_generation(_generation_scope(user_id))
+
+
+def load_attribute_values(user, attribute):
+    """
+    Distinct values of an attribute in the user's collections with usage counts.
+
+    Returns:
+        list: (lower-case value, value, count) tuples, most used first
+    """
+    from web.models import Collection, CollectionFacetCount, CollectionItemAttributeValue
+
+    totals = {}
+    rows = CollectionFacetCount.objects.filter(
+        collection__created_by=user,
+        collection__is_deleted=False,
+        facet=CollectionFacetCount.Facet.ATTRIBUTE,
+        item_attribute=attribute,
+        count__gt=0
+    ).values('value').annotate(total=Sum('count')).order_by()
+    for row in rows:
+        totals[row['value']] = totals.get(row['value'], 0) + row['total']
+
+    # Collections whose facet summary has not been built yet (never viewed): count their values directly
+    unbuilt = Collection.objects.filter(created_by=user).exclude(
+        facet_counts__facet=CollectionFacetCount.Facet.TOTAL
+    ).values('pk')
+    rows = CollectionItemAttributeValue.objects.filter(
+        item_attribute=attribute,
+        item__collection__in=unbuilt,
+        item__is_deleted=False
+    ).exclude(value='').values('value').annotate(total=Count('pk')).order_by()
+    for row in rows:
+        totals[row['value']] = totals.get(row['value'], 0) + row['total']
+
+    values = sorted(totals.items(), key=lambda value_total: (-value_total[1], value_total[0]))
+    return [(value.lower(), value, total) for value, total in values]
+
+
+def _match_rank(value_lower, query):
+    """0 for a prefix match, 1 for a word prefix match, 2 for another substring match, None otherwise"""
+    position = value_lower.find(query)
+    if position < 0:
+        return None
+    if position == 0:
+        return 0
+    if f" {query}" in value_lower:
+        return 1
+    return 2
+
+
+def suggest_attribute_values(user, attribute, query, limit=MAX_SUGGESTIONS):
+    """
+    Suggest existing values of an attribute for a (partial) query.
+
+    Args:
+        user: Owner whose values are suggested
+        attribute: ItemAttribute being edited
+        query: Text typed so far
+        limit: Maximum number of suggestions
+
+    Returns:
+        list: Suggested values (strings)
+    """
+    query = query.strip().lower()
+    if not query:
+        return []
+
+    key = (user.pk, attribute.pk)
+    generation = _get_generation(user.pk)
+    values = _lru.get(key, generation)
+    if values is None:
+        values = load_attribute_values(user, attribute)
+        _lru.set(key, generation, values)
+        logger.debug("autocomplete: loaded %d values of attribute %s for user %s", len(values), attribute.pk, user.pk)
+
+    # Values are already ordered by usage, so a stable sort by rank keeps that order within each rank
+    matches = []
+    prefix_matches = 0
+    for value_lower, value, _count in values:
+        rank = _match_rank(value_lower, query)
+        if rank is None:
+            continue
+        matches.append((rank, value))
+        if rank == 0:
+            prefix_matches += 1
+            if prefix_matches >= limit:
+                # Nothing can rank above the most used prefix matches
+                break
+    matches.sort(key=lambda match: match[0])
+    return [value for _rank, value in matches[:limit]]
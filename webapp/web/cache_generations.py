@@ -0,0 +1,66 @@
+"""
+Cache Generations
+=================
+
+Database-backed invalidation counters for cached data.
+
+Cached entries (item cards, autocomplete suggestions, the compiled link
+pattern matcher) embed the generation of their scope in their key or
+entry; bumping the generation makes them stale. The entries themselves can
+live in the per-process Django cache or in process memory, but the
+counters must be shared: writes happen in web processes, in the moderation
+and import workers and in management commands, and every process has to
+see them. So the counters are CacheGeneration rows, read with one query per
+lookup and bumped with an UPDATE.
+
+A scope without a row has generation 0.
+"""
+
+import logging
+
+from django.db import IntegrityError
+from django.db.models import F
+
+logger = logging.getLogger("webapp")
+
+
+def get_generations(scopes) -> dict:
+    """
+    Current generations of some scopes with one query.
+
+    Returns:
+        dict: scope -> generation (0 for scopes never bumped)
+    """
+    from web.models import CacheGeneration
+
+    scopes = set(scopes)
+    if not scopes:
+        return {}
+    generations = dict(CacheGeneration.objects.filter(scope__in=scopes).values_list('scope', 'generation'))
+    return {scope: generations.get(scope, 0) for scope in scopes}
+
+
+def get_generation(scope) -> int:
+    return get_generations([scope])[scope]
+
+
+def bump_generations(scopes) -> None:
+    """Invalidate everything cached under the given scopes, in every process"""
+    from web.models import CacheGeneration
+
+    scopes = {scope for scope in scopes if scope}
+    if not scopes:
+        return
+
+    bumped = CacheGeneration.objects.filter(scope__in=scopes).update(generation=F('generation') + 1)
+    if bumped < len(scopes):
+        existing = set(CacheGeneration.objects.filter(scope__in=scopes).values_list('scope', flat=True))
+        try:
+            CacheGeneration.objects.bulk_create(
+                [CacheGeneration(scope=scope, generation=1) for scope in scopes - existing],
+                ignore_conflicts=True
+            )
+        except IntegrityError:
+            # Created concurrently by another writer, which bumped it as well
+            pass
+    logger.debug("cache_generations: bumped %d scopes", len(scopes))
@@ -0,0 +1,142 @@
+"""
+Item Card Fragment Cache
+========================
+
+Caches rendered item cards (partials/_item_public_card.html and
+partials/_item_list_item.html) so unchanged items are not re-rendered on
+every page view.
+
+Entries are never deleted explicitly. Each key contains a version made of:
+- the item hash and its `updated` timestamp (bumped by item edits and by the
+  image/link/attribute receivers in signals.py),
+- a per-collection generation counter (bumped when the collection, or media
+  files and locations used by its items, change),
+- a global generation counter (bumped when item types, attributes or link
+  patterns change, since those affect how every card renders).
+
+Changing any of them makes old entries unreachable; they expire via
+ITEM_CARD_CACHE_TIMEOUT. All parts of the version are read from the
+database (the generation counters are CacheGeneration rows, see
+web/cache_generations.py), so a change made by a worker, a management
+command or another instance invalidates the cards cached in every process. Cards are rendered with a placeholder CSRF token
+that is replaced with the requester's token when served.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+from web.cache_generations import bump_generations, get_generations
+
+logger = logging.getLogger("webapp")
+
+CACHE_PREFIX = "item_card"
+GLOBAL_SCOPE = "global"
+
+# Substituted for {{ csrf_token }} while rendering, replaced per request when served
+CSRF_PLACEHOLDER = "__ITEM_CARD_CSRF_TOKEN__"
+
+
+def _scope(scope: str) -> str:
+    return f"{CACHE_PREFIX}:{scope}"
+
+
+def _collection_scope(collection_id) -> str:
+    return _scope(f"collection:{collection_id}")
+
+
+def bump_generation(scope: str = GLOBAL_SCOPE) -> None:
+    """Invalidate all cards in a scope (by default all cards)"""
+    bump_generations([_scope(scope)])
+    logger.debug("card_cache: bumped generation for scope '%s'", scope)
+
+
+def bump_collection_generation(collection_ids) -> None:
+    """Invalidate all cards of the given collections"""
+    bump_generations(_collection_scope(collection_id) for collection_id in set(collection_ids) if collection_id)
+
+
+def _get_generations(collection_ids):
+    """Fetch the global and per-collection generation counters with one query"""
+    generations = get_generations([_scope(GLOBAL_SCOPE)] + [_collection_scope(cid) for cid in collection_ids])
+    return generations[_scope(GLOBAL_SCOPE)], {
+        cid: generations[_collection_scope(cid)] for cid in collection_ids
+    }
+
+
+def _card_key(template_name, item, collection_generation, global_generation, variant) -> str:
+    template_slug = template_name.rsplit('/', 1)[-1].replace('.html', '')
+    return ":".join([
+        CACHE_PREFIX,
+        template_slug,
+        item.hash,
+        str(int(item.updated.timestamp() * 1000000)),
+        str(collection_generation),
+        str(global_generation),
+        variant,
+    ])
+
+
+def _request_variant(request) -> str:
+    """Parts of the request that change the rendered card"""
+    language = translation.get_language() or settings.LANGUAGE_CODE
+    audience = "auth" if request.user.is_authenticated else "anon"
+    return f"{language}:{audience}"
+
+
+def render_item_cards(request, items, template_name):
+    """
+    Render item cards, using cached fragments where the item is unchanged.
+
+    Args:
+        request: Current request (CSRF token, user, language)
+        items: Iterable of CollectionItem objects (with relations prefetched)
+        template_name: Card template, rendered with {'item': item}
+
+    Returns:
+        list of (item, html) tuples in the order of `items`
+    """
+    items = list(items)
+    if not getattr(settings, 'ITEM_CARD_CACHE_ENABLED', True):
+        return [(item, render_to_string(template_name, {'item': item}, request=request)) for item in items]
+
+    global_generation, collection_generations = _get_generations({item.collection_id for item in items})
+    variant = _request_variant(request)
+
+    keys = {
+        item.hash: _card_key(template_name, item, collection_generations[item.collection_id], global_generation, variant)
+        for item in items
+    }
+    cached = cache.get_many(list(keys.values()))
+
+    rendered = []
+    missing = {}
+    for item in items:
+        html = cached.get(keys[item.hash])
+        if html is None:
+            html = render_to_string(
+                template_name,
+                {'item': item, 'csrf_token': CSRF_PLACEHOLDER},
+                request=request
+            )
+            missing[keys[item.hash]] = html
+        rendered.append((item, html))
+
+    if missing:
+        cache.set_many(missing, getattr(settings, 'ITEM_CARD_CACHE_TIMEOUT', 60 * 60 * 24))
+
+    logger.debug("card_cache: %d of %d cards served from cache (%s)",
+                 len(items) - len(missing), len(items), template_name)
+
+    csrf_token = get_token(request)
+    return [(item, mark_safe(html.replace(CSRF_PLACEHOLDER, csrf_token))) for item, html in rendered]
+
+
+def render_item_card(request, item, template_name) -> str:
+    """Render a single item card (see render_item_cards)"""
+    return render_item_cards(request, [item], template_name)[0][1]
@@ -0,0 +1,314 @@
+"""
+Data Export
+===========
+
+Streams collections out in the import format, so an export can be imported
+again (see import_schema.py):
+
+- `json`: one document matching IMPORT_SCHEMA,
+- `jsonl`: the JSON Lines record format (header, item types, then each
+  collection followed by its items),
+- `csv`: one row per item, one column per attribute.
+
+Everything is generated from one stream of records. Items are read with
+`.iterator(chunk_size=EXPORT_BATCH_SIZE)`, which runs the prefetches of
+attribute values, links and images once per batch, and each record is
+serialized as soon as it is read. Memory stays constant however many items
+an account has, and a StreamingHttpResponse starts sending right away.
+"""
+
+import csv
+import json
+import logging
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+logger = logging.getLogger("webapp")
+
+EXPORT_FORMATS = ('json', 'jsonl', 'csv')
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'jsonl': 'application/jsonl',
+    'csv': 'text/csv',
+}
+
+# Items per query (and per prefetch round trip)
+EXPORT_BATCH_SIZE = 500
+
+# The import schema allows at most this many images per collection or item
+MAX_IMAGES = 3
+
+CSV_COLUMNS = [
+    'collection', 'name', 'your_id', 'item_type', 'status', 'is_favorite', 'description', 'image_url', 'images', 'links',
+]
+
+
+def _absolute(url, url_builder):
+    if url and url_builder and url.startswith('/'):
+        return url_builder(url)
+    return url
+
+
+def _image_records(images, url_builder):
+    """Import records of CollectionImage/CollectionItemImage rows (files that exist)"""
+    records = []
+    for image in images:
+        if not image.media_file.file_exists:
+            continue
+        url = _absolute(image.media_file.file_url, url_builder)
+        if url:
+            records.append({'url': url, 'is_default': image.is_default, 'order': image.order})
+    return records[:MAX_IMAGES]
+
+
+def item_type_record(item_type) -> Dict:
+    attributes = []
+    for attribute in sorted(item_type.attributes.all(), key=lambda attribute: (attribute.order, attribute.pk)):
+        attribute_record = {
+            'name': attribute.name,
+            'display_name': attribute.display_name,
+            'attribute_type': attribute.attribute_type,
+            'required': attribute.required,
+            'order': attribute.order,
+        }
+        if attribute.choices:
+            # Imported choices may still be stored as the JSON string of the import file
+            choices = attribute.choices
+            attribute_record['choices'] = choices if isinstance(choices, str) else json.dumps(choices)
+        attributes.append(attribute_record)
+
+    record = {
+        'type': 'item_type',
+        'name': item_type.name,
+        'display_name': item_type.display_name,
+        'attributes': attributes,
+    }
+    if item_type.description:
+        record['description'] = item_type.description
+    if item_type.icon:
+        record['icon'] = item_type.icon
+    return record
+
+
+def collection_record(collection, url_builder=None) -> Dict:
+    record = {
+        'type': 'collection',
+        'name': collection.name,
+        'description': collection.description or '',
+        'visibility': collection.visibility,
+    }
+    if collection.image_url:
+        record['image_url'] = collection.image_url
+    images = _image_records(collection.images.all(), url_builder)
+    if images:
+        record['images'] = images
+    return record
+
+
+def item_record(item, url_builder=None) -> Dict:
+    record = {
+        'type': 'item',
+        'name': item.name,
+        'status': item.status,
+        'is_favorite': item.is_favorite,
+    }
+    if item.your_id:
+        record['your_id'] = item.your_id
+    if item.description:
+        record['description'] = item.description
+    if item.item_type_id:
+        record['item_type'] = item.item_type.name
+    attributes = {value.item_attribute.name: value.value for value in item.attribute_values.all()}
+    if attributes:
+        record['attributes'] = attributes
+    if item.image_url:
+        record['image_url'] = item.image_url
+    images = _image_records(item.images.all(), url_builder)
+    if images:
+        record['images'] = images
+    links = [
+        {'url': link.url, 'display_name': link.display_name or '', 'order': link.order}
+        for link in item.links.all()
+    ]
+    if links:
+        record['links'] = links
+    if item.status == item.Status.RESERVED and (item.reserved_by_name or item.reserved_by_email):
+        reservation = {}
+        if item.reserved_by_name:
+            reservation['reserved_by_name'] = item.reserved_by_name
+        if item.reserved_by_email:
+            reservation['reserved_by_email'] = item.reserved_by_email
+        if item.reserved_date:
+            reservation['reserved_date'] = item.reserved_date.isoformat()
+        record['reservation'] = reservation
+    return record
+
+
+def export_items(collection):
+    """Items of a collection with everything an item record needs, prefetched per batch"""
+    from web.models import CollectionItemAttributeValue, CollectionItemImage, CollectionItemLink
+
+    return collection.items.select_related('item_type').prefetch_related(
+        Prefetch('attribute_values', queryset=CollectionItemAttributeValue.objects.select_related('item_attribute').order_by('pk')),
+        Prefetch('links', queryset=CollectionItemLink.objects.order_by('order', 'pk')),
+        Prefetch('images', queryset=CollectionItemImage.objects.select_related('media_file').order_by('order', 'pk')),
+    ).order_by('pk')
+
+
+def iter_export_records(collections, user=None, url_builder: Optional[Callable[[str], str]] = None) -> Iterator[Dict]:
+    """
+    Records of an export in JSON Lines order.
+
+    Args:
+        collections: Collection queryset to export
+        user: Owner of the collections (for the header metadata)
+        url_builder: Optional callable turning relative media URLs into absolute ones
+            (e.g. request.build_absolute_uri)
+
+    Yields:
+        Record dicts (header, item types, then each collection followed by its items)
+    """
+    from web.models import CollectionImage, ItemType
+
+    item_types = ItemType.objects.filter(
+        items__collection__in=collections, items__is_deleted=False
+    ).distinct().prefetch_related('attributes').order_by('name')
+    collections = collections.prefetch_related(
+        Prefetch('images', queryset=CollectionImage.objects.select_related('media_file').order_by('order', 'pk'))
+    ).order_by('pk')
+
+    metadata = {
+        'title': 'Beryl export',
+        'source': 'beryl3_export',
+        'created_at': timezone.now().isoformat(),
+    }
+    if user is not None:
+        metadata['created_by'] = user.email
+    # Re-importing an export updates what is already there instead of duplicating it
+    yield {'type': 'header', 'version': '1.0', 'metadata': metadata, 'options': {'mode': 'upsert'}}
+
+    for item_type in item_types:
+        yield item_type_record(item_type)
+
+    for collection in collections.iterator(chunk_size=EXPORT_BATCH_SIZE):
+        yield collection_record(collection, url_builder)
+        for item in export_items(collection).iterator(chunk_size=EXPORT_BATCH_SIZE):
+            yield item_record(item, url_builder)
+
+
+def render_jsonl(records: Iterable[Dict]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _without_type(record):
+    return {key: value for key, value in record.items() if key != 'type'}
+
+
+def render_json(records: Iterable[Dict]) -> Iterator[str]:
+    """Write the records as one IMPORT_SCHEMA document, piece by piece"""
+    section = None  # 'item_types', 'collections' or 'items' (of the open collection)
+    first_in_section = True
+
+    for record in records:
+        record_type = record['type']
+        if record_type == 'header':
+            yield '{"version": %s, "metadata": %s, "options": %s' % (
+                json.dumps(record['version']),
+                json.dumps(record.get('metadata', {}), ensure_ascii=False),
+                json.dumps(record.get('options', {})),
+            )
+            continue
+
+        if record_type == 'item_type':
+            if section is None:
+                yield ', "item_types": ['
+                section, first_in_section = 'item_types', True
+            yield ('' if first_in_section else ', ') + json.dumps(_without_type(record), ensure_ascii=False)
+            first_in_section = False
+
+        elif record_type == 'collection':
+            if section == 'items':
+                # Close the items and the object of the previous collection
+                yield ']}, '
+            else:
+                yield (']' if section == 'item_types' else '') + ', "collections": ['
+            # The collection object stays open until its items are written
+            yield json.dumps(_without_type(record), ensure_ascii=False)[:-1] + ', "items": ['
+            section, first_in_section = 'items', True
+
+        elif record_type == 'item':
+            yield ('' if first_in_section else ', ') + json.dumps(_without_type(record), ensure_ascii=False)
+            first_in_section = False
+
+    if section == 'items':
+        yield ']}]}'
+    elif section == 'item_types':
+        yield '], "collections": []}'
+    else:
+        yield ', "collections": []}'
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer in a generator"""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(records: Iterable[Dict]) -> Iterator[str]:
+    """One row per item; the attribute columns are known from the item type records before the first item"""
+    writer = csv.writer(_Echo())
+    attribute_names = []
+    collection_name = ''
+    header_written = False
+
+    for record in records:
+        record_type = record['type']
+        if record_type == 'item_type':
+            for attribute in record.get('attributes', []):
+                if attribute['name'] not in attribute_names:
+                    attribute_names.append(attribute['name'])
+            continue
+        if record_type == 'collection':
+            collection_name = record['name']
+            continue
+        if record_type != 'item':
+            continue
+
+        if not header_written:
+            yield writer.writerow(CSV_COLUMNS + attribute_names)
+            header_written = True
+        attributes = record.get('attributes', {})
+        yield writer.writerow([
+            collection_name,
+            record['name'],
+            record.get('your_id', ''),
+            record.get('item_type', ''),
+            record['status'],
+            'yes' if record['is_favorite'] else 'no',
+            record.get('description', ''),
+            record.get('image_url', ''),
+            ' '.join(image['url'] for image in record.get('images', [])),
+            ' '.join(link['url'] for link in record.get('links', [])),
+        ] + [attributes.get(name, '') for name in attribute_names])
+
+    if not header_written:
+        yield writer.writerow(CSV_COLUMNS + attribute_names)
+
+
+RENDERERS = {
+    'json': render_json,
+    'jsonl': render_jsonl,
+    'csv': render_csv,
+}
+
+
+def stream_export(collections, export_format: str, user=None, url_builder=None) -> Iterator[str]:
+    """Serialized export of collections in `export_format`, as an iterator of text chunks"""
+    if export_format not in RENDERERS:
+        raise ValueError(f"Unknown export format {export_format!r}, expected one of: {', '.join(EXPORT_FORMATS)}")
+    return RENDERERS[export_format](iter_export_records(collections, user=user, url_builder=url_builder))
@@ -0,0 +1,333 @@
+"""
+Collection Facet Summary
+========================
+
+The collection page needs, for the whole collection, the statuses and item
+types in use, the attributes and attribute values in use and the most
+common attribute values. Computing these takes six aggregate queries over
+all items and attribute values on every page view.
+
+CollectionFacetCount stores these counts per collection. Signals apply
++1/-1 deltas when an item or attribute value is created, changed,
+soft-deleted or deleted (apply_deltas), and get_facet_summary() reads the
+whole summary with a single query. Collections without a summary (created
+before migration 0041, or after writes that bypass signals) are rebuilt on
+first read; `manage.py rebuild_collection_facets` rebuilds them explicitly.
+
+Facet filters: repeated `facet=<attribute id>:<value>` query parameters
+select items having ALL of the given attribute values.
+"""
+
+import logging
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.http import QueryDict
+
+logger = logging.getLogger("webapp")
+
+FACET_PARAM = "facet"
+
+# Number of attribute values shown as quick filters
+TOP_ATTRIBUTE_VALUES = 20
+
+
+def item_facet_keys(status, item_type_id):
+    """Facet keys (facet, item_type_id, item_attribute_id, value) a live item counts towards"""
+    from web.models import CollectionFacetCount
+
+    Facet = CollectionFacetCount.Facet
+    return [
+        (Facet.TOTAL, None, None, ""),
+        (Facet.STATUS, None, None, status),
+        (Facet.ITEM_TYPE, item_type_id, None, ""),
+    ]
+
+
+def attribute_facet_key(item_attribute_id, value):
+    """Facet key of one attribute value of a live item"""
+    from web.models import CollectionFacetCount
+
+    return (CollectionFacetCount.Facet.ATTRIBUTE, None, item_attribute_id, value)
+
+
+def apply_deltas(collection_id, deltas):
+    """
+    Apply count changes to the facet summary of a collection.
+
+    Does nothing if the summary has not been built yet (it is built from
+    scratch on first read). The TOTAL row is locked so concurrent writers
+    to the same collection apply their deltas one after another.
+
+    Args:
+        collection_id: ID of the collection
+        deltas: Counter mapping facet keys (see item_facet_keys) to +n/-n
+    """
+    from web.models import CollectionFacetCount
+
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not collection_id or not deltas:
+        return
+
+    with transaction.atomic():
+        rows = CollectionFacetCount.objects.filter(collection_id=collection_id)
+        if not rows.filter(facet=CollectionFacetCount.Facet.TOTAL).select_for_update().exists():
+            return
+
+        for (facet, item_type_id, item_attribute_id, value), delta in deltas.items():
+            key_rows = rows.filter(facet=facet, item_type_id=item_type_id, item_attribute_id=item_attribute_id, value=value)
+            row = key_rows.values('pk', 'count').first()
+            if row is None:
+                if delta > 0:
+                    CollectionFacetCount.objects.create(
+                        collection_id=collection_id,
+                        facet=facet,
+                        item_type_id=item_type_id,
+                        item_attribute_id=item_attribute_id,
+                        value=value,
+                        count=delta
+                    )
+                continue
+
+            if row['count'] + delta <= 0 and facet != CollectionFacetCount.Facet.TOTAL:
+                CollectionFacetCount.objects.filter(pk=row['pk']).delete()
+            else:
+                CollectionFacetCount.objects.filter(pk=row['pk']).update(count=F('count') + delta)
+
+    logger.debug("facets: applied %d deltas to collection %s", len(deltas), collection_id)
+
+
+def rebuild_collection_facets(collection_id):
+    """
+    Recompute the facet summary of a collection from its items.
+
+    Returns:
+        int: Number of facet rows written
+    """
+    from web.models import CollectionFacetCount, CollectionItem, CollectionItemAttributeValue
+
+    Facet = CollectionFacetCount.Facet
+    items = CollectionItem.objects.filter(collection_id=collection_id)
+
+    counts = Counter()
+    for row in items.values('status', 'item_type_id').annotate(count=Count('id')).order_by():
+        for key in item_facet_keys(row['status'], row['item_type_id']):
+            counts[key] += row['count']
+
+    attribute_values = CollectionItemAttributeValue.objects.filter(
+        item__collection_id=collection_id,
+        item__is_deleted=False
+    ).values('item_attribute_id', 'value').annotate(count=Count('id')).order_by()
+    for row in attribute_values:
+        counts[attribute_facet_key(row['item_attribute_id'], row['value'])] += row['count']
+
+    # An empty collection still gets its TOTAL row so it is marked as built
+    counts.setdefault((Facet.TOTAL, None, None, ""), 0)
+
+    rows = [
+        CollectionFacetCount(
+            collection_id=collection_id,
+            facet=facet,
+            item_type_id=item_type_id,
+            item_attribute_id=item_attribute_id,
+            value=value,
+            count=count
+        )
+        for (facet, item_type_id, item_attribute_id, value), count in counts.items()
+    ]
+
+    with transaction.atomic():
+        CollectionFacetCount.objects.filter(collection_id=collection_id).delete()
+        CollectionFacetCount.objects.bulk_create(rows, batch_size=500)
+
+    logger.info("facets: rebuilt %d facet rows for collection %s", len(rows), collection_id)
+    return len(rows)
+
+
+class FacetSummary:
+    """Facet counts of one collection, as read by get_facet_summary()"""
+
+    def __init__(self, rows):
+        from web.models import CollectionFacetCount
+
+        Facet = CollectionFacetCount.Facet
+        self.total_items = 0
+        self.statuses = {}
+        self.items_without_type = 0
+        item_types = {}
+        attributes = {}
+        attribute_values = {}
+
+        for row in rows:
+            if row.count <= 0 and row.facet != Facet.TOTAL:
+                continue
+            if row.facet == Facet.TOTAL:
+                self.total_items += row.count
+            elif row.facet == Facet.STATUS:
+                self.statuses[row.value] = self.statuses.get(row.value, 0) + row.count
+            elif row.facet == Facet.ITEM_TYPE:
+                if row.item_type is None:
+                    self.items_without_type += row.count
+                else:
+                    item_types.setdefault(row.item_type_id, row.item_type)
+                    item_types[row.item_type_id].facet_count = getattr(item_types[row.item_type_id], 'facet_count', 0) + row.count
+            elif row.facet == Facet.ATTRIBUTE:
+                attributes.setdefault(row.item_attribute_id, row.item_attribute)
+                values = attribute_values.setdefault(row.item_attribute_id, {})
+                values[row.value] = values.get(row.value, 0) + row.count
+
+        self.item_types = sorted(
+            (item_type for item_type in item_types.values() if not item_type.is_deleted),
+            key=lambda item_type: item_type.display_name
+        )
+        self._attributes = attributes
+        self._attribute_values = attribute_values
+
+    @property
+    def available_statuses(self):
+        return list(self.statuses)
+
+    @property
+    def has_items_without_type(self):
+        return self.items_without_type > 0
+
+    @property
+    def attributes(self):
+        """Attributes (not soft-deleted) with at least one value, by display name"""
+        return sorted(
+            (attribute for attribute in self._attributes.values() if not attribute.is_deleted),
+            key=lambda attribute: attribute.display_name
+        )
+
+    def attribute_values(self, attribute_id):
+        """Sorted distinct values of an attribute (empty list for unknown ids)"""
+        try:
+            attribute_id = int(attribute_id)
+        except (TypeError, ValueError):
+            return []
+        return sorted(self._attribute_values.get(attribute_id, {}))
+
+    def status_count(self, status):
+        return self.statuses.get(status, 0)
+
+    def item_type_distribution(self):
+        """Item type counts in the format of values('item_type__display_name', 'item_type__icon').annotate(count=...)"""
+        distribution = [
+            {'item_type__display_name': item_type.display_name, 'item_type__icon': item_type.icon, 'count': item_type.facet_count}
+            for item_type in self.item_types
+        ]
+        if self.items_without_type:
+            distribution.append({'item_type__display_name': None, 'item_type__icon': None, 'count': self.items_without_type})
+        return sorted(distribution, key=lambda entry: -entry['count'])
+
+    def top_attribute_values(self, limit=TOP_ATTRIBUTE_VALUES):
+        """Most common attribute values, in the format of get_attribute_statistics()"""
+        stats = [
+            (count, self._attributes[attribute_id], value)
+            for attribute_id, values in self._attribute_values.items()
+            for value, count in values.items()
+        ]
+        stats.sort(key=lambda stat: (-stat[0], stat[1].display_name, stat[2]))
+        return [format_attribute_stat(attribute.display_name, attribute.id, value, count) for count, attribute, value in stats[:limit]]
+
+
+def format_attribute_stat(attribute_name, attribute_id, value, count):
+    """Quick filter entry for one attribute value (long values are truncated for display)"""
+    display_value = value
+    if len(display_value) > 30:
+        display_value = display_value[:27] + '...'
+    return {
+        'attribute_name': attribute_name,
+        'attribute_id': attribute_id,
+        'value': value,
+        'display_value': display_value,
+        'count': count
+    }
+
+
+def get_facet_summary(collection):
+    """
+    Read the facet summary of a collection (one query), building it first
+    if it does not exist yet.
+
+    Returns:
+        FacetSummary
+    """
+    from web.models import CollectionFacetCount
+
+    def read():
+        return list(CollectionFacetCount.objects.filter(collection=collection).select_related('item_type', 'item_attribute'))
+
+    rows = read()
+    if not any(row.facet == CollectionFacetCount.Facet.TOTAL for row in rows):
+        rebuild_collection_facets(collection.pk)
+        rows = read()
+    return FacetSummary(rows)
+
+
+def parse_facet_params(params):
+    """
+    Read `facet=<attribute id>:<value>` parameters.
+
+    Returns:
+        list: (attribute id as string, value) tuples, invalid entries skipped
+    """
+    facets = []
+    for raw in params.getlist(FACET_PARAM):
+        attribute_id, separator, value = raw.partition(':')
+        if separator and attribute_id.isdigit() and value and (attribute_id, value) not in facets:
+            facets.append((attribute_id, value))
+    return facets
+
+
+def apply_facet_filters(items_queryset, facets):
+    """
+    Keep items having every (attribute id, value) facet.
+
+    Each facet is a separate id__in subquery, so the conditions AND together
+    without joins or DISTINCT.
+    """
+    from web.models import CollectionItemAttributeValue
+
+    for attribute_id, value in facets:
+        items_queryset = items_queryset.filter(
+            id__in=CollectionItemAttributeValue.objects.filter(
+                item_attribute_id=attribute_id,
+                value=value
+            ).values('item_id')
+        )
+    return items_queryset
+
+
+def add_facet_links(attribute_stats, params):
+    """
+    Mark which quick filters are active and add the query string that
+    toggles each one (keeping the other filters).
+
+    Args:
+        attribute_stats: List of dicts from format_attribute_stat()
+        params: Request QueryDict
+
+    Returns:
+        list: The same dicts with `active` and `query` keys
+    """
+    active_facets = parse_facet_params(params)
+    for stat in attribute_stats:
+        facet = (str(stat['attribute_id']), stat['value'])
+        stat['active'] = facet in active_facets
+        toggled = [f for f in active_facets if f != facet] if stat['active'] else active_facets + [facet]
+        stat['query'] = facet_query(params, toggled)
+    return attribute_stats
+
+
+def facet_query(params, facets):
+    """Query string of `params` with its facet parameters replaced (pagination is reset)"""
+    from web.pagination import PAGINATION_PARAMS
+
+    query = QueryDict(mutable=True)
+    for key, values in params.lists():
+        if key != FACET_PARAM and key not in PAGINATION_PARAMS:
+            query.setlist(key, values)
+    query.setlist(FACET_PARAM, [f"{attribute_id}:{value}" for attribute_id, value in facets])
+    return query.urlencode()
@@ -9,11 +9,13 @@ from django import forms
 from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
+from django.db import transaction
 import requests
 import os
 from PIL import Image
-from io import BytesIO
 
+from .image_ingest import ImageIngestError, ingest_image_url, max_download_bytes
+from .media_dedup import compute_content_hash, find_existing_file
 from .models import Collection, CollectionItem, MediaFile, ItemType
 
 class CollectionForm(forms.ModelForm):
@@ -181,6 +183,12 @@ class ImageUploadForm(forms.Form):
                 content_type = response.headers.get('content-type', '').lower()
                 if not content_type.startswith('image/'):
                     raise ValidationError('URL does not point to an image file.')
+
+                # Reject oversized images before downloading them (the download itself is capped too)
+                max_size = max_download_bytes()
+                content_length = response.headers.get('content-length', '')
+                if content_length.isdigit() and int(content_length) > max_size:
+                    raise ValidationError(f'Image is too large. Maximum size is {max_size / (1024*1024):.0f}MB. This image is {int(content_length) / (1024*1024):.1f}MB.')
                     
             except requests.RequestException:
                 raise ValidationError('Cannot access the provided URL. Please check the URL and try again.')
@@ -192,7 +200,6 @@ class ImageUploadForm(forms.Form):
         Create a MediaFile instance from the form data
         """
         from django.core.files.storage import default_storage
-        from django.core.files.base import ContentFile
         import uuid
         
         cleaned_data = self.cleaned_data
@@ -215,8 +222,7 @@ class ImageUploadForm(forms.Form):
             else:
                 file_path = f"uploads/{unique_filename}"
             
-            # Save file to storage
-            saved_path = default_storage.save(file_path, image_file)
+            content_hash = compute_content_hash(image_file)
             
             # Get image dimensions
             try:
@@ -224,75 +230,61 @@ class ImageUploadForm(forms.Form):
                 width, height = image.size
             except Exception:
                 width, height = None, None
+            image_file.seek(0)
             
-            # Create MediaFile record
-            media_file = MediaFile.objects.create(
-                name=f"Uploaded: {original_filename}",
-                file_path=saved_path,
-                original_filename=original_filename,
-                file_size=image_file.size,
-                content_type=image_file.content_type,
-                media_type=media_type,
-                width=width,
-                height=height,
-                created_by=user
-            )
-            
-        elif upload_method == 'url':
-            # Handle URL download
-            image_url = cleaned_data['image_url']
-            
-            try:
-                # Download the image
-                response = requests.get(image_url, timeout=30, stream=True)
-                response.raise_for_status()
-                
-                # Get original filename from URL
-                original_filename = os.path.basename(image_url.split('?')[0])
-                if not original_filename or '.' not in original_filename:
-                    # Generate filename from content type
-                    content_type = response.headers.get('content-type', 'image/jpeg')
-                    extension = content_type.split('/')[-1]
-                    original_filename = f"downloaded_image.{extension}"
-                
-                # Generate unique filename
-                file_extension = os.path.splitext(original_filename)[1].lower()
-                unique_filename = f"{uuid.uuid4()}{file_extension}"
-                
-                # Determine storage path based on media type
-                if media_type == MediaFile.MediaType.COLLECTION_HEADER:
-                    file_path = f"collections/{unique_filename}"
-                elif media_type == MediaFile.MediaType.COLLECTION_ITEM:
-                    file_path = f"items/{unique_filename}"
+            # Save file to storage, unless identical content is already stored; that
+            # file stays locked until the MediaFile record is created (see web/media_dedup.py)
+            with transaction.atomic():
+                existing = find_existing_file(content_hash, lock=True)
+                if existing:
+                    saved_path = existing.file_path
                 else:
-                    file_path = f"downloads/{unique_filename}"
-                
-                # Read image content and save to storage
-                image_content = response.content
-                saved_path = default_storage.save(file_path, ContentFile(image_content))
-                
-                # Get image dimensions
-                try:
-                    image = Image.open(BytesIO(image_content))
-                    width, height = image.size
-                except Exception:
-                    width, height = None, None
+                    saved_path = default_storage.save(file_path, image_file)
                 
                 # Create MediaFile record
                 media_file = MediaFile.objects.create(
-                    name=f"Downloaded: {original_filename}",
+                    name=f"Uploaded: {original_filename}",
                     file_path=saved_path,
                     original_filename=original_filename,
-                    file_size=len(image_content),
-                    content_type=response.headers.get('content-type', 'image/jpeg'),
+                    file_size=image_file.size,
+                    content_type=image_file.content_type,
+                    content_hash=content_hash,
                     media_type=media_type,
                     width=width,
                     height=height,
-                    created_by=user,
-                    metadata={'source_url': image_url}
+                    created_by=user
                 )
-                
-            except requests.RequestException as e:
-                raise ValidationError(f'Failed to download image: {str(e)}')
+            
+        elif upload_method == 'url':
+            # Handle URL download: streamed to storage in chunks with a size cap
+            image_url = cleaned_data['image_url']
+            
+            # Determine storage directory based on media type
+            if media_type == MediaFile.MediaType.COLLECTION_HEADER:
+                directory = "collections"
+            elif media_type == MediaFile.MediaType.COLLECTION_ITEM:
+                directory = "items"
+            else:
+                directory = "downloads"
+            
+            try:
+                ingested = ingest_image_url(image_url, directory)
+            except ImageIngestError as e:
+                raise ValidationError(str(e))
+            
+            # Create MediaFile record
+            media_file = MediaFile.objects.create(
+                name=f"Downloaded: {ingested.original_filename}",
+                file_path=ingested.file_path,
+                original_filename=ingested.original_filename,
+                file_size=ingested.size,
+                content_type=ingested.content_type,
+                media_type=media_type,
+                width=ingested.width,
+                height=ingested.height,
+                created_by=user,
+                content_hash=ingested.sha256,
+                metadata={'source_url': image_url}
+            )
         
         return media_file
\ No newline at end of file
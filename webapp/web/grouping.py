@@ -0,0 +1,248 @@
+"""
+Collection Grouping Engine
+==========================
+
+Computes item groups for collections with group_by enabled (item type, status
+or attribute) using GROUP BY queries, and pages items within a single group.
+
+Group headers (key, label, item count) are cheap to compute and rendered on the
+first request; items of each group are loaded on demand, one page at a time.
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Count, Min
+
+from .models import Collection, CollectionItem, CollectionItemAttributeValue, ItemAttribute, ItemType
+
+logger = logging.getLogger("webapp")
+
+# Key used for items that do not belong to any group (no item type / no attribute value)
+OTHER_GROUP_KEY = "__other__"
+
+
+class CollectionGrouping:
+    """
+    Groups a (possibly filtered) CollectionItem queryset according to the
+    collection's group_by setting.
+    """
+
+    def __init__(self, collection: Collection, items):
+        """
+        Args:
+            collection: Collection whose group_by/grouping_attribute is used
+            items: Base CollectionItem queryset (filters already applied)
+        """
+        self.collection = collection
+        self.items = items
+        self.group_by = collection.group_by
+        self.attribute = collection.grouping_attribute if self.group_by == Collection.GroupBy.ATTRIBUTE else None
+
+    @property
+    def is_active(self) -> bool:
+        """True when the collection groups its items"""
+        if self.group_by == Collection.GroupBy.ATTRIBUTE:
+            return self.attribute is not None
+        return self.group_by in (Collection.GroupBy.ITEM_TYPE, Collection.GroupBy.STATUS)
+
+    def get_groups(self) -> List[Dict[str, Any]]:
+        """
+        Compute group headers with one aggregate query.
+
+        Returns:
+            list of dicts with keys: key, attribute_name, attribute_value, count
+        """
+        if not self.is_active:
+            return []
+
+        if self.group_by == Collection.GroupBy.ITEM_TYPE:
+            groups = self._item_type_groups()
+        elif self.group_by == Collection.GroupBy.STATUS:
+            groups = self._status_groups()
+        else:
+            groups = self._attribute_groups()
+
+        logger.debug("CollectionGrouping: %d groups for collection %s (group_by=%s)",
+                     len(groups), self.collection.hash, self.group_by)
+        return groups
+
+    def get_group_items(self, key: str):
+        """
+        Get the ordered items queryset for one group.
+
+        Args:
+            key: Group key as returned by get_groups()
+
+        Returns:
+            QuerySet of CollectionItem objects ordered by the collection sort
+        """
+        if not self.is_active:
+            return self.items.none()
+
+        if self.group_by == Collection.GroupBy.ITEM_TYPE:
+            if key == OTHER_GROUP_KEY:
+                group_items = self.items.filter(item_type__isnull=True)
+            elif key.isdigit():
+                group_items = self.items.filter(item_type_id=int(key))
+            else:
+                return self.items.none()
+
+        elif self.group_by == Collection.GroupBy.STATUS:
+            if key not in CollectionItem.Status.values:
+                return self.items.none()
+            group_items = self.items.filter(status=key)
+
+        else:
+            grouped_values = self._attribute_values()
+            if key == OTHER_GROUP_KEY:
+                group_items = self.items.exclude(id__in=grouped_values.values('item_id'))
+            else:
+                try:
+                    lookup = {self._attribute_group_field(): self._parse_attribute_key(key)}
+                except (ValueError, TypeError):
+                    return self.items.none()
+                group_items = self.items.filter(id__in=grouped_values.filter(**lookup).values('item_id'))
+
+        return self.collection.order_items(group_items)
+
+    def get_group_page(self, key: str, page_number, per_page: int) -> Dict[str, Any]:
+        """
+        Get one page of item hashes within a group.
+
+        Args:
+            key: Group key as returned by get_groups()
+            page_number: Requested page (invalid values fall back to the first/last page)
+            per_page: Items per page
+
+        Returns:
+            dict with keys: item_hashes, next_page (or None), remaining_count
+        """
+        paginator = Paginator(self.get_group_items(key).values_list('hash', flat=True), per_page)
+
+        try:
+            page = paginator.page(page_number)
+        except PageNotAnInteger:
+            page = paginator.page(1)
+        except EmptyPage:
+            page = paginator.page(paginator.num_pages)
+
+        return {
+            'item_hashes': list(page.object_list),
+            'next_page': page.next_page_number() if page.has_next() else None,
+            'remaining_count': paginator.count - page.end_index(),
+        }
+
+    # ------------------------------------------------------------------
+    # Group header queries
+    # ------------------------------------------------------------------
+
+    def _item_type_groups(self) -> List[Dict[str, Any]]:
+        rows = self.items.order_by().values('item_type_id').annotate(count=Count('id'))
+        counts = {row['item_type_id']: row['count'] for row in rows}
+
+        other_count = counts.pop(None, 0)
+        item_types = ItemType.objects.filter(id__in=counts.keys()).order_by('display_name')
+
+        groups = [
+            {
+                'key': str(item_type.id),
+                'attribute_name': 'Item Type',
+                'attribute_value': item_type.display_name,
+                'count': counts[item_type.id],
+            }
+            for item_type in item_types
+        ]
+        if other_count:
+            groups.append(self._other_group(other_count))
+        return groups
+
+    def _status_groups(self) -> List[Dict[str, Any]]:
+        labels = dict(CollectionItem.Status.choices)
+        rows = self.items.order_by().values('status').annotate(count=Count('id'))
+
+        groups = [
+            {
+                'key': row['status'],
+                'attribute_name': 'Status',
+                'attribute_value': labels.get(row['status'], row['status']),
+                'count': row['count'],
+            }
+            for row in rows
+        ]
+        groups.sort(key=lambda group: str(group['attribute_value']))
+        return groups
+
+    def _attribute_groups(self) -> List[Dict[str, Any]]:
+        field = self._attribute_group_field()
+        rows = self._attribute_values().order_by().values(field).annotate(
+            count=Count('item_id')
+        ).order_by(field)
+
+        groups = [
+            {
+                'key': self._format_attribute_key(row[field]),
+                'attribute_name': self.attribute.display_name,
+                'attribute_value': self._format_attribute_label(row[field]),
+                'count': row['count'],
+            }
+            for row in rows
+        ]
+
+        other_count = self.items.exclude(id__in=self._attribute_values().values('item_id')).count()
+        if other_count:
+            groups.append(self._other_group(other_count))
+        return groups
+
+    @staticmethod
+    def _other_group(count: int) -> Dict[str, Any]:
+        return {
+            'key': OTHER_GROUP_KEY,
+            'attribute_name': 'Other Items',
+            'attribute_value': None,
+            'count': count,
+        }
+
+    # ------------------------------------------------------------------
+    # Attribute grouping helpers
+    # ------------------------------------------------------------------
+
+    def _is_numeric_attribute(self) -> bool:
+        return self.attribute.attribute_type == ItemAttribute.AttributeType.NUMBER
+
+    def _attribute_group_field(self) -> str:
+        """NUMBER attributes group on the typed column so '10' and '10.0' share a group"""
+        return 'value_number' if self._is_numeric_attribute() else 'value'
+
+    def _attribute_values(self):
+        """
+        Grouping attribute values of the filtered items, one per item: an item
+        with several values is grouped by its first one (lowest pk), so it
+        appears in exactly one group and the header counts add up.
+        """
+        values = CollectionItemAttributeValue.objects.filter(
+            item_id__in=self.items.order_by().values('id'),
+            item_attribute=self.attribute
+        )
+        if self._is_numeric_attribute():
+            values = values.filter(value_number__isnull=False)
+        else:
+            values = values.exclude(value='')
+        first_value_ids = values.order_by().values('item_id').annotate(first_id=Min('id')).values('first_id')
+        return values.filter(id__in=first_value_ids)
+
+    def _parse_attribute_key(self, key: str):
+        if self._is_numeric_attribute():
+            return float(key)
+        return key
+
+    def _format_attribute_key(self, value) -> str:
+        if self._is_numeric_attribute():
+            return repr(float(value))
+        return value
+
+    def _format_attribute_label(self, value) -> str:
+        if self._is_numeric_attribute() and float(value).is_integer():
+            return str(int(value))
+        return str(value)
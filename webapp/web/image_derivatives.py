@@ -0,0 +1,162 @@
+"""
+Image Derivatives
+=================
+
+Resized variants of uploaded images, so cards and thumbnails do not
+download full-size originals.
+
+For every width in IMAGE_DERIVATIVE_WIDTHS that is smaller than the
+original, a WebP and a JPEG variant are written next to the original under
+`derivatives/`. Their paths are recorded in MediaFile.metadata:
+
+    {"derivatives": {"webp": {"160": "derivatives/items/<uuid>_160w.webp", ...},
+                     "jpeg": {"160": "derivatives/items/<uuid>_160w.jpg", ...}}}
+
+Originals are never upscaled; the original itself is the largest srcset
+candidate. Animated images are left alone (a resized variant would lose the
+animation). MediaFile.get_srcset() builds srcset attributes from these
+paths; until the variants exist, cards use the original.
+
+Resizing and encoding takes about a second for a large photo, so it is not
+done while an upload request or an import runs: `manage.py
+generate_image_derivatives --watch` picks up new images in the background
+(and without --watch backfills existing files once). A file that cannot be
+resized gets `derivatives_error` in its metadata and is not retried.
+"""
+
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger("webapp")
+
+DERIVATIVE_DIR = "derivatives"
+
+# format key -> (Pillow format, file extension, save options)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def derivative_widths():
+    return tuple(sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (160, 400, 800))))
+
+
+def derivative_candidates():
+    """Image MediaFiles that can have derivatives (existing, not SVG)"""
+    from web.models import MediaFile
+
+    return MediaFile.objects.filter(
+        content_type__startswith='image/',
+        file_exists=True
+    ).exclude(content_type__startswith='image/svg')
+
+
+def pending_media_files():
+    """Images still waiting for their derivatives, oldest first"""
+    return derivative_candidates().exclude(
+        metadata__has_key='derivatives'
+    ).exclude(
+        metadata__has_key='derivatives_error'
+    ).order_by('pk')
+
+
+def record_derivative_error(media_file, error) -> None:
+    """Remember that an image could not be resized, so the background worker skips it"""
+    media_file.metadata = {**(media_file.metadata or {}), "derivatives_error": str(error)[:500]}
+    media_file.save(update_fields=["metadata"])
+
+
+def derivative_path(file_path: str, width: int, fmt: str) -> str:
+    """Storage path of one derivative of an original file"""
+    base, _ext = os.path.splitext(file_path)
+    return f"{DERIVATIVE_DIR}/{base}_{width}w.{DERIVATIVE_FORMATS[fmt][1]}"
+
+
+def _prepare(image):
+    """Apply EXIF orientation and convert to a mode both WebP and JPEG encoders accept"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGB", "RGBA"):
+        return image
+    if image.mode in ("LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        return image.convert("RGBA")
+    return image.convert("RGB")
+
+
+def _encode(image, fmt: str) -> bytes:
+    pillow_format, _extension, options = DERIVATIVE_FORMATS[fmt]
+    if pillow_format == "JPEG" and image.mode == "RGBA":
+        # JPEG has no alpha channel: flatten onto white
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def _save(path: str, content: bytes) -> str:
+    # Overwrite instead of letting the storage pick an alternative name
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return default_storage.save(path, ContentFile(content))
+
+
+def generate_derivatives(media_file, image=None):
+    """
+    Write the resized variants of an image and record them on the MediaFile.
+
+    Args:
+        media_file: MediaFile of an image
+        image: Already decoded PIL image of the original (read from storage if None)
+
+    Returns:
+        dict: {format: {width (str): storage path}}
+    """
+    if image is None:
+        with default_storage.open(media_file.file_path, "rb") as original:
+            image = Image.open(original)
+            image.load()
+
+    derivatives = {fmt: {} for fmt in DERIVATIVE_FORMATS}
+
+    if getattr(image, "is_animated", False):
+        logger.debug("image_derivatives: skipping animated image %s", media_file.file_path)
+    else:
+        image = _prepare(image)
+        for width in derivative_widths():
+            if width >= image.width:
+                break
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for fmt in DERIVATIVE_FORMATS:
+                derivatives[fmt][str(width)] = _save(derivative_path(media_file.file_path, width, fmt), _encode(resized, fmt))
+
+    metadata = {**(media_file.metadata or {}), "derivatives": derivatives}
+    metadata.pop("derivatives_error", None)
+    media_file.metadata = metadata
+    media_file.save(update_fields=["metadata"])
+
+    logger.info("image_derivatives: wrote %d derivatives for %s",
+                sum(len(paths) for paths in derivatives.values()), media_file.file_path)
+    return derivatives
+
+
+def delete_derivatives(media_file) -> int:
+    """Delete the derivative files of a MediaFile from storage (metadata is kept)"""
+    deleted = 0
+    for paths in (media_file.metadata or {}).get("derivatives", {}).values():
+        for path in paths.values():
+            try:
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                    deleted += 1
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("image_derivatives: error deleting %s: %s", path, str(e))
+    return deleted
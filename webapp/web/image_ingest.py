@@ -0,0 +1,224 @@
+"""
+Streaming Image Ingestion
+=========================
+
+Downloads an image from a URL into storage in a single streaming pass:
+
+- the Content-Type and Content-Length headers are checked before the body
+  is read, and the first bytes must carry a known image signature,
+- the body is read in chunks into a spooled temporary file (only the first
+  SPOOL_MAX_BYTES stay in memory) and the download is aborted as soon as it
+  exceeds the byte cap,
+- the SHA-256 digest and the image dimensions (parsed from the header
+  only, the image is never decoded) are computed from the same chunks,
+- the temporary file is then handed to the storage backend, which copies
+  it in chunks. The MediaFile is created later by the caller, so the file
+  is always written: MediaFile.save() replaces it with an already stored
+  file of the same digest under a row lock (see web/media_dedup.py).
+
+A URL pointing at a 40 MB image therefore costs at most the cap in disk
+space and never more than SPOOL_MAX_BYTES of memory.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from io import BytesIO
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from PIL import Image
+
+logger = logging.getLogger("webapp")
+
+CHUNK_SIZE = 64 * 1024
+
+# Downloads up to this size stay in memory, larger ones spill to a temporary file
+SPOOL_MAX_BYTES = 1024 * 1024
+
+# Stop looking for the image header after this many bytes (dimensions stay unknown)
+HEADER_PARSE_MAX_BYTES = 512 * 1024
+
+# Magic numbers of the accepted formats: (prefix, offset, content type)
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", 0, "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", 0, "image/png"),
+    (b"GIF87a", 0, "image/gif"),
+    (b"GIF89a", 0, "image/gif"),
+    (b"WEBP", 8, "image/webp"),
+    (b"BM", 0, "image/bmp"),
+    (b"II*\x00", 0, "image/tiff"),
+    (b"MM\x00*", 0, "image/tiff"),
+)
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/bmp": ".bmp",
+    "image/tiff": ".tiff",
+}
+
+# Declared content types that may still carry an image (checked by signature)
+GENERIC_CONTENT_TYPES = ("application/octet-stream", "binary/octet-stream", "")
+
+
+class ImageIngestError(ValueError):
+    """Raised when a URL does not deliver an acceptable image"""
+
+
+def max_download_bytes() -> int:
+    return getattr(settings, 'IMAGE_DOWNLOAD_MAX_BYTES', 5 * 1024 * 1024)
+
+
+def sniff_image_type(head: bytes):
+    """Content type of an image from its first bytes, or None if not a known image format"""
+    for signature, offset, content_type in IMAGE_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if content_type == "image/webp" and head[:4] != b"RIFF":
+                continue
+            return content_type
+    return None
+
+
+class IngestedImage:
+    """Result of ingest_image_url(): the stored file and what was learned while streaming it"""
+
+    def __init__(self, file_path, original_filename, content_type, size, sha256, width, height, source_url):
+        self.file_path = file_path
+        self.original_filename = original_filename
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self.width = width
+        self.height = height
+        self.source_url = source_url
+
+    def __repr__(self):
+        return f"<IngestedImage {self.file_path} {self.content_type} {self.size}B {self.width}x{self.height}>"
+
+
+def _read_dimensions(header):
+    """
+    Image size from the first bytes of a file, or None if more data is needed.
+    Image.open() only parses the header; pixel data is never decoded.
+    """
+    try:
+        with Image.open(BytesIO(bytes(header))) as image:
+            return image.size
+    except Image.DecompressionBombError as e:
+        raise ImageIngestError(f"Image dimensions are too large: {e}") from e
+    except Exception:  # pylint: disable=broad-except
+        return None
+
+
+def _original_filename(url, content_type):
+    name = os.path.basename(urlparse(url).path)
+    extension = CONTENT_TYPE_EXTENSIONS.get(content_type, ".jpg")
+    if not name or '.' not in name:
+        return f"downloaded_image{extension}"
+    return name
+
+
+def ingest_image_url(url, directory, filename_prefix=None, session=None, max_bytes=None, timeout=30, headers=None):
+    """
+    Stream an image from a URL into storage.
+
+    Args:
+        url: Image URL
+        directory: Storage directory, e.g. 'items'
+        filename_prefix: Prefix of the stored file name (a UUID if None)
+        session: requests.Session to reuse connections (optional)
+        max_bytes: Byte cap (IMAGE_DOWNLOAD_MAX_BYTES if None)
+        timeout: Connect/read timeout in seconds
+        headers: Extra request headers
+
+    Returns:
+        IngestedImage
+
+    Raises:
+        ImageIngestError: Not an image, too large or download failed
+    """
+    max_bytes = max_bytes or max_download_bytes()
+    http = session or requests
+
+    try:
+        response = http.get(url, stream=True, timeout=timeout, headers=headers or {})
+    except requests.RequestException as e:
+        raise ImageIngestError(f"Failed to download image: {e}") from e
+
+    with response:
+        try:
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ImageIngestError(f"Failed to download image: {e}") from e
+
+        declared_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+        if not declared_type.startswith('image/') and declared_type not in GENERIC_CONTENT_TYPES:
+            raise ImageIngestError(f"URL does not point to an image (content type '{declared_type}')")
+
+        declared_length = response.headers.get('content-length')
+        if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+            raise ImageIngestError(
+                f"Image is too large ({int(declared_length) / (1024 * 1024):.1f}MB, maximum {max_bytes / (1024 * 1024):.0f}MB)"
+            )
+
+        digest = hashlib.sha256()
+        header = bytearray()
+        size = 0
+        content_type = None
+        dimensions = None
+
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+            try:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    if content_type is None:
+                        content_type = sniff_image_type(chunk[:16])
+                        if content_type is None:
+                            raise ImageIngestError("Downloaded content is not a supported image")
+
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ImageIngestError(f"Image is larger than the maximum of {max_bytes / (1024 * 1024):.0f}MB")
+
+                    digest.update(chunk)
+                    spool.write(chunk)
+
+                    if dimensions is None and len(header) < HEADER_PARSE_MAX_BYTES:
+                        header.extend(chunk)
+                        dimensions = _read_dimensions(header)
+                        if dimensions is not None:
+                            header = bytearray()
+            except requests.RequestException as e:
+                raise ImageIngestError(f"Failed to download image: {e}") from e
+
+            if size == 0:
+                raise ImageIngestError("Downloaded image is empty")
+
+            original_filename = _original_filename(url, content_type)
+            extension = os.path.splitext(original_filename)[1].lower() or CONTENT_TYPE_EXTENSIONS[content_type]
+            stored_name = f"{filename_prefix}_{original_filename}" if filename_prefix else f"{uuid.uuid4()}{extension}"
+
+            spool.seek(0)
+            file_path = default_storage.save(f"{directory}/{stored_name}", File(spool, name=stored_name))
+
+    width, height = dimensions or (None, None)
+    logger.info("image_ingest: stored %s (%d bytes, %s) from %s", file_path, size, content_type, url)
+    return IngestedImage(
+        file_path=file_path,
+        original_filename=original_filename,
+        content_type=content_type,
+        size=size,
+        sha256=digest.hexdigest(),
+        width=width,
+        height=height,
+        source_url=url,
+    )
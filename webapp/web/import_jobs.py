@@ -0,0 +1,407 @@
+"""
+Import Jobs
+===========
+
+Data imports run as persisted ImportJobs instead of inside the request.
+
+The sys import page validates the upload, stages the file in storage
+(`imports/<uuid>.<ext>`) and queues a job; `manage.py run_import_worker`
+claims jobs (SKIP LOCKED on PostgreSQL, a conditional UPDATE elsewhere, as
+in web/moderation_queue.py) and streams the staged file through
+ImportProcessor.process_records(). The job row is updated after every
+chunk, so the sys import result page can poll its counters.
+
+A running job is owned by the worker in its `locked_by`. The worker writes
+a heartbeat (`locked_at`) after every chunk and while images are being
+downloaded; a job without one for LOCK_TIMEOUT is queued again for
+another worker. Every update of a running job is scoped to its
+`locked_by`, so a worker that lost its job (it was too slow) notices on
+its next write and stops without touching the row again. A stale job that
+used all its attempts is marked FAILED instead, so a file that kills the
+worker (out of memory, SIGKILL) is not retried forever.
+
+At every collection boundary the processor reports a checkpoint: the
+number of records committed so far, with the counters, warnings and
+errors at that point. A job whose worker stopped (SIGTERM) or died is
+resumed from its checkpoint: the collection that was being imported is
+deleted and the records before the checkpoint are skipped, so nothing is
+imported twice.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger("webapp")
+
+# RUNNING jobs without a progress update for this long are handed to another worker
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+# Seconds between heartbeats written while images are downloaded
+HEARTBEAT_INTERVAL = 30
+
+# Warnings and errors stored on a job (the counts are always complete)
+MAX_MESSAGES = 500
+
+# Storage directory of staged import files (not MediaFiles, see storage_inventory.py)
+STAGING_PREFIX = "imports/"
+
+# Staged files no queued or running job uses are deleted after this long
+# (uploads validated on the sys import page but never confirmed)
+STAGED_FILE_MAX_AGE = timedelta(days=1)
+
+
+def max_attempts() -> int:
+    return getattr(settings, 'IMPORT_JOB_MAX_ATTEMPTS', 3)
+
+
+def stage_import_file(content, extension: str) -> str:
+    """Save an uploaded import file (file object or bytes) to storage; returns its path"""
+    import uuid
+    from django.core.files.base import ContentFile
+
+    if isinstance(content, bytes):
+        content = ContentFile(content)
+    return default_storage.save(f"{STAGING_PREFIX}{uuid.uuid4()}.{extension}", content)
+
+
+def delete_staged_file(file_path):
+    """Delete a staged import file from storage (errors are logged)"""
+    try:
+        default_storage.delete(file_path)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning(f"import_jobs: could not delete staged file {file_path}: {e}")
+
+
+def cleanup_staged_files() -> int:
+    """
+    Delete staged files older than STAGED_FILE_MAX_AGE that no pending or
+    running job uses.
+
+    Returns:
+        int: Number of files deleted
+    """
+    from web.models import ImportJob
+
+    try:
+        _directories, file_names = default_storage.listdir(STAGING_PREFIX.rstrip('/'))
+    except (FileNotFoundError, NotADirectoryError):
+        return 0
+
+    in_use = set(ImportJob.objects.filter(
+        status__in=[ImportJob.Status.PENDING, ImportJob.Status.RUNNING]
+    ).values_list('file_path', flat=True))
+    cutoff = timezone.now() - STAGED_FILE_MAX_AGE
+
+    deleted = 0
+    for file_name in file_names:
+        file_path = f"{STAGING_PREFIX}{file_name}"
+        if file_path in in_use:
+            continue
+        try:
+            if default_storage.get_modified_time(file_path) > cutoff:
+                continue
+            default_storage.delete(file_path)
+            deleted += 1
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"import_jobs: could not clean up staged file {file_path}: {e}")
+
+    if deleted:
+        logger.info(f"import_jobs: deleted {deleted} unused staged import files")
+    return deleted
+
+
+def enqueue_import(file_path, file_name, file_format, target_user, admin_user=None,
+                   download_images=False, records_total=0, mode="", delete_missing=False):
+    """
+    Queue a staged import file.
+
+    Returns:
+        ImportJob
+    """
+    from web.models import ImportJob
+
+    job = ImportJob.objects.create(
+        file_path=file_path,
+        file_name=file_name,
+        file_format=file_format,
+        target_user=target_user,
+        admin_user=admin_user,
+        download_images=download_images,
+        records_total=records_total,
+        mode=mode,
+        delete_missing=delete_missing,
+    )
+    logger.info(f"import_jobs: queued {file_name} for user {target_user.username} (job {job.pk}, {records_total} records)")
+    return job
+
+
+def release_stale_jobs() -> int:
+    """
+    Put RUNNING jobs of dead workers back into the queue (they resume from
+    their checkpoint); jobs that used all their attempts are marked FAILED.
+
+    Returns:
+        int: Number of jobs put back into the queue
+    """
+    from web.models import ImportJob
+
+    stale = ImportJob.objects.filter(
+        status=ImportJob.Status.RUNNING,
+        locked_at__lt=timezone.now() - LOCK_TIMEOUT
+    )
+    for job in stale.filter(attempts__gte=max_attempts()).only('pk', 'file_path', 'attempts'):
+        # Conditional per job: a heartbeat may have arrived since the query
+        if stale.filter(pk=job.pk).update(
+            status=ImportJob.Status.FAILED,
+            locked_by="",
+            locked_at=None,
+            finished=timezone.now(),
+            last_error="worker died"
+        ):
+            _delete_staged_file(job)
+            logger.error(f"import_jobs: job {job.pk} failed, its worker died on attempt {job.attempts}")
+
+    released = stale.update(status=ImportJob.Status.PENDING, locked_by="", locked_at=None)
+    if released:
+        logger.warning(f"import_jobs: released {released} stale jobs")
+    return released
+
+
+def claim_job(worker_id: str):
+    """
+    Claim the oldest pending job for a worker.
+
+    Returns:
+        ImportJob (status RUNNING, attempts incremented) or None
+    """
+    from web.models import ImportJob
+
+    now = timezone.now()
+    pending = ImportJob.objects.filter(status=ImportJob.Status.PENDING).order_by('created', 'pk')
+    claim = {
+        'status': ImportJob.Status.RUNNING,
+        'locked_by': worker_id,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+    }
+
+    job_id = None
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_id = pending.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if job_id is not None:
+                ImportJob.objects.filter(pk=job_id).update(**claim)
+    else:
+        # No row locks (SQLite): the conditional update decides which worker gets the job
+        for candidate_id in pending.values_list('pk', flat=True)[:5]:
+            if ImportJob.objects.filter(pk=candidate_id, status=ImportJob.Status.PENDING).update(**claim):
+                job_id = candidate_id
+                break
+
+    if job_id is None:
+        return None
+    return ImportJob.objects.select_related('target_user', 'admin_user').get(pk=job_id)
+
+
+def _owned(job):
+    """The job row, as long as the worker that claimed `job` still owns it"""
+    from web.models import ImportJob
+
+    return ImportJob.objects.filter(pk=job.pk, status=ImportJob.Status.RUNNING, locked_by=job.locked_by)
+
+
+def _open_records(job, staged_file):
+    """Record stream of a staged import file"""
+    from web.import_validator import ImportValidator, iter_document_records, iter_jsonl_records
+    from web.models import ImportJob
+
+    if job.file_format == ImportJob.Format.JSONL:
+        return iter_jsonl_records(staged_file)
+    data = ImportValidator().load_file_content(staged_file.read().decode('utf-8'), job.file_format)
+    return iter_document_records(data)
+
+
+def _discard_partial_collection(job):
+    """Hard-delete the collection an interrupted run was importing (items, images and facets cascade)"""
+    from web.card_cache import bump_collection_generation
+    from web.models import Collection
+
+    if not job.partial_collection_id:
+        return
+    deleted, _counts = Collection.objects.all_with_deleted().filter(
+        pk=job.partial_collection_id, created_by=job.target_user
+    ).delete()
+    if deleted:
+        bump_collection_generation([job.partial_collection_id])
+        logger.warning(f"import_jobs: job {job.pk} discarded partially imported collection {job.partial_collection_id}")
+
+
+def _cap(messages):
+    return list(messages[:MAX_MESSAGES])
+
+
+def run_job(job, should_stop=None):
+    """
+    Import the staged file of a claimed job, resuming from its checkpoint.
+
+    Args:
+        job: Claimed ImportJob
+        should_stop: Optional callable; when it returns True the import stops
+            at the next collection boundary and the job goes back to PENDING
+
+    Returns:
+        str: The job's new status, or None if another worker took the job over
+    """
+    from web.import_processor import COUNTER_KEYS, ImportInterrupted, ImportLockLost, ImportProcessor
+    from web.models import ImportJob
+
+    state = job.checkpoint_state or {}
+    base_warnings = state.get('warnings', [])
+    base_errors = state.get('errors', [])
+    base_warning_count = state.get('warning_count', 0)
+    base_error_count = state.get('error_count', 0)
+
+    if not _owned(job).update(started=job.started or timezone.now(), locked_at=timezone.now(), last_error=""):
+        logger.warning(f"import_jobs: job {job.pk} was taken over by another worker before it started")
+        return None
+    if job.checkpoint or job.partial_collection_id:
+        logger.info(f"import_jobs: resuming job {job.pk} after record {job.checkpoint}")
+    _discard_partial_collection(job)
+    _owned(job).update(partial_collection_id=None)
+
+    last_heartbeat = [time.monotonic()]
+
+    def heartbeat():
+        if time.monotonic() - last_heartbeat[0] < HEARTBEAT_INTERVAL:
+            return
+        if not _owned(job).update(locked_at=timezone.now()):
+            raise ImportLockLost(f"job {job.pk} was taken over by another worker")
+        last_heartbeat[0] = time.monotonic()
+
+    def on_progress(result, progress):
+        update = {key: result[key] for key in COUNTER_KEYS}
+        update.update(
+            records_processed=progress['position'],
+            partial_collection_id=progress['collection_id'],
+            warning_count=base_warning_count + len(result['warnings']),
+            error_count=base_error_count + len(result['errors']),
+            locked_at=timezone.now(),
+        )
+        checkpoint = progress['checkpoint']
+        if checkpoint is not None:
+            update.update(
+                checkpoint=checkpoint['position'],
+                checkpoint_state={
+                    'counters': checkpoint['counters'],
+                    'warnings': _cap(base_warnings + result['warnings'][:checkpoint['warning_count']]),
+                    'errors': _cap(base_errors + result['errors'][:checkpoint['error_count']]),
+                    'warning_count': base_warning_count + checkpoint['warning_count'],
+                    'error_count': base_error_count + checkpoint['error_count'],
+                },
+                warnings=_cap(base_warnings + result['warnings']),
+                errors=_cap(base_errors + result['errors']),
+            )
+        if not _owned(job).update(**update):
+            raise ImportLockLost(f"job {job.pk} was taken over by another worker")
+        last_heartbeat[0] = time.monotonic()
+
+        if checkpoint is not None and should_stop and should_stop():
+            raise ImportInterrupted(f"stopped after record {checkpoint['position']}")
+
+    processor = ImportProcessor()
+    try:
+        with default_storage.open(job.file_path, 'rb') as staged_file:
+            result = processor.process_records(
+                _open_records(job, staged_file),
+                target_user=job.target_user,
+                download_images=job.download_images,
+                admin_user=job.admin_user,
+                skip_records=job.checkpoint,
+                counters=state.get('counters'),
+                on_progress=on_progress,
+                mode=job.mode or None,
+                delete_missing=job.delete_missing or None,
+                heartbeat=heartbeat,
+            )
+    except ImportLockLost as e:
+        # The other worker discards what this run imported since the checkpoint
+        logger.warning(f"import_jobs: {e}, stopping")
+        return None
+    except ImportInterrupted as e:
+        _owned(job).update(
+            status=ImportJob.Status.PENDING, locked_by="", locked_at=None, attempts=F('attempts') - 1
+        )
+        logger.info(f"import_jobs: job {job.pk} {e}, queued again")
+        return ImportJob.Status.PENDING
+    except Exception as e:  # pylint: disable=broad-except
+        return fail_job(job, e)
+
+    warnings = base_warnings + result['warnings']
+    errors = base_errors + result['errors']
+    finished = _owned(job).update(
+        status=ImportJob.Status.DONE,
+        warnings=_cap(warnings),
+        errors=_cap(errors),
+        warning_count=base_warning_count + len(result['warnings']),
+        error_count=base_error_count + len(result['errors']),
+        partial_collection_id=None,
+        locked_by="",
+        locked_at=None,
+        finished=timezone.now(),
+        **{key: result[key] for key in COUNTER_KEYS}
+    )
+    if not finished:
+        logger.warning(f"import_jobs: job {job.pk} finished after it was taken over by another worker")
+        return None
+    _delete_staged_file(job)
+
+    logger.info(
+        f"import_jobs: job {job.pk} imported {result['collections_created']} collections and "
+        f"{result['items_created']} items from '{job.file_name}' for user {job.target_user.username} "
+        f"({base_error_count + len(result['errors'])} errors)"
+    )
+    return ImportJob.Status.DONE
+
+
+def fail_job(job, error) -> str:
+    """
+    Record a failed run. The job is queued again (resuming from its checkpoint)
+    until IMPORT_JOB_MAX_ATTEMPTS is reached.
+
+    Returns:
+        str: The job's new status, or None if another worker took the job over
+    """
+    from web.models import ImportJob
+
+    if job.attempts >= max_attempts():
+        if not _owned(job).update(
+            status=ImportJob.Status.FAILED,
+            locked_by="",
+            locked_at=None,
+            finished=timezone.now(),
+            last_error=str(error)
+        ):
+            logger.warning(f"import_jobs: job {job.pk} failed after it was taken over by another worker: {error}")
+            return None
+        _delete_staged_file(job)
+        logger.error(f"import_jobs: job {job.pk} failed after {job.attempts} attempts: {error}")
+        return ImportJob.Status.FAILED
+
+    if not _owned(job).update(
+        status=ImportJob.Status.PENDING, locked_by="", locked_at=None, last_error=str(error)
+    ):
+        logger.warning(f"import_jobs: job {job.pk} failed after it was taken over by another worker: {error}")
+        return None
+    logger.warning(f"import_jobs: job {job.pk} attempt {job.attempts} failed, queued again: {error}")
+    return ImportJob.Status.PENDING
+
+
+def _delete_staged_file(job):
+    delete_staged_file(job.file_path)
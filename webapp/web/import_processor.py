@@ -4,50 +4,122 @@ Import Processing Engine
 
 Processes validated import data and creates Collections, Items, Images, and Links.
 Handles optional web image downloads and provides comprehensive error reporting.
+
+Imports are processed as a stream of records (one item type, collection or
+item each, see import_schema.py): a JSON/YAML document is turned into
+records by iter_document_records(), a JSON Lines file is read line by line.
+Items are buffered per chunk of IMPORT_CHUNK_SIZE; the web images of a
+chunk are prefetched concurrently (see web/image_prefetch.py), then the
+chunk is written with bulk_create in one transaction. Facet counts, search
+documents and timestamps that per-row signals would maintain are updated
+once per chunk or collection.
+
+Long imports run as ImportJobs (see web/import_jobs.py): process_records()
+reports its counters after every chunk and a checkpoint at every collection
+boundary through `on_progress`, and resumes from a checkpoint with
+`skip_records` and `counters`.
+
+In upsert mode a re-import updates what an earlier import created instead
+of duplicating it. Collections are matched by name (per target user) and
+items by their natural key within the collection: `your_id` when given,
+otherwise the name. Each chunk is diffed against the stored rows; only new
+items are inserted and only changed items are written (bulk_update, their
+attribute values and links replaced), unchanged items are not touched.
+With `delete_missing`, items of a matched collection that are no longer in
+the import are soft-deleted. Images of existing items and collections are
+kept as they are. A dry run performs the same work in a transaction that
+is rolled back, so its counters and `changes` are an exact diff report.
 """
 
 import logging
-import os
-import requests
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
-from urllib.parse import urlparse
-from io import BytesIO
-from PIL import Image as PILImage
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.utils import timezone
 
+from .autocomplete import bump_user_generation
+from .card_cache import bump_collection_generation
+from .facets import rebuild_collection_facets
+from .image_ingest import ImageIngestError, ingest_image_url
+from .image_prefetch import ImagePrefetcher, USER_AGENT, item_image_urls
+from .import_validator import iter_document_records
 from .models import (
     Collection, CollectionItem, ItemType, ItemAttribute, 
-    LinkPattern, CollectionItemLink, MediaFile,
-    CollectionImage, CollectionItemImage, RecentActivity
+    LinkPattern, CollectionItemLink, MediaFile, CollectionItemAttributeValue,
+    CollectionImage, CollectionItemImage, ItemSearchDocument, RecentActivity
 )
 
 User = get_user_model()
 logger = logging.getLogger("webapp")
 
 
+# Result keys restored from a checkpoint when an import is resumed
+COUNTER_KEYS = (
+    'collections_created', 'items_created', 'images_downloaded', 'links_created', 'item_types_created',
+    'collections_updated', 'items_updated', 'items_unchanged', 'items_deleted',
+)
+
+MODE_CREATE = 'create'
+MODE_UPSERT = 'upsert'
+
+# Item fields an upsert compares and updates
+UPSERT_ITEM_FIELDS = (
+    'name', 'description', 'status', 'is_favorite', 'item_type', 'image_url', 'your_id',
+    'reserved_by_name', 'reserved_by_email', 'reserved_date',
+)
+UPSERT_COLLECTION_FIELDS = ('description', 'visibility', 'image_url')
+
+# Lines of the change list kept in the result (the counters are always complete)
+MAX_REPORTED_CHANGES = 200
+
+
+def _item_key(your_id, name):
+    """Natural key of an item within its collection"""
+    return ('your_id', your_id) if your_id else ('name', name)
+
+
+def _normalized(value):
+    return '' if value is None else value
+
+
 class ImportProcessingError(Exception):
     """Custom exception for import processing errors"""
     pass
 
 
+class ImportInterrupted(Exception):
+    """Raised by an on_progress or heartbeat callback to stop the import"""
+    pass
+
+
+class ImportLockLost(ImportInterrupted):
+    """Raised by a callback when the import job was taken over by another worker"""
+    pass
+
+
 class ImportProcessor:
     """
     Processes validated import data and creates database objects
     """
     
     def __init__(self):
-        self.downloaded_images = {}  # Cache for downloaded images
+        self.downloaded_images = {}  # Cache for downloaded images (current chunk)
+        self.failed_images = {}  # Prefetch errors by URL (current chunk)
+        self.image_ids = {}  # MediaFile id by URL, for the whole import
+        self.session = None
+        self.heartbeat = None
         self.created_item_types = {}  # Cache for created item types
         self.errors = []
         self.warnings = []
         
     def process_import(self, data: Dict[str, Any], target_user: User, 
-                      download_images: bool = False, admin_user: User = None) -> Dict[str, Any]:
+                      download_images: bool = False, admin_user: User = None,
+                      chunk_size: int = None) -> Dict[str, Any]:
         """
         Main import processing method
         
@@ -56,6 +128,53 @@ class ImportProcessor:
             target_user: User to import data for
             download_images: Whether to download web images
             admin_user: Admin user performing the import
+            chunk_size: Items inserted per transaction (IMPORT_CHUNK_SIZE if None)
+            
+        Returns:
+            Import result summary
+        """
+        return self.process_records(
+            iter_document_records(data), target_user,
+            download_images=download_images, admin_user=admin_user, chunk_size=chunk_size
+        )
+    
+    def process_records(self, records: Iterable[Tuple[Optional[int], Any]], target_user: User,
+                        download_images: bool = False, admin_user: User = None,
+                        chunk_size: int = None, skip_records: int = 0,
+                        counters: Optional[Dict[str, int]] = None,
+                        on_progress: Optional[Callable[[Dict, Dict], None]] = None,
+                        mode: str = None, delete_missing: bool = None,
+                        dry_run: bool = False,
+                        heartbeat: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+        """
+        Import a stream of validated records (see import_schema.py)
+        
+        Records are consumed one by one and items are buffered only up to
+        one chunk, so a JSON Lines file of any size is imported in constant
+        memory.
+        
+        Args:
+            records: Iterable of (line number or None, record), e.g.
+                iter_jsonl_records() or iter_document_records()
+            target_user: User to import data for
+            download_images: Whether to download web images
+            admin_user: Admin user performing the import
+            chunk_size: Items inserted per transaction (IMPORT_CHUNK_SIZE if None)
+            skip_records: Records already imported (resume from a checkpoint)
+            counters: Result counters at that checkpoint
+            on_progress: Optional callback(result, progress) after every chunk,
+                where progress has the records consumed (`position`), the
+                collection being imported (`collection_id`) and, at collection
+                boundaries, a `checkpoint` dict to resume from. It may raise
+                ImportInterrupted at a checkpoint to stop the import.
+            mode: 'create' or 'upsert' (the header's `mode` option, else 'create', if None)
+            delete_missing: Upsert: delete items missing from the import (the
+                header's `delete_missing` option if None)
+            dry_run: Roll everything back and only report what would change
+                (no images are downloaded)
+            heartbeat: Optional callback while images are downloaded, called as
+                downloads complete (a chunk with many images can take minutes).
+                It may raise ImportInterrupted to stop the import.
             
         Returns:
             Import result summary
@@ -63,9 +182,20 @@ class ImportProcessor:
         self.errors = []
         self.warnings = []
         self.downloaded_images = {}
+        self.failed_images = {}
+        self.image_ids = {}
         self.created_item_types = {}
+        self.item_types = {}
+        self.item_attributes = {}
         self.target_user = target_user
         self.admin_user = admin_user
+        self.chunk_size = max(1, chunk_size or getattr(settings, 'IMPORT_CHUNK_SIZE', 500))
+        self.mode = mode
+        self.delete_missing = delete_missing
+        self.changes = []
+        self.heartbeat = heartbeat
+        if dry_run:
+            download_images = False
         
         result = {
             'collections_created': 0,
@@ -73,53 +203,108 @@ class ImportProcessor:
             'images_downloaded': 0,
             'links_created': 0,
             'item_types_created': 0,
-            'errors': [],
-            'warnings': [],
+            'collections_updated': 0,
+            'items_updated': 0,
+            'items_unchanged': 0,
+            'items_deleted': 0,
+            'image_prefetch_seconds': 0.0,
+            'errors': self.errors,
+            'warnings': self.warnings,
+            'changes': self.changes,
+            'dry_run': dry_run,
             'start_time': timezone.now()
         }
+        result.update({key: value for key, value in (counters or {}).items() if key in COUNTER_KEYS})
+        
+        def report(position, current, at_checkpoint=False):
+            if on_progress is None:
+                return
+            # A resumed import deletes the collection it was creating; a stored
+            # collection being upserted is simply upserted again
+            progress = {
+                'position': position,
+                'collection_id': current['collection'].pk if current and current['created'] else None,
+                'checkpoint': None,
+            }
+            if at_checkpoint:
+                progress['checkpoint'] = {
+                    'position': position,
+                    'counters': {key: result[key] for key in COUNTER_KEYS},
+                    'warning_count': len(self.warnings),
+                    'error_count': len(self.errors),
+                }
+            on_progress(result, progress)
         
         try:
-            with transaction.atomic():
-                # Process item types first if provided
-                if 'item_types' in data:
-                    result['item_types_created'] = self._process_item_types(
-                        data['item_types'], target_user
-                    )
+            with transaction.atomic() if dry_run else nullcontext():
+                current = None
+                position = 0
+                for line_number, record in records:
+                    position += 1
+                    if isinstance(record, Exception):
+                        if position > skip_records:
+                            self.errors.append(f"Line {line_number}: {str(record)}")
+                        continue
                 
-                # Process collections
-                for collection_data in data.get('collections', []):
-                    try:
-                        collection, collection_stats = self._process_collection(
-                            collection_data, target_user, download_images
-                        )
-                        
-                        result['collections_created'] += 1
-                        result['items_created'] += collection_stats['items_created']
-                        result['images_downloaded'] += collection_stats['images_downloaded']
-                        result['links_created'] += collection_stats['links_created']
-                        
-                        logger.info("Import: Created collection '%s' with %d items for user %s", 
-                                   collection.name, collection_stats['items_created'], target_user.email)
-                        
-                    except Exception as e:
-                        error_msg = f"Failed to create collection '{collection_data.get('name', 'Unknown')}': {str(e)}"
-                        self.errors.append(error_msg)
-                        logger.error("Import error: %s", error_msg)
+                    record_type = record.get('type')
+                    if record_type == 'header':
+                        # Read even when resuming past it: it holds the import options
+                        options = record.get('options') or {}
+                        if self.mode is None:
+                            self.mode = options.get('mode', MODE_CREATE)
+                        if self.delete_missing is None:
+                            self.delete_missing = options.get('delete_missing', False)
+                        continue
+                    if position <= skip_records:
+                        continue
+                
+                    if record_type == 'item_type':
+                        with transaction.atomic():
+                            result['item_types_created'] += self._process_item_types([record], target_user)
                 
+                    elif record_type == 'collection':
+                        self._close_collection(current, target_user, download_images, result)
+                        current = None
+                        # Everything before this record is committed: a resume point
+                        report(position - 1, current, at_checkpoint=True)
+                        current = self._open_collection(record, target_user, download_images, result)
+                        report(position, current)
+                
+                    elif record_type == 'item':
+                        if current is None:
+                            self.errors.append(f"Line {line_number}: item '{record.get('name', 'Unknown')}' does not follow a collection")
+                            continue
+                        current['items'].append(record)
+                        if len(current['items']) >= self.chunk_size:
+                            self._flush_items(current, target_user, download_images, result)
+                            report(position, current)
+            
+                self._close_collection(current, target_user, download_images, result)
+                report(position, None, at_checkpoint=True)
+            
                 # Create activity log entry
-                if result['collections_created'] > 0:
+                if result['collections_created'] > 0 or result['collections_updated'] > 0:
+                    message = f"**Admin import**: Created {result['collections_created']} collection(s) and {result['items_created']} item(s)"
+                    if self.mode == MODE_UPSERT:
+                        message += f", updated {result['items_updated']} and deleted {result['items_deleted']} item(s)"
                     RecentActivity.objects.create(
                         created_by=admin_user or target_user,
                         icon='upload',
-                        message=f"**Admin import**: Created {result['collections_created']} collection(s) and {result['items_created']} item(s) for user **{target_user.display_name()}**"
+                        message=f"{message} for user **{target_user.display_name()}**"
                     )
-                
+            
+                if dry_run:
+                    # Report what the import would change, then undo it
+                    transaction.set_rollback(True)
+        except ImportInterrupted:
+            raise
         except Exception as e:
             logger.error("Import processing failed: %s", str(e))
             raise ImportProcessingError(f"Import processing failed: {str(e)}")
         
         result['errors'] = self.errors
         result['warnings'] = self.warnings
+        result['mode'] = self.mode or MODE_CREATE
         result['end_time'] = timezone.now()
         result['duration'] = (result['end_time'] - result['start_time']).total_seconds()
         
@@ -169,95 +354,239 @@ class ImportProcessor:
         
         return created_count
     
-    def _process_collection(self, collection_data: Dict, target_user: User, 
-                          download_images: bool) -> Tuple['Collection', Dict]:
-        """Process a single collection"""
-        stats = {
-            'items_created': 0,
-            'images_downloaded': 0,
-            'links_created': 0
-        }
+    def _preload_definitions(self, item_type_names, target_user: User) -> None:
+        """Load item types (and their attributes) not loaded yet into memory, creating missing item types"""
+        names = set(item_type_names) - set(self.item_types)
+        if not names:
+            return
         
-        # Create collection
-        collection = Collection.objects.create(
-            name=collection_data['name'],
-            description=collection_data.get('description', ''),
-            visibility=collection_data.get('visibility', 'PRIVATE'),
-            image_url=collection_data.get('image_url', ''),
-            created_by=target_user
-        )
+        loaded = {item_type.name: item_type for item_type in ItemType.objects.filter(name__in=names)}
         
-        # Process collection images
-        if download_images and 'images' in collection_data:
-            for image_data in collection_data['images']:
-                try:
-                    media_file = self._download_image(
-                        image_data['url'], 
-                        f"collection_{collection.hash}_{image_data.get('order', 0)}"
-                    )
-                    if media_file:
-                        CollectionImage.objects.create(
-                            collection=collection,
-                            media_file=media_file,
-                            is_default=image_data.get('is_default', False),
-                            order=image_data.get('order', 0),
-                            created_by=target_user
-                        )
-                        stats['images_downloaded'] += 1
-                        
-                except Exception as e:
-                    self.warnings.append(f"Failed to download collection image from {image_data['url']}: {str(e)}")
-        
-        # Process items
-        for item_data in collection_data.get('items', []):
-            try:
-                item, item_stats = self._process_item(item_data, collection, target_user, download_images)
-                stats['items_created'] += 1
-                stats['images_downloaded'] += item_stats['images_downloaded']
-                stats['links_created'] += item_stats['links_created']
-                
-            except Exception as e:
-                error_msg = f"Failed to create item '{item_data.get('name', 'Unknown')}': {str(e)}"
-                self.errors.append(error_msg)
-        
-        return collection, stats
-    
-    def _process_item(self, item_data: Dict, collection: 'Collection', 
-                     target_user: User, download_images: bool) -> Tuple['CollectionItem', Dict]:
-        """Process a single collection item"""
-        stats = {
-            'images_downloaded': 0,
-            'links_created': 0
-        }
-        
-        # Get or create item type
-        item_type = None
-        if 'item_type' in item_data:
-            item_type_name = item_data['item_type']
-            try:
-                item_type = ItemType.objects.get(name=item_type_name)
-            except ItemType.DoesNotExist:
+        with transaction.atomic():
+            for item_type_name in sorted(names - set(loaded)):
                 # Create a basic item type
                 item_type = ItemType.objects.create(
                     name=item_type_name,
                     display_name=item_type_name.replace('_', ' ').title(),
-                    description=f"Auto-created from import",
+                    description="Auto-created from import",
                     icon='package',
                     created_by=target_user
                 )
+                loaded[item_type_name] = item_type
                 self.created_item_types[item_type_name] = item_type
                 self.warnings.append(f"Created basic item type '{item_type_name}' automatically")
         
-        # Create item
-        item = CollectionItem.objects.create(
+        self.item_types.update(loaded)
+        self.item_attributes.update({
+            (attribute.item_type_id, attribute.name): attribute
+            for attribute in ItemAttribute.objects.filter(item_type__in=loaded.values()).select_related('item_type')
+        })
+    
+    def _open_collection(self, collection_data: Dict, target_user: User, 
+                         download_images: bool, result: Dict) -> Dict:
+        """Create (or in upsert mode find and update) a collection; returns the state its item records are collected in"""
+        current = {
+            'name': collection_data.get('name', 'Unknown'),
+            'collection': None,
+            'items': [],
+            'offset': 0,
+            'skipped': 0,
+            # Upsert: natural key -> id of the stored items, and the keys seen in the import
+            'existing': None,
+            'seen_keys': set(),
+            'created': False,
+            'changed': False,
+            'stats': {
+                'items_created': 0,
+                'images_downloaded': 0,
+                'links_created': 0,
+                'attribute_values_created': 0,
+                'items_updated': 0,
+                'items_unchanged': 0,
+                'items_deleted': 0
+            }
+        }
+        
+        try:
+            if self.mode == MODE_UPSERT:
+                collection = Collection.objects.filter(
+                    created_by=target_user, name=collection_data['name']
+                ).order_by('pk').first()
+                if collection is not None:
+                    self._update_collection(collection, collection_data, current)
+                    current['collection'] = collection
+                    return current
+                current['existing'] = {}
+            
+            if download_images:
+                result['image_prefetch_seconds'] += self._prefetch_urls(
+                    [image_data['url'] for image_data in collection_data.get('images', [])]
+                )
+            
+            with transaction.atomic():
+                # Create collection
+                collection = Collection.objects.create(
+                    name=collection_data['name'],
+                    description=collection_data.get('description', ''),
+                    visibility=collection_data.get('visibility', 'PRIVATE'),
+                    image_url=collection_data.get('image_url', ''),
+                    created_by=target_user
+                )
+                
+                # Process collection images
+                if download_images and 'images' in collection_data:
+                    for image_data in collection_data['images']:
+                        try:
+                            media_file = self._download_image(
+                                image_data['url'], 
+                                f"collection_{collection.hash}_{image_data.get('order', 0)}"
+                            )
+                            if media_file:
+                                CollectionImage.objects.create(
+                                    collection=collection,
+                                    media_file=media_file,
+                                    is_default=image_data.get('is_default', False),
+                                    order=image_data.get('order', 0),
+                                    created_by=target_user
+                                )
+                                current['stats']['images_downloaded'] += 1
+                                
+                        except Exception as e:
+                            self.warnings.append(f"Failed to download collection image from {image_data['url']}: {str(e)}")
+            
+            current['collection'] = collection
+            current['created'] = True
+            result['collections_created'] += 1
+            result['images_downloaded'] += current['stats']['images_downloaded']
+            self._record_change(f"+ collection '{collection.name}'")
+            
+        except ImportInterrupted:
+            raise
+        except Exception as e:
+            error_msg = f"Failed to create collection '{current['name']}': {str(e)}"
+            self.errors.append(error_msg)
+            logger.error("Import error: %s", error_msg)
+        
+        return current
+    
+    def _update_collection(self, collection: 'Collection', collection_data: Dict, current: Dict) -> None:
+        """Upsert: update the changed fields of an existing collection and load the keys of its items"""
+        desired = {
+            'description': collection_data.get('description', ''),
+            'visibility': collection_data.get('visibility', 'PRIVATE'),
+            'image_url': collection_data.get('image_url', ''),
+        }
+        changed_fields = [
+            field for field in UPSERT_COLLECTION_FIELDS
+            if _normalized(getattr(collection, field)) != _normalized(desired[field])
+        ]
+        if changed_fields:
+            for field in changed_fields:
+                setattr(collection, field, desired[field])
+            with transaction.atomic():
+                collection.save(update_fields=changed_fields + ['updated'])
+            current['changed'] = True
+            self._record_change(f"~ collection '{collection.name}': {', '.join(changed_fields)}")
+        
+        # Oldest item first: of stored items sharing a key, the oldest is matched
+        existing = {}
+        for item_id, your_id, name in CollectionItem.objects.filter(collection=collection).order_by('pk').values_list('pk', 'your_id', 'name'):
+            existing.setdefault(_item_key(your_id, name), item_id)
+        current['existing'] = existing
+    
+    def _flush_items(self, current: Dict, target_user: User, download_images: bool, result: Dict) -> None:
+        """Write the buffered items of a collection as one chunk, in one transaction"""
+        chunk = current['items']
+        current['items'] = []
+        offset = current['offset']
+        current['offset'] += len(chunk)
+        
+        collection = current['collection']
+        if collection is None:
+            current['skipped'] += len(chunk)
+            return
+        
+        try:
+            self._preload_definitions({item_data['item_type'] for item_data in chunk if item_data.get('item_type')}, target_user)
+            
+            new_items, updates = chunk, {}
+            if current['existing'] is not None:
+                new_items, updates = self._match_items(chunk, current)
+            
+            if download_images:
+                result['image_prefetch_seconds'] += self._prefetch_urls(
+                    [url for item_data in new_items for url in item_image_urls(item_data)]
+                )
+            
+            with transaction.atomic():
+                chunk_stats = self._insert_items(new_items, collection, target_user, download_images)
+                if updates:
+                    for key, value in self._update_items(updates, collection, target_user).items():
+                        chunk_stats[key] = chunk_stats.get(key, 0) + value
+            for key, value in chunk_stats.items():
+                current['stats'][key] += value
+                if key in result:
+                    result[key] += value
+            
+        except ImportInterrupted:
+            raise
+        except Exception as e:
+            error_msg = f"Failed to create items {offset + 1}-{offset + len(chunk)} of collection '{collection.name}': {str(e)}"
+            self.errors.append(error_msg)
+            logger.error("Import error: %s", error_msg)
+        
+        # Only this chunk's MediaFiles stay in memory; repeated URLs are found via image_ids
+        self.downloaded_images = {}
+        self.failed_images = {}
+    
+    def _close_collection(self, current: Optional[Dict], target_user: User, download_images: bool, result: Dict) -> None:
+        """Insert the remaining items of a collection and finish it"""
+        if current is None:
+            return
+        if current['items']:
+            self._flush_items(current, target_user, download_images, result)
+        
+        collection = current['collection']
+        if collection is None:
+            if current['skipped']:
+                self.errors.append(f"Skipped {current['skipped']} items of collection '{current['name']}'")
+            return
+        
+        stats = current['stats']
+        if current['existing'] and self.delete_missing:
+            deleted = self._delete_missing_items(collection, current)
+            stats['items_deleted'] += deleted
+            result['items_deleted'] += deleted
+        
+        items_changed = stats['items_created'] or stats['items_updated'] or stats['items_deleted']
+        if not current['created'] and (current['changed'] or items_changed):
+            result['collections_updated'] += 1
+        
+        # An unchanged collection keeps its timestamp, facets and cached cards
+        if current['created'] or items_changed:
+            self._finish_collection(collection, target_user, stats['attribute_values_created'])
+        
+        if current['created']:
+            logger.info("Import: Created collection '%s' with %d items for user %s", 
+                       collection.name, stats['items_created'], target_user.email)
+        else:
+            logger.info("Import: Updated collection '%s' for user %s: %d items created, %d updated, %d unchanged, %d deleted",
+                       collection.name, target_user.email, stats['items_created'], stats['items_updated'],
+                       stats['items_unchanged'], stats['items_deleted'])
+    
+    def _build_item(self, item_data: Dict, collection: 'Collection', target_user: User) -> 'CollectionItem':
+        """Build an unsaved CollectionItem from import data"""
+        item_type = self.item_types.get(item_data['item_type']) if item_data.get('item_type') else None
+        
+        item = CollectionItem(
             collection=collection,
             name=item_data['name'],
             description=item_data.get('description', ''),
             status=item_data.get('status', 'IN_COLLECTION'),
             is_favorite=item_data.get('is_favorite', False),
             item_type=item_type,
-            attributes=item_data.get('attributes', {}),
             image_url=item_data.get('image_url', ''),
+            your_id=item_data.get('your_id', ''),
             created_by=target_user
         )
         
@@ -273,149 +602,420 @@ class ImportProcessor:
                     )
                 except ValueError:
                     self.warnings.append(f"Invalid reservation date format for item '{item.name}'")
-            item.save()
         
-        # Process item images
-        if download_images and 'images' in item_data:
-            for image_data in item_data['images']:
-                try:
-                    media_file = self._download_image(
-                        image_data['url'],
-                        f"item_{item.hash}_{image_data.get('order', 0)}"
-                    )
-                    if media_file:
-                        CollectionItemImage.objects.create(
-                            item=item,
-                            media_file=media_file,
-                            is_default=image_data.get('is_default', False),
-                            order=image_data.get('order', 0),
-                            created_by=target_user
-                        )
-                        stats['images_downloaded'] += 1
-                        
-                except Exception as e:
-                    self.warnings.append(f"Failed to download item image from {image_data['url']}: {str(e)}")
+        return item
+    
+    def _build_attribute_values(self, item_data: Dict, item: 'CollectionItem', 
+                                target_user: User) -> List['CollectionItemAttributeValue']:
+        """Build unsaved, validated attribute values of an item"""
+        attribute_values = []
+        for attribute_name, value in (item_data.get('attributes') or {}).items():
+            item_attribute = self.item_attributes.get((item.item_type_id, attribute_name))
+            if item_attribute is None:
+                self.warnings.append(f"Unknown attribute '{attribute_name}' for item '{item.name}', skipped")
+                continue
+            
+            attribute_value = CollectionItemAttributeValue(
+                item_attribute=item_attribute,
+                value=str(value),
+                created_by=target_user
+            )
+            try:
+                # Same validation and typed columns as CollectionItemAttributeValue.save()
+                if not item_attribute.skip_validation:
+                    attribute_value.validate()
+                attribute_value.sync_typed_columns()
+            except ValidationError as e:
+                self.warnings.append(f"Invalid value for '{attribute_name}' of item '{item.name}': {'; '.join(e.messages)}")
+                continue
+            attribute_values.append(attribute_value)
+        return attribute_values
+    
+    def _build_images(self, item_data: Dict, item: 'CollectionItem', target_user: User) -> List['CollectionItemImage']:
+        """Build unsaved images of an item from prefetched MediaFiles"""
+        images = {}
         
-        # Process image_url field (single image download)
-        if download_images and item_data.get('image_url'):
+        image_sources = [
+            (image_data['url'], image_data.get('is_default', False), image_data.get('order', 0), image_data.get('order', 0))
+            for image_data in item_data.get('images', [])
+        ]
+        # Single main image is default
+        if item_data.get('image_url'):
+            image_sources.append((item_data['image_url'], True, 0, 'main'))
+        
+        for url, is_default, order, suffix in image_sources:
             try:
-                media_file = self._download_image(
-                    item_data['image_url'],
-                    f"item_{item.hash}_main"
-                )
-                if media_file:
-                    CollectionItemImage.objects.create(
-                        item=item,
-                        media_file=media_file,
-                        is_default=True,  # Single image is default
-                        order=0,
-                        created_by=target_user
-                    )
-                    stats['images_downloaded'] += 1
-                    
+                media_file = self._download_image(url, f"item_{item.hash}_{suffix}")
             except Exception as e:
-                self.warnings.append(f"Failed to download item image from {item_data['image_url']}: {str(e)}")
+                self.warnings.append(f"Failed to download item image from {url}: {str(e)}")
+                continue
+            if not media_file:
+                continue
+            if media_file.pk in images:
+                # Same image listed twice: one row, default if either asks for it
+                images[media_file.pk].is_default = images[media_file.pk].is_default or is_default
+                continue
+            images[media_file.pk] = CollectionItemImage(
+                media_file=media_file,
+                is_default=is_default,
+                order=order,
+                created_by=target_user
+            )
+        
+        # Exactly one default image, like CollectionItemImage.save(): the last one asked for, else the first
+        images = list(images.values())
+        if images:
+            defaults = [image for image in images if image.is_default]
+            default_image = defaults[-1] if defaults else images[0]
+            for image in images:
+                image.is_default = image is default_image
+        return images
+    
+    def _insert_items(self, items_data: List[Dict], collection: 'Collection', 
+                      target_user: User, download_images: bool) -> Dict:
+        """
+        Insert a chunk of items with their attribute values, links and images
         
-        # Process links
-        for link_data in item_data.get('links', []):
+        Rows are built in memory and written with one bulk_create per table,
+        so no per-row save() or signal runs; the search documents are written
+        here and the facet counts and timestamps once per collection in
+        _finish_collection().
+        """
+        stats = {
+            'items_created': 0,
+            'images_downloaded': 0,
+            'links_created': 0,
+            'attribute_values_created': 0
+        }
+        
+        rows = []
+        for item_data in items_data:
             try:
-                # Find matching link pattern
-                link_pattern = LinkPattern.find_matching_pattern(link_data['url'])
-                
-                CollectionItemLink.objects.create(
-                    item=item,
-                    url=link_data['url'],
-                    display_name=link_data.get('display_name', ''),
-                    link_pattern=link_pattern,
-                    order=link_data.get('order', 0),
-                    created_by=target_user
-                )
-                stats['links_created'] += 1
-                
+                item = self._build_item(item_data, collection, target_user)
+                rows.append((
+                    item,
+                    self._build_attribute_values(item_data, item, target_user),
+                    item_data.get('links', []),
+                    self._build_images(item_data, item, target_user) if download_images else []
+                ))
             except Exception as e:
-                self.warnings.append(f"Failed to create link for item '{item.name}': {str(e)}")
+                error_msg = f"Failed to create item '{item_data.get('name', 'Unknown')}': {str(e)}"
+                self.errors.append(error_msg)
         
-        return item, stats
+        if not rows:
+            return stats
+        
+        items = CollectionItem.objects.bulk_create([item for item, _values, _links, _images in rows], batch_size=self.chunk_size)
+        stats['items_created'] = len(items)
+        
+        attribute_values = []
+        item_links = []
+        images = []
+        for item, item_attribute_values, links_data, item_images in rows:
+            for attribute_value in item_attribute_values:
+                attribute_value.item = item
+                attribute_values.append(attribute_value)
+            item_links.extend((item, link_data) for link_data in links_data)
+            for image in item_images:
+                image.item = item
+                images.append(image)
+        links = self._build_links(item_links, target_user)
+        
+        CollectionItemAttributeValue.objects.bulk_create(attribute_values, batch_size=self.chunk_size)
+        CollectionItemLink.objects.bulk_create(links, batch_size=self.chunk_size)
+        CollectionItemImage.objects.bulk_create(images, batch_size=self.chunk_size)
+        stats['attribute_values_created'] = len(attribute_values)
+        stats['links_created'] = len(links)
+        stats['images_downloaded'] = len(images)
+        
+        # Images shared with a collection header are item images again (as in CollectionItemImage.save())
+        if images:
+            MediaFile.objects.filter(pk__in={image.media_file_id for image in images}).exclude(
+                media_type=MediaFile.MediaType.COLLECTION_ITEM
+            ).update(media_type=MediaFile.MediaType.COLLECTION_ITEM)
+        
+        self._write_search_documents([item.pk for item in items])
+        
+        return stats
     
-    def _download_image(self, url: str, filename_prefix: str) -> Optional['MediaFile']:
-        """Download image from URL and create MediaFile"""
-        if url in self.downloaded_images:
-            return self.downloaded_images[url]
+    def _build_links(self, item_links: List[Tuple['CollectionItem', Dict]], target_user: User) -> List['CollectionItemLink']:
+        """Build unsaved links from (item, link data) pairs; link patterns are matched in one pass"""
+        link_patterns = LinkPattern.find_matching_patterns([link_data.get('url', '') for _item, link_data in item_links])
+        return [
+            CollectionItemLink(
+                item=item,
+                url=link_data['url'],
+                display_name=link_data.get('display_name', ''),
+                link_pattern=link_pattern,
+                order=link_data.get('order', 0),
+                created_by=target_user
+            )
+            for (item, link_data), link_pattern in zip(item_links, link_patterns)
+        ]
+    
+    def _write_search_documents(self, item_ids: List[int], replace: bool = False) -> None:
+        """Build the search documents of bulk-written items (replacing their old ones if `replace`)"""
+        if not item_ids:
+            return
+        if replace:
+            ItemSearchDocument.objects.filter(item_id__in=item_ids).delete()
+        documents = [
+            ItemSearchDocument(item_id=item.pk, document=ItemSearchDocument.build_document(item))
+            for item in CollectionItem.objects.filter(pk__in=item_ids).prefetch_related(*ItemSearchDocument.PREFETCH)
+        ]
+        ItemSearchDocument.objects.bulk_create(documents, batch_size=self.chunk_size)
+    
+    def _record_change(self, change: str) -> None:
+        if len(self.changes) < MAX_REPORTED_CHANGES:
+            self.changes.append(change)
+    
+    def _match_items(self, items_data: List[Dict], current: Dict) -> Tuple[List[Dict], Dict[int, Dict]]:
+        """
+        Upsert: split a chunk by natural key into new items and updates of stored items
         
-        try:
-            # Download the image
-            response = requests.get(url, timeout=30, headers={
-                'User-Agent': 'Beryl3-Import/1.0'
-            })
-            response.raise_for_status()
+        Returns:
+            Tuple of (item records to insert, {stored item id: item record})
+        """
+        new_items = []
+        updates = {}
+        for item_data in items_data:
+            key = _item_key(item_data.get('your_id'), item_data['name'])
+            if key in current['seen_keys']:
+                self.warnings.append(f"Item '{item_data['name']}' appears twice in collection '{current['name']}', the repeat was skipped")
+                continue
+            current['seen_keys'].add(key)
             
-            # Validate it's an image
-            try:
-                img = PILImage.open(BytesIO(response.content))
-                img.verify()  # Verify it's a valid image
-            except Exception:
-                raise ValueError("Downloaded content is not a valid image")
+            item_id = current['existing'].get(key)
+            if item_id is None:
+                new_items.append(item_data)
+                self._record_change(f"+ item '{item_data['name']}' in '{current['name']}'")
+            else:
+                updates[item_id] = item_data
+        return new_items, updates
+    
+    def _update_items(self, updates: Dict[int, Dict], collection: 'Collection', target_user: User) -> Dict:
+        """
+        Upsert: diff stored items against their import records and write only the changes
+        
+        Changed fields are written with one bulk_update; changed attribute
+        values and links are replaced (the old rows soft-deleted), and the
+        search documents of changed items rebuilt. Images are not compared.
+        
+        Only values of attributes the import can set (those of the item's
+        item type, with a valid value or none in the record) are compared and
+        replaced; stored values of other attributes are kept.
+        """
+        stats = {
+            'items_updated': 0,
+            'items_unchanged': 0,
+            'links_created': 0,
+            'attribute_values_created': 0
+        }
+        fields = [CollectionItem._meta.get_field(name) for name in UPSERT_ITEM_FIELDS]
+        now = timezone.now()
+        
+        # Attribute ids the import resolves, by item type
+        type_attribute_ids = {}
+        for (item_type_id, _name), attribute in self.item_attributes.items():
+            type_attribute_ids.setdefault(item_type_id, set()).add(attribute.pk)
+        
+        changed_items = []
+        changed_fields = set()
+        attribute_values = []
+        replaced_value_ids = []
+        item_links = []
+        replaced_links = []
+        for item in CollectionItem.objects.filter(pk__in=updates).prefetch_related('attribute_values__item_attribute', 'links'):
+            item_data = updates[item.pk]
+            desired = self._build_item(item_data, collection, target_user)
             
-            # Generate filename
-            parsed_url = urlparse(url)
-            original_name = os.path.basename(parsed_url.path)
-            if not original_name or '.' not in original_name:
-                # Guess extension from content type
-                content_type = response.headers.get('content-type', '').lower()
-                if 'jpeg' in content_type or 'jpg' in content_type:
-                    ext = '.jpg'
-                elif 'png' in content_type:
-                    ext = '.png'
-                elif 'gif' in content_type:
-                    ext = '.gif'
-                elif 'webp' in content_type:
-                    ext = '.webp'
-                else:
-                    ext = '.jpg'  # Default
-                original_name = f"image{ext}"
+            item_changes = [
+                field.name for field in fields
+                if _normalized(getattr(item, field.attname)) != _normalized(getattr(desired, field.attname))
+            ]
             
-            filename = f"{filename_prefix}_{original_name}"
+            values = self._build_attribute_values(item_data, desired, target_user)
+            resolved = type_attribute_ids.get(desired.item_type_id, set())
+            # Invalid values in the record were skipped (with a warning): keep the stored ones
+            invalid = {
+                self.item_attributes[(desired.item_type_id, name)].pk
+                for name in (item_data.get('attributes') or {})
+                if (desired.item_type_id, name) in self.item_attributes
+            } - {value.item_attribute_id for value in values}
+            compared = resolved - invalid
             
-            # Save file to storage
-            from django.core.files.storage import default_storage
-            content_file = ContentFile(response.content, name=filename)
-            file_path = f"items/{filename}"
-            saved_path = default_storage.save(file_path, content_file)
+            stored_values = list(item.attribute_values.all())
+            unresolved = sorted({value.item_attribute.name for value in stored_values if value.item_attribute_id not in resolved})
+            if unresolved:
+                self.warnings.append(f"Item '{item.name}' in '{collection.name}' keeps values of attributes not in its item type: {', '.join(unresolved)}")
+            stored_values = [value for value in stored_values if value.item_attribute_id in compared]
             
-            # Get image dimensions
-            try:
-                img = PILImage.open(BytesIO(response.content))
-                width, height = img.size
-            except Exception:
-                width, height = None, None
+            if sorted((value.item_attribute_id, value.value) for value in values) != sorted(
+                (value.item_attribute_id, value.value) for value in stored_values
+            ):
+                item_changes.append('attributes')
+                replaced_value_ids.extend(value.pk for value in stored_values)
+                for value in values:
+                    value.item = item
+                attribute_values.extend(values)
+            
+            links_data = item_data.get('links', [])
+            if sorted((link['url'], link.get('display_name', ''), link.get('order', 0)) for link in links_data) != sorted(
+                (link.url, link.display_name or '', link.order) for link in item.links.all()
+            ):
+                item_changes.append('links')
+                replaced_links.append(item.pk)
+                item_links.extend((item, link_data) for link_data in links_data)
             
-            # Determine storage backend based on Django storage backend
-            storage_backend = MediaFile.StorageBackend.LOCAL
-            if hasattr(default_storage, '__class__'):
-                storage_class_name = default_storage.__class__.__name__
-                if 'gcs' in storage_class_name.lower() or 'google' in storage_class_name.lower():
-                    storage_backend = MediaFile.StorageBackend.GCS
-                elif 's3' in storage_class_name.lower():
-                    storage_backend = MediaFile.StorageBackend.S3
+            if not item_changes:
+                stats['items_unchanged'] += 1
+                continue
+            
+            for field in fields:
+                if field.name in item_changes:
+                    setattr(item, field.attname, getattr(desired, field.attname))
+                    changed_fields.add(field.name)
+            item.updated = now
+            changed_items.append(item)
+            self._record_change(f"~ item '{item.name}' in '{collection.name}': {', '.join(item_changes)}")
+        
+        if not changed_items:
+            return stats
+        
+        CollectionItem.objects.bulk_update(changed_items, sorted(changed_fields) + ['updated'], batch_size=self.chunk_size)
+        if replaced_value_ids:
+            CollectionItemAttributeValue.objects.filter(pk__in=replaced_value_ids).update(is_deleted=True, updated=now)
+        if attribute_values:
+            CollectionItemAttributeValue.objects.bulk_create(attribute_values, batch_size=self.chunk_size)
+        if replaced_links:
+            CollectionItemLink.objects.filter(item_id__in=replaced_links).update(is_deleted=True, updated=now)
+            CollectionItemLink.objects.bulk_create(self._build_links(item_links, target_user), batch_size=self.chunk_size)
+        self._write_search_documents([item.pk for item in changed_items], replace=True)
+        
+        stats['items_updated'] = len(changed_items)
+        stats['attribute_values_created'] = len(attribute_values)
+        stats['links_created'] = len(item_links)
+        return stats
+    
+    def _delete_missing_items(self, collection: 'Collection', current: Dict) -> int:
+        """Upsert with delete_missing: soft-delete the stored items the import no longer contains"""
+        missing = [item_id for key, item_id in current['existing'].items() if key not in current['seen_keys']]
+        keep_statuses = (CollectionItem.Status.LENT_OUT, CollectionItem.Status.RESERVED)
+        now = timezone.now()
+        
+        deleted = 0
+        for offset in range(0, len(missing), self.chunk_size):
+            item_ids = []
+            for item_id, name, status in CollectionItem.objects.filter(
+                pk__in=missing[offset:offset + self.chunk_size]
+            ).values_list('pk', 'name', 'status'):
+                # Same rule as CollectionItem.delete()
+                if status in keep_statuses:
+                    self.warnings.append(f"Item '{name}' of collection '{collection.name}' is not in the import but is {status.lower().replace('_', ' ')}, not deleted")
+                    continue
+                item_ids.append(item_id)
+                self._record_change(f"- item '{name}' in '{collection.name}'")
             
-            # Create MediaFile
-            media_file = MediaFile.objects.create(
-                file_path=saved_path,
-                original_filename=original_name,
-                file_size=len(response.content),
-                content_type=response.headers.get('content-type', 'image/jpeg'),
-                media_type=MediaFile.MediaType.COLLECTION_ITEM,
-                storage_backend=storage_backend,
-                width=width,
-                height=height,
-                created_by=self.target_user
+            with transaction.atomic():
+                CollectionItem.objects.filter(pk__in=item_ids).update(is_deleted=True, updated=now)
+                ItemSearchDocument.objects.filter(item_id__in=item_ids).delete()
+            deleted += len(item_ids)
+        return deleted
+    
+    def _finish_collection(self, collection: 'Collection', target_user: User, attribute_values_created: int) -> None:
+        """Once per collection: what the per-row signals would have done for the bulk-inserted items"""
+        rebuild_collection_facets(collection.pk)
+        Collection.objects.filter(pk=collection.pk).update(updated=timezone.now())
+        bump_collection_generation([collection.pk])
+        if attribute_values_created:
+            bump_user_generation([target_user.pk])
+    
+    def _prefetch_urls(self, urls: List[str]) -> float:
+        """
+        Download image URLs concurrently and create their MediaFiles
+        
+        Returns:
+            Seconds spent downloading
+        """
+        urls = [url for url in dict.fromkeys(urls) if url not in self.image_ids and url not in self.failed_images]
+        if not urls:
+            return 0.0
+        
+        prefetcher = ImagePrefetcher(session=self.session)
+        self.session = prefetcher.session
+        
+        def on_result(url, outcome):
+            if self.heartbeat:
+                self.heartbeat()
+            if isinstance(outcome, Exception):
+                self.failed_images[url] = str(outcome)
+                return
+            try:
+                media_file = self._create_media_file(url, outcome)
+                self.downloaded_images[url] = media_file
+                self.image_ids[url] = media_file.pk
+            except Exception as e:
+                self.failed_images[url] = f"Failed to process image: {str(e)}"
+        
+        stats = prefetcher.fetch_all(urls, 'items', on_result=on_result)
+        logger.info("Import: prefetched %d of %d images in %.1fs", stats['downloaded'], len(urls), stats['duration'])
+        return stats['duration']
+    
+    def _storage_backend(self) -> str:
+        """Storage backend of new MediaFiles, based on the Django storage backend"""
+        from django.core.files.storage import default_storage
+        storage_class_name = default_storage.__class__.__name__.lower()
+        if 'gcs' in storage_class_name or 'google' in storage_class_name:
+            return MediaFile.StorageBackend.GCS
+        if 's3' in storage_class_name:
+            return MediaFile.StorageBackend.S3
+        return MediaFile.StorageBackend.LOCAL
+    
+    def _create_media_file(self, url: str, ingested) -> 'MediaFile':
+        """Create the MediaFile of a downloaded image"""
+        return MediaFile.objects.create(
+            file_path=ingested.file_path,
+            original_filename=ingested.original_filename,
+            file_size=ingested.size,
+            content_type=ingested.content_type,
+            media_type=MediaFile.MediaType.COLLECTION_ITEM,
+            storage_backend=self._storage_backend(),
+            width=ingested.width,
+            height=ingested.height,
+            created_by=self.target_user,
+            content_hash=ingested.sha256,
+            metadata={'source_url': url}
+        )
+    
+    def _download_image(self, url: str, filename_prefix: str) -> Optional['MediaFile']:
+        """MediaFile of an image URL: prefetched, or downloaded now if it was not collected"""
+        if url in self.downloaded_images:
+            return self.downloaded_images[url]
+        if url in self.failed_images:
+            raise Exception(self.failed_images[url])
+        if url in self.image_ids:
+            media_file = MediaFile.objects.filter(pk=self.image_ids[url]).first()
+            if media_file:
+                self.downloaded_images[url] = media_file
+                return media_file
+        
+        try:
+            # Stream the image to storage (size-capped, signature-checked)
+            ingested = ingest_image_url(
+                url,
+                'items',
+                filename_prefix=filename_prefix,
+                session=self.session,
+                headers={'User-Agent': USER_AGENT}
             )
+            media_file = self._create_media_file(url, ingested)
             
             self.downloaded_images[url] = media_file
+            self.image_ids[url] = media_file.pk
             return media_file
             
-        except requests.RequestException as e:
-            raise Exception(f"Failed to download image: Network error - {str(e)}")
+        except ImageIngestError as e:
+            raise Exception(str(e))
         except Exception as e:
             raise Exception(f"Failed to process image: {str(e)}")
     
@@ -439,6 +1039,20 @@ Statistics:
 
 """
         
+        if result.get('mode') == MODE_UPSERT:
+            report += f"""Upsert{' (DRY RUN - nothing was changed)' if result.get('dry_run') else ''}:
+- Collections updated: {result['collections_updated']}
+- Items updated: {result['items_updated']}
+- Items unchanged: {result['items_unchanged']}
+- Items deleted: {result['items_deleted']}
+
+"""
+            if result['changes']:
+                report += "Changes:\n" + "\n".join(result['changes']) + "\n"
+                if len(result['changes']) >= MAX_REPORTED_CHANGES:
+                    report += f"... only the first {MAX_REPORTED_CHANGES} changes are listed\n"
+                report += "\n"
+        
         if result['warnings']:
             report += f"Warnings ({len(result['warnings'])}):\n"
             for i, warning in enumerate(result['warnings'], 1):
@@ -4,6 +4,22 @@ Beryl3 Data Import Schema Definition
 
 This module defines the JSON/YAML schema for comprehensive data imports.
 Supports Collections, Items, Links, Images, and all associated metadata.
+
+Large imports use the streaming JSON Lines format instead: one record per
+line, each validated on its own against a sub-schema of IMPORT_SCHEMA
+(JSONL_RECORD_SCHEMAS):
+
+    {"type": "header", "version": "1.0", "metadata": {...}, "options": {...}}
+    {"type": "item_type", "name": "vinyl_record", "display_name": "Vinyl Record", ...}
+    {"type": "collection", "name": "My Vinyl Collection", ...}
+    {"type": "item", "name": "Abbey Road", ...}
+
+The header comes first; items belong to the collection record before them.
+
+Re-imports: with the header option `"mode": "upsert"` collections are
+matched by name and items by `your_id` (or their name without one), so
+running the same import again updates the changed items instead of
+creating duplicates (see import_processor.py).
 """
 
 # JSON Schema for Beryl3 Import Format
@@ -45,6 +61,18 @@ IMPORT_SCHEMA = {
                     "enum": ["PRIVATE", "UNLISTED", "PUBLIC"],
                     "default": "PRIVATE",
                     "description": "Default visibility for imported collections"
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": ["create", "upsert"],
+                    "default": "create",
+                    "description": "create: always create new collections and items; upsert: update collections "
+                                   "matched by name and items matched by your_id (or name) instead"
+                },
+                "delete_missing": {
+                    "type": "boolean",
+                    "default": False,
+                    "description": "Upsert: delete items of matched collections that are not in the import"
                 }
             }
         },
@@ -89,6 +117,11 @@ IMPORT_SCHEMA = {
                             "required": ["name"],
                             "properties": {
                                 "name": {"type": "string", "maxLength": 255},
+                                "your_id": {
+                                    "type": "string",
+                                    "maxLength": 100,
+                                    "description": "Stable identifier of the item (e.g. its id in the source system); the upsert key"
+                                },
                                 "description": {"type": "string"},
                                 "status": {
                                     "type": "string",
@@ -176,10 +209,10 @@ IMPORT_SCHEMA = {
                                 "display_name": {"type": "string"},
                                 "attribute_type": {
                                     "type": "string",
-                                    "enum": ["TEXT", "NUMBER", "DATE", "BOOLEAN", "CHOICE", "URL"]
+                                    "enum": ["TEXT", "LONG_TEXT", "NUMBER", "DATE", "BOOLEAN", "CHOICE", "URL"]
                                 },
                                 "required": {"type": "boolean", "default": False},
-                                "order": {"type": "integer", "minimum": 1},
+                                "order": {"type": "integer", "minimum": 0},
                                 "choices": {
                                     "type": "string",
                                     "description": "JSON array of choices for CHOICE type"
@@ -296,4 +329,29 @@ EXAMPLE_IMPORT_DATA = {
             ]
         }
     ]
-}
\ No newline at end of file
+}
+
+
+# JSON Lines import format: record type -> schema of one record
+_COLLECTION_SCHEMA = IMPORT_SCHEMA["properties"]["collections"]["items"]
+
+JSONL_RECORD_SCHEMAS = {
+    "header": {
+        "type": "object",
+        "required": ["version"],
+        "properties": {
+            "version": IMPORT_SCHEMA["properties"]["version"],
+            "metadata": IMPORT_SCHEMA["properties"]["metadata"],
+            "options": IMPORT_SCHEMA["properties"]["options"],
+        }
+    },
+    "item_type": IMPORT_SCHEMA["properties"]["item_types"]["items"],
+    # Collection records carry no items: the item records following them do
+    "collection": {
+        **_COLLECTION_SCHEMA,
+        "properties": {
+            name: schema for name, schema in _COLLECTION_SCHEMA["properties"].items() if name != "items"
+        },
+    },
+    "item": _COLLECTION_SCHEMA["properties"]["items"]["items"],
+}
@@ -4,6 +4,11 @@ Import File Validation Module
 
 Validates JSON/YAML import files against the Beryl3 import schema.
 Provides comprehensive error reporting and data validation.
+
+JSON Lines imports (see import_schema.py) are validated as a stream: each
+line is parsed and checked against the compiled schema of its record type
+as it is read, so memory does not grow with the file and every error
+carries its line number.
 """
 
 import json
@@ -16,7 +21,20 @@ import jsonschema
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator, EmailValidator
 
-from .import_schema import IMPORT_SCHEMA
+from .import_schema import IMPORT_SCHEMA, JSONL_RECORD_SCHEMAS
+
+# Errors kept in a validation result (the rest are only counted)
+MAX_REPORTED_ERRORS = 100
+
+# Collections and items per collection shown in the import preview
+PREVIEW_COLLECTIONS = 50
+PREVIEW_ITEMS = 3
+
+# Schema validators of the JSON Lines record types, compiled once
+_validator_class = jsonschema.validators.validator_for(IMPORT_SCHEMA)
+JSONL_VALIDATORS = {
+    record_type: _validator_class(schema) for record_type, schema in JSONL_RECORD_SCHEMAS.items()
+}
 
 
 class ImportValidationError(Exception):
@@ -27,6 +45,58 @@ class ImportValidationError(Exception):
         super().__init__(self.message)
 
 
+def iter_jsonl_records(lines):
+    """
+    Parse a JSON Lines import stream one line at a time
+    
+    Args:
+        lines: Iterable of lines (bytes or str), e.g. an open file or an UploadedFile
+        
+    Yields:
+        Tuple of (line_number, record dict or ImportValidationError); blank lines are skipped
+    """
+    for line_number, line in enumerate(lines, 1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+        except UnicodeDecodeError as e:
+            yield line_number, ImportValidationError(f"Line is not valid UTF-8: {str(e)}")
+            continue
+        except json.JSONDecodeError as e:
+            yield line_number, ImportValidationError(f"JSON parsing error: {str(e)}")
+            continue
+        
+        if not isinstance(record, dict):
+            yield line_number, ImportValidationError("Each line must contain a JSON object")
+            continue
+        yield line_number, record
+
+
+def iter_document_records(data: Dict[str, Any]):
+    """
+    Records of a parsed JSON/YAML import document, in JSON Lines order
+    
+    Yields:
+        Tuple of (None, record dict)
+    """
+    yield None, {
+        'type': 'header',
+        'version': data.get('version'),
+        'metadata': data.get('metadata', {}),
+        'options': data.get('options', {}),
+    }
+    for item_type in data.get('item_types', []):
+        yield None, {**item_type, 'type': 'item_type'}
+    for collection in data.get('collections', []):
+        yield None, {**{key: value for key, value in collection.items() if key != 'items'}, 'type': 'collection'}
+        for item in collection.get('items', []):
+            yield None, {**item, 'type': 'item'}
+
+
 class ImportValidator:
     """
     Validates import files and provides detailed error reporting
@@ -116,35 +186,12 @@ class ImportValidator:
         collections = data.get('collections', [])
         for col_idx, collection in enumerate(collections):
             col_path = f"collections[{col_idx}]"
-            
-            # Validate collection images
-            images = collection.get('images', [])
-            self._validate_images(images, f"{col_path}.images", errors)
+            self._validate_collection_record(collection, col_path, errors)
             
             # Validate items
             items = collection.get('items', [])
             for item_idx, item in enumerate(items):
-                item_path = f"{col_path}.items[{item_idx}]"
-                
-                # Validate item images
-                item_images = item.get('images', [])
-                self._validate_images(item_images, f"{item_path}.images", errors)
-                
-                # Validate links
-                links = item.get('links', [])
-                self._validate_links(links, f"{item_path}.links", errors)
-                
-                # Validate reservation data
-                if item.get('status') == 'RESERVED':
-                    reservation = item.get('reservation')
-                    if not reservation:
-                        errors.append({
-                            'type': 'business_rule_error',
-                            'path': item_path,
-                            'message': 'Items with RESERVED status must include reservation details'
-                        })
-                    else:
-                        self._validate_reservation(reservation, f"{item_path}.reservation", errors)
+                self._validate_item_record(item, f"{col_path}.items[{item_idx}]", errors)
         
         # Validate item types
         item_types = data.get('item_types', [])
@@ -154,6 +201,34 @@ class ImportValidator:
         
         return errors
     
+    def _validate_collection_record(self, collection: Dict, path: str, errors: List[Dict]):
+        """Validate a collection (without its items)"""
+        # Validate collection images
+        images = collection.get('images', [])
+        self._validate_images(images, f"{path}.images", errors)
+    
+    def _validate_item_record(self, item: Dict, path: str, errors: List[Dict]):
+        """Validate a single item"""
+        # Validate item images
+        item_images = item.get('images', [])
+        self._validate_images(item_images, f"{path}.images", errors)
+        
+        # Validate links
+        links = item.get('links', [])
+        self._validate_links(links, f"{path}.links", errors)
+        
+        # Validate reservation data
+        if item.get('status') == 'RESERVED':
+            reservation = item.get('reservation')
+            if not reservation:
+                errors.append({
+                    'type': 'business_rule_error',
+                    'path': path,
+                    'message': 'Items with RESERVED status must include reservation details'
+                })
+            else:
+                self._validate_reservation(reservation, f"{path}.reservation", errors)
+    
     def _validate_images(self, images: List[Dict], path: str, errors: List[Dict]):
         """Validate image array"""
         default_count = 0
@@ -322,6 +397,127 @@ class ImportValidator:
             })
             return {}, errors
     
+    def validate_jsonl_stream(self, lines, max_errors: int = MAX_REPORTED_ERRORS) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Validate a JSON Lines import stream record by record
+        
+        Args:
+            lines: Iterable of lines (an open file or an UploadedFile)
+            max_errors: Errors to keep (all errors are counted)
+            
+        Returns:
+            Tuple of (summary, errors). The summary holds the header metadata,
+            record counts and a preview of the first collections; errors carry
+            the line number of the offending record.
+        """
+        errors = []
+        summary = {
+            'metadata': {},
+            'options': {},
+            'collections': [],
+            'collection_count': 0,
+            'item_count': 0,
+            'item_type_count': 0,
+            'error_count': 0,
+            'lines': 0,
+        }
+        
+        def report(line_number, record_errors):
+            summary['error_count'] += len(record_errors)
+            for error in record_errors:
+                if len(errors) < max_errors:
+                    errors.append({**error, 'line': line_number})
+        
+        current_collection = None
+        seen_records = False
+        for line_number, record in iter_jsonl_records(lines):
+            summary['lines'] = line_number
+            
+            if isinstance(record, ImportValidationError):
+                report(line_number, [{'type': 'parsing_error', 'message': record.message}])
+                continue
+            
+            record_type = record.get('type')
+            validator = JSONL_VALIDATORS.get(record_type)
+            if validator is None:
+                report(line_number, [{
+                    'type': 'schema_error',
+                    'path': ['type'],
+                    'message': f"Unknown record type {record_type!r}, expected one of: {', '.join(JSONL_VALIDATORS)}"
+                }])
+                continue
+            
+            record_errors = [
+                {
+                    'type': 'schema_error',
+                    'path': list(error.absolute_path),
+                    'message': error.message,
+                    'invalid_value': error.instance
+                }
+                for error in validator.iter_errors(record)
+            ]
+            
+            if record_type == 'header':
+                if seen_records:
+                    record_errors.append({'type': 'business_rule_error', 'message': 'The header must be the first record'})
+                summary['metadata'] = record.get('metadata', {})
+                summary['options'] = record.get('options', {})
+            elif not seen_records:
+                record_errors.append({'type': 'business_rule_error', 'message': 'The first record must be the header (type "header")'})
+            seen_records = True
+            
+            # Business rules only for records that match their schema
+            if not record_errors:
+                if record_type == 'item_type':
+                    summary['item_type_count'] += 1
+                    self._validate_item_type(record, record_type, record_errors)
+                elif record_type == 'collection':
+                    summary['collection_count'] += 1
+                    self._validate_collection_record(record, record_type, record_errors)
+                    if 'items' in record:
+                        record_errors.append({
+                            'type': 'business_rule_error',
+                            'path': ['items'],
+                            'message': 'Collection records carry no items: write each item as an "item" record after its collection'
+                        })
+                    current_collection = None
+                    if len(summary['collections']) < PREVIEW_COLLECTIONS:
+                        current_collection = {
+                            'name': record['name'],
+                            'description': record.get('description', ''),
+                            'visibility': record.get('visibility', 'PRIVATE'),
+                            'images': record.get('images', []),
+                            'items': [],
+                            'item_count': 0,
+                        }
+                        summary['collections'].append(current_collection)
+                elif record_type == 'item':
+                    if summary['collection_count'] == 0:
+                        record_errors.append({
+                            'type': 'business_rule_error',
+                            'message': 'Item records must follow a collection record'
+                        })
+                    else:
+                        summary['item_count'] += 1
+                        self._validate_item_record(record, record_type, record_errors)
+                        if current_collection is not None:
+                            current_collection['item_count'] += 1
+                            if len(current_collection['items']) < PREVIEW_ITEMS:
+                                current_collection['items'].append({
+                                    'name': record['name'],
+                                    'status': record.get('status', 'IN_COLLECTION'),
+                                    'item_type': record.get('item_type', ''),
+                                })
+            
+            report(line_number, record_errors)
+        
+        if not seen_records:
+            report(0, [{'type': 'parsing_error', 'message': 'Import file is empty'}])
+        elif summary['collection_count'] == 0:
+            report(summary['lines'], [{'type': 'business_rule_error', 'message': 'Import file must contain at least one collection record'}])
+        
+        return summary, errors
+    
     def generate_validation_report(self, errors: List[Dict[str, Any]]) -> str:
         """
         Generate a human-readable validation report
@@ -343,6 +539,8 @@ class ImportValidator:
             path = error.get('path')
             
             report += f"{i}. {error_type.upper().replace('_', ' ')}\n"
+            if error.get('line'):
+                report += f"   Line: {error['line']}\n"
             if path:
                 if isinstance(path, list):
                     path_str = '.'.join(map(str, path))
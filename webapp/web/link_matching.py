@@ -0,0 +1,183 @@
+"""
+Link Pattern Matching
+=====================
+
+Matches link URLs against the active LinkPatterns without a query and an
+fnmatch translation per pattern per link.
+
+Patterns are compiled once per process and bucketed by host: a pattern
+like `https://www.amazon.de/*` can only match URLs on www.amazon.de, so a
+URL is only tested against the patterns of its own host plus the patterns
+whose host contains wildcards. The first match in LinkPattern ordering
+(display name) wins, as with LinkPattern.find_matching_pattern().
+
+The compiled matcher is rebuilt when the patterns change. Their version is
+read from the database: the latest `updated`, the row count and the number
+of live active patterns of LinkPattern, plus a CacheGeneration counter
+bumped whenever a pattern is saved or (soft) deleted, since a soft delete
+leaves `updated` alone. So changes made by another process,
+`populate_link_patterns` included, are picked up too. A process checks the
+version at most every VERSION_CHECK_INTERVAL seconds; in the process that
+saved or deleted a pattern, the signal handler makes the next lookup check
+right away.
+"""
+
+import fnmatch
+import logging
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.db.models import Count, Max, Q
+
+from web.cache_generations import bump_generations, get_generation
+
+logger = logging.getLogger("webapp")
+
+# Seconds a process uses its matcher before checking the pattern version again
+VERSION_CHECK_INTERVAL = 10
+
+# CacheGeneration scope bumped on every pattern save and delete
+VERSION_SCOPE = "link_patterns"
+
+_WILDCARD_CHARS = set("*?[")
+
+
+def bump_link_pattern_version() -> None:
+    """
+    Change the pattern version in the database and make this process check it
+    on next use (others check within VERSION_CHECK_INTERVAL)
+    """
+    global _version_checked_at  # pylint: disable=global-statement
+    bump_generations([VERSION_SCOPE])
+    _version_checked_at = None
+
+
+def _get_version():
+    """Version of the link patterns in the database: (latest update, row count, live count, generation)"""
+    from web.models import LinkPattern
+
+    version = LinkPattern.objects.all_with_deleted().aggregate(
+        latest=Max('updated'),
+        count=Count('pk'),
+        live=Count('pk', filter=Q(is_deleted=False, is_active=True))
+    )
+    return version['latest'], version['count'], version['live'], get_generation(VERSION_SCOPE)
+
+
+def _url_host(url: str) -> str:
+    try:
+        return urlsplit(url).netloc
+    except ValueError:
+        return ""
+
+
+def _pattern_host(url_pattern: str):
+    """Literal host of a pattern, or None if the host (or scheme) contains wildcards"""
+    host = _url_host(url_pattern)
+    if not host or _WILDCARD_CHARS.intersection(host):
+        return None
+    return host
+
+
+class LinkPatternMatcher:
+    """
+    Compiled set of link patterns.
+
+    Args:
+        patterns: LinkPattern objects in priority order
+    """
+
+    def __init__(self, patterns):
+        self._by_host = {}
+        self._wildcard_host = []
+
+        for position, pattern in enumerate(patterns):
+            url_pattern = pattern.url_pattern.lower()
+            entry = (position, re.compile(fnmatch.translate(url_pattern)), pattern)
+            host = _pattern_host(url_pattern)
+            if host is None:
+                self._wildcard_host.append(entry)
+            else:
+                self._by_host.setdefault(host, []).append(entry)
+
+        self.pattern_count = sum(len(entries) for entries in self._by_host.values()) + len(self._wildcard_host)
+        self._candidates = {}
+
+    def _candidates_for_host(self, host):
+        """Patterns that can match a URL on `host`, in priority order (cached per host)"""
+        candidates = self._candidates.get(host)
+        if candidates is None:
+            candidates = sorted(self._by_host.get(host, []) + self._wildcard_host, key=lambda entry: entry[0])
+            candidates = [(regex, pattern) for _position, regex, pattern in candidates]
+            if len(self._candidates) < 10000:
+                self._candidates[host] = candidates
+        return candidates
+
+    def match(self, url):
+        """
+        First pattern matching a URL.
+
+        Returns:
+            LinkPattern or None
+        """
+        if not url:
+            return None
+        url = url.lower()
+        for regex, pattern in self._candidates_for_host(_url_host(url)):
+            if regex.match(url):
+                return pattern
+        return None
+
+    def match_many(self, urls):
+        """
+        Match several URLs at once.
+
+        Returns:
+            list: LinkPattern or None per URL, in the order of `urls`
+        """
+        results = {}
+        for url in urls:
+            if url not in results:
+                results[url] = self.match(url)
+        return [results[url] for url in urls]
+
+
+_lock = threading.Lock()
+_matcher = None
+_matcher_version = None
+_version_checked_at = None
+
+
+def get_matcher() -> LinkPatternMatcher:
+    """Process-wide matcher over the active patterns, rebuilt when patterns change"""
+    global _matcher, _matcher_version, _version_checked_at  # pylint: disable=global-statement
+    from web.models import LinkPattern
+
+    matcher = _matcher
+    checked_at = _version_checked_at
+    if matcher is not None and checked_at is not None and time.monotonic() - checked_at < VERSION_CHECK_INTERVAL:
+        return matcher
+
+    version = _get_version()
+    _version_checked_at = time.monotonic()
+    if matcher is not None and _matcher_version == version:
+        return matcher
+
+    with _lock:
+        if _matcher is None or _matcher_version != version:
+            _matcher = LinkPatternMatcher(LinkPattern.objects.filter(is_active=True))
+            _matcher_version = version
+            logger.debug("link_matching: compiled %d link patterns (version %s)", _matcher.pattern_count, version)
+        return _matcher
+
+
+def match_link_pattern(url):
+    """First active LinkPattern matching a URL, or None"""
+    return get_matcher().match(url)
+
+
+def match_link_patterns(urls):
+    """Active LinkPattern (or None) for each URL, in order"""
+    return get_matcher().match_many(list(urls))
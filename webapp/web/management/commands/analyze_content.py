@@ -3,8 +3,8 @@ Management command for batch content analysis of uploaded images
 """
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
 from web.models import MediaFile
+from web.moderation_batch import BatchModerationEngine
 from web.services.content_moderation import content_moderation_service
 import logging
 
@@ -18,8 +18,15 @@ class Command(BaseCommand):
         parser.add_argument(
             '--batch-size',
             type=int,
-            default=50,
-            help='Number of files to process in each batch (default: 50)'
+            default=16,
+            help='Number of images per detector batch (default: 16)'
+        )
+        
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Inference processes, each with its own model instance (default: 1)'
         )
         
         parser.add_argument(
@@ -148,63 +155,46 @@ class Command(BaseCommand):
             )
             return
 
-        # Process in batches
-        processed = 0
-        approved = 0
-        flagged = 0
-        errors = 0
+        # Batched inference, optionally over several processes (see web/moderation_batch.py)
+        engine = BatchModerationEngine(
+            content_moderation_service,
+            workers=options['workers'],
+            batch_size=batch_size
+        )
+        self.stdout.write(f"Analyzing with {engine.workers} worker(s), {engine.batch_size} images per batch")
 
-        while processed < total_count:
-            # Get current batch
-            batch = list(query[processed:processed + batch_size])
-            
-            if not batch:
-                break
-
-            self.stdout.write(f"Processing batch {processed + 1}-{processed + len(batch)} of {total_count}")
-
-            for media_file in batch:
-                try:
-                    with transaction.atomic():
-                        result = media_file.analyze_content(force=force)
-                        processed += 1
-
-                        if result.get('status') == 'error':
-                            errors += 1
-                            self.stdout.write(
-                                self.style.ERROR(
-                                    f"  Error analyzing {media_file.original_filename}: "
-                                    f"{result.get('error')}"
-                                )
-                            )
-                        elif result.get('is_inappropriate'):
-                            flagged += 1
-                            action = result.get('action', 'none')
-                            self.stdout.write(
-                                self.style.WARNING(
-                                    f"  ⚠️  FLAGGED: {media_file.original_filename} "
-                                    f"(confidence: {result.get('confidence_score', 0):.2f}, "
-                                    f"action: {action})"
-                                )
-                            )
-                        else:
-                            approved += 1
-                            if options['verbosity'] >= 2:
-                                self.stdout.write(
-                                    f"  ✓ APPROVED: {media_file.original_filename}"
-                                )
-
-                except Exception as e:
-                    errors += 1
-                    logger.error(f"Error processing file {media_file.id}: {e}")
-                    self.stdout.write(
-                        self.style.ERROR(f"  Error processing {media_file.original_filename}: {e}")
+        def report(media_file, result):
+            if result.get('status') == 'error':
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"  Error analyzing {media_file.original_filename}: "
+                        f"{result.get('error')}"
                     )
+                )
+            elif result.get('is_inappropriate'):
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"  ⚠️  FLAGGED: {media_file.original_filename} "
+                        f"(confidence: {result.get('confidence_score', 0):.2f}, "
+                        f"action: {result.get('action', 'none')})"
+                    )
+                )
+            elif options['verbosity'] >= 2:
+                self.stdout.write(
+                    f"  ✓ APPROVED: {media_file.original_filename}"
+                )
+
+        result = engine.run(query, on_result=report)
+        processed = result['processed']
+        approved = result['approved']
+        flagged = result['flagged']
+        errors = result['errors']
 
         # Print summary
         self.stdout.write("\n" + "="*50)
         self.stdout.write(self.style.SUCCESS(f"Batch analysis completed!"))
         self.stdout.write(f"Total processed: {processed}")
+        self.stdout.write(f"Throughput: {result['images_per_second']:.1f} images/s ({result['duration']:.1f}s)")
         self.stdout.write(self.style.SUCCESS(f"Approved: {approved}"))
         
         if flagged > 0:
@@ -0,0 +1,89 @@
+"""
+Management command to populate the typed shadow columns of attribute values.
+
+CollectionItemAttributeValue keeps value_number, value_date and value_boolean
+in sync on save. Rows created before those columns existed (or written with
+queryset.update()) need a one-off backfill so database-side sorting and range
+filtering see them.
+"""
+
+from django.core.management.base import BaseCommand
+
+from web.models import CollectionItemAttributeValue
+
+
+class Command(BaseCommand):
+    help = 'Populate typed columns (number/date/boolean) for attribute values'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows written per bulk update (default: 1000)',
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only process rows where all typed columns are empty',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many rows would change without writing',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        queryset = CollectionItemAttributeValue.objects.all_with_deleted().select_related('item_attribute')
+        if options['only_missing']:
+            queryset = queryset.filter(
+                value_number__isnull=True,
+                value_date__isnull=True,
+                value_boolean__isnull=True,
+            )
+
+        total = queryset.count()
+        self.stdout.write(f'Scanning {total} attribute values...')
+
+        scanned = 0
+        changed = 0
+        batch = []
+
+        for attr_value in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            scanned += 1
+            before = tuple(getattr(attr_value, field) for field in CollectionItemAttributeValue.TYPED_FIELDS)
+            attr_value.sync_typed_columns()
+            after = tuple(getattr(attr_value, field) for field in CollectionItemAttributeValue.TYPED_FIELDS)
+
+            if before != after:
+                changed += 1
+                batch.append(attr_value)
+
+            if len(batch) >= batch_size:
+                self._flush(batch, dry_run)
+                batch = []
+                self.stdout.write(f'  {scanned}/{total} scanned, {changed} updated')
+
+        self._flush(batch, dry_run)
+
+        self.stdout.write('\n' + '=' * 60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: Would update {changed} of {scanned} attribute values'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Updated {changed} of {scanned} attribute values'))
+        self.stdout.write('=' * 60 + '\n')
+
+    def _flush(self, batch, dry_run):
+        """Write a batch of synced rows (typed columns only)"""
+        if batch and not dry_run:
+            CollectionItemAttributeValue.objects.all_with_deleted().bulk_update(
+                batch,
+                CollectionItemAttributeValue.TYPED_FIELDS,
+                batch_size=len(batch),
+            )
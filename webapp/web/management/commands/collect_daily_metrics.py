@@ -5,8 +5,19 @@ This command collects comprehensive system metrics and stores them in the
 DailyMetrics model. It should be run daily via cron job, preferably at midnight
 Europe/Zurich timezone.
 
+Each table is read once: the metrics of a model are conditional aggregates
+(COUNT ... FILTER) of a single query, plus a grouped query where a
+distribution is reported. The run time grows with the number of tables, not
+the number of metrics.
+
+With --incremental, the 7d and 30d "created" windows (new users, new
+collections and items, uploads) are the sum of the stored 24h values of the
+previous days plus today's, instead of being counted again. A window falls
+back to counting when a day in it has no metrics. Active users are distinct
+users, so their windows are always counted.
+
 Usage:
-    python manage.py collect_daily_metrics [--date YYYY-MM-DD] [--send-email] [--verbose]
+    python manage.py collect_daily_metrics [--date YYYY-MM-DD] [--incremental] [--send-email] [--verbose]
 """
 
 import time
@@ -14,7 +25,7 @@ from datetime import date, datetime, timedelta
 from decimal import Decimal
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum, Q, Avg
+from django.db.models import Count, Exists, OuterRef, Q, Sum
 from django.utils import timezone
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
@@ -28,14 +39,43 @@ from web.models import (
     CollectionItem,
     ItemType,
     ItemAttribute,
+    CollectionItemAttributeValue,
     CollectionItemLink,
-    LinkPattern,
+    CollectionImage,
+    CollectionItemImage,
     MediaFile,
-    RecentActivity,
+    UserProfile,
 )
 
 User = get_user_model()
 
+# Time windows of the *_24h/_7d/_30d metrics
+WINDOWS = (
+    ('24h', timedelta(hours=24)),
+    ('7d', timedelta(days=7)),
+    ('30d', timedelta(days=30)),
+)
+
+# Windowed metrics that count rows by creation time: they add up over days,
+# so --incremental derives their 7d/30d values from the stored 24h values
+ADDITIVE_WINDOW_METRICS = ('new_users', 'collections_created', 'items_created', 'recent_uploads')
+
+# DailyMetrics field of each CollectionItem status
+ITEM_STATUS_FIELDS = {
+    CollectionItem.Status.IN_COLLECTION: 'items_in_collection',
+    CollectionItem.Status.WANTED: 'items_wanted',
+    CollectionItem.Status.RESERVED: 'items_reserved',
+    CollectionItem.Status.ORDERED: 'items_ordered',
+    CollectionItem.Status.LENT_OUT: 'items_lent',
+    CollectionItem.Status.PREVIOUSLY_OWNED: 'items_previously_owned',
+}
+
+COLLECTION_VISIBILITY_FIELDS = {
+    Collection.Visibility.PRIVATE: 'collections_private',
+    Collection.Visibility.PUBLIC: 'collections_public',
+    Collection.Visibility.UNLISTED: 'collections_unlisted',
+}
+
 
 class Command(BaseCommand):
     help = 'Collect daily system metrics'
@@ -46,6 +86,11 @@ class Command(BaseCommand):
             type=str,
             help='Specific date to collect metrics for (YYYY-MM-DD), defaults to today'
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Derive 7d/30d creation windows from the stored daily metrics instead of counting them'
+        )
         parser.add_argument(
             '--send-email',
             action='store_true',
@@ -83,17 +128,23 @@ class Command(BaseCommand):
 
         # Initialize metrics dictionary
         metrics = {}
-
-        # Collect all metrics
-        self._collect_user_metrics(metrics, collection_date, options['verbose'])
-        self._collect_collection_metrics(metrics, collection_date, options['verbose'])
-        self._collect_item_metrics(metrics, collection_date, options['verbose'])
-        self._collect_link_metrics(metrics, collection_date, options['verbose'])
-        self._collect_storage_metrics(metrics, collection_date, options['verbose'])
-        self._collect_email_metrics(metrics, collection_date, options['verbose'])
-        self._collect_moderation_metrics(metrics, collection_date, options['verbose'])
-        self._collect_engagement_metrics(metrics, collection_date, options['verbose'])
-        self._collect_activity_metrics(metrics, collection_date, options['verbose'])
+        self.now = timezone.now()
+        self.derived_windows = {}
+        if options['incremental']:
+            self.derived_windows = self._load_window_sums(collection_date)
+            if options['verbose']:
+                derived = ', '.join(self.derived_windows) or 'none (missing daily metrics)'
+                self.stdout.write(f"  Windows derived from daily metrics: {derived}")
+
+        # Collect all metrics (one aggregate query per table)
+        self._collect_user_metrics(metrics, options['verbose'])
+        self._collect_collection_metrics(metrics, options['verbose'])
+        self._collect_item_metrics(metrics, options['verbose'])
+        self._collect_item_detail_metrics(metrics, options['verbose'])
+        self._collect_link_metrics(metrics, options['verbose'])
+        self._collect_storage_metrics(metrics, options['verbose'])
+        self._collect_email_metrics(metrics, options['verbose'])
+        self._apply_window_sums(metrics)
 
         # Calculate duration
         duration = int(time.time() - start_time)
@@ -121,134 +172,125 @@ class Command(BaseCommand):
         if deleted > 0:
             self.stdout.write(f"Cleaned up {deleted} old metrics records")
 
-    def _collect_user_metrics(self, metrics, collection_date, verbose=False):
-        """Collect user-related metrics."""
+    def _load_window_sums(self, collection_date):
+        """
+        Sums of the stored 24h values of the days before collection_date, per window.
+
+        Returns:
+            Dict of window -> {metric: sum}, only for windows where every
+            previous day has metrics
+        """
+        longest = max(delta.days for _window, delta in WINDOWS)
+        rows = {
+            row['collection_date']: row
+            for row in DailyMetrics.objects.filter(
+                collection_date__gte=collection_date - timedelta(days=longest - 1),
+                collection_date__lt=collection_date,
+            ).values('collection_date', *(f'{metric}_24h' for metric in ADDITIVE_WINDOW_METRICS))
+        }
+
+        window_sums = {}
+        for window, delta in WINDOWS:
+            if delta.days <= 1:
+                continue
+            days = [collection_date - timedelta(days=offset) for offset in range(1, delta.days)]
+            if all(day in rows for day in days):
+                window_sums[window] = {
+                    metric: sum(rows[day][f'{metric}_24h'] for day in days)
+                    for metric in ADDITIVE_WINDOW_METRICS
+                }
+        return window_sums
+
+    def _apply_window_sums(self, metrics):
+        """Fill the derived windows: previous days' sums plus today's 24h value"""
+        for window, sums in self.derived_windows.items():
+            for metric, previous in sums.items():
+                metrics[f'{metric}_{window}'] = previous + metrics[f'{metric}_24h']
+
+    def _window_counts(self, metric, field):
+        """Conditional counts of rows with `field` in each window (skipping windows derived from daily metrics)"""
+        return {
+            f'{metric}_{window}': Count('pk', filter=Q(**{f'{field}__gte': self.now - delta}))
+            for window, delta in WINDOWS
+            if not (metric in ADDITIVE_WINDOW_METRICS and window in self.derived_windows)
+        }
+
+    @staticmethod
+    def _pct(part, total):
+        return Decimal((part / total * 100) if total > 0 else 0).quantize(Decimal('0.01'))
+
+    @staticmethod
+    def _ratio(part, total):
+        return Decimal((part / total) if total > 0 else 0).quantize(Decimal('0.01'))
+
+    def _collect_user_metrics(self, metrics, verbose=False):
+        """Collect user metrics (users and user profiles)."""
         if verbose:
             self.stdout.write("  Collecting user metrics...")
 
-        now = timezone.now()
-        metrics['total_users'] = User.objects.count()
-
-        # Active users (based on last_login)
-        metrics['active_users_24h'] = User.objects.filter(
-            last_login__gte=now - timedelta(hours=24)
-        ).count()
-        metrics['active_users_7d'] = User.objects.filter(
-            last_login__gte=now - timedelta(days=7)
-        ).count()
-        metrics['active_users_30d'] = User.objects.filter(
-            last_login__gte=now - timedelta(days=30)
-        ).count()
-
-        # New users
-        metrics['new_users_24h'] = User.objects.filter(
-            date_joined__gte=now - timedelta(hours=24)
-        ).count()
-        metrics['new_users_7d'] = User.objects.filter(
-            date_joined__gte=now - timedelta(days=7)
-        ).count()
-        metrics['new_users_30d'] = User.objects.filter(
-            date_joined__gte=now - timedelta(days=30)
-        ).count()
+        metrics.update(User.objects.aggregate(
+            total_users=Count('pk'),
+            **self._window_counts('active_users', 'last_login'),
+            **self._window_counts('new_users', 'date_joined'),
+        ))
+
+        metrics.update(UserProfile.objects.aggregate(
+            marketing_opt_in=Count('pk', filter=Q(receive_marketing_emails=True)),
+            marketing_opt_out=Count('pk', filter=Q(receive_marketing_emails=False)),
+            user_violations=Count('pk', filter=Q(content_moderation_violations__gt=0)),
+            banned_users=Count('pk', filter=Q(is_content_banned=True)),
+        ))
 
         if verbose:
             self.stdout.write(f"    Total users: {metrics['total_users']}")
 
-    def _collect_collection_metrics(self, metrics, collection_date, verbose=False):
-        """Collect collection-related metrics."""
+    def _collect_collection_metrics(self, metrics, verbose=False):
+        """Collect collection metrics."""
         if verbose:
             self.stdout.write("  Collecting collection metrics...")
 
-        metrics['total_collections'] = Collection.objects.count()
-
-        # Visibility distribution
-        visibility_counts = Collection.objects.values('visibility').annotate(
-            count=Count('id')
-        )
-
-        metrics['collections_private'] = 0
-        metrics['collections_public'] = 0
-        metrics['collections_unlisted'] = 0
-
-        for vc in visibility_counts:
-            if vc['visibility'] == 'PRIVATE':
-                metrics['collections_private'] = vc['count']
-            elif vc['visibility'] == 'PUBLIC':
-                metrics['collections_public'] = vc['count']
-            elif vc['visibility'] == 'UNLISTED':
-                metrics['collections_unlisted'] = vc['count']
-
-        # Collections created
-        now = timezone.now()
-        metrics['collections_created_24h'] = Collection.objects.filter(
-            created__gte=now - timedelta(hours=24)
-        ).count()
-        metrics['collections_created_7d'] = Collection.objects.filter(
-            created__gte=now - timedelta(days=7)
-        ).count()
-        metrics['collections_created_30d'] = Collection.objects.filter(
-            created__gte=now - timedelta(days=30)
-        ).count()
-
-    def _collect_item_metrics(self, metrics, collection_date, verbose=False):
-        """Collect item-related metrics."""
+        metrics.update(Collection.objects.aggregate(
+            total_collections=Count('pk'),
+            **{
+                field: Count('pk', filter=Q(visibility=visibility))
+                for visibility, field in COLLECTION_VISIBILITY_FIELDS.items()
+            },
+            **self._window_counts('collections_created', 'created'),
+        ))
+
+    def _collect_item_metrics(self, metrics, verbose=False):
+        """Collect item metrics: totals, status distribution, favorites and item types."""
         if verbose:
             self.stdout.write("  Collecting item metrics...")
 
-        metrics['total_items'] = CollectionItem.objects.count()
-
-        # Status distribution
-        status_counts = CollectionItem.objects.values('status').annotate(
-            count=Count('id')
-        )
-
-        # Initialize all status counts
-        metrics['items_in_collection'] = 0
-        metrics['items_wanted'] = 0
-        metrics['items_reserved'] = 0
-        metrics['items_ordered'] = 0
-        metrics['items_lent'] = 0
-        metrics['items_previously_owned'] = 0
+        metrics.update(CollectionItem.objects.aggregate(
+            total_items=Count('pk'),
+            favorite_items_total=Count('pk', filter=Q(is_favorite=True)),
+            **{
+                field: Count('pk', filter=Q(status=status))
+                for status, field in ITEM_STATUS_FIELDS.items()
+            },
+            **self._window_counts('items_created', 'created'),
+        ))
+        # Statuses that no longer exist
         metrics['items_sold'] = 0
         metrics['items_given_away'] = 0
 
-        for sc in status_counts:
-            status = sc['status']
-            if status == 'IN_COLLECTION':
-                metrics['items_in_collection'] = sc['count']
-            elif status == 'WANTED':
-                metrics['items_wanted'] = sc['count']
-            elif status == 'RESERVED':
-                metrics['items_reserved'] = sc['count']
-            elif status == 'ORDERED':
-                metrics['items_ordered'] = sc['count']
-            elif status == 'LENT':
-                metrics['items_lent'] = sc['count']
-            elif status == 'PREVIOUSLY_OWNED':
-                metrics['items_previously_owned'] = sc['count']
-            elif status == 'SOLD':
-                metrics['items_sold'] = sc['count']
-            elif status == 'GIVEN_AWAY':
-                metrics['items_given_away'] = sc['count']
-
-        # Item types
-        metrics['item_types_count'] = ItemType.objects.count()
-
-        # Item type distribution
+        # Item type distribution (top 20)
         type_distribution = CollectionItem.objects.filter(
             item_type__isnull=False
         ).values('item_type__display_name').annotate(
             count=Count('id')
-        ).order_by('-count')[:20]  # Top 20
+        ).order_by('-count')[:20]
         metrics['item_type_distribution'] = {
             item['item_type__display_name']: item['count']
             for item in type_distribution
         }
 
-        # Attributes
-        metrics['total_attributes'] = ItemAttribute.objects.count()
+        metrics['item_types_count'] = ItemType.objects.count()
 
-        # Attribute usage (top 20)
+        # Attribute definitions by display name (top 20)
+        metrics['total_attributes'] = ItemAttribute.objects.count()
         attr_usage = ItemAttribute.objects.values('display_name').annotate(
             count=Count('id')
         ).order_by('-count')[:20]
@@ -257,34 +299,46 @@ class Command(BaseCommand):
             for attr in attr_usage
         }
 
-        # Items created
-        now = timezone.now()
-        metrics['items_created_24h'] = CollectionItem.objects.filter(
-            created__gte=now - timedelta(hours=24)
-        ).count()
-        metrics['items_created_7d'] = CollectionItem.objects.filter(
-            created__gte=now - timedelta(days=7)
-        ).count()
-        metrics['items_created_30d'] = CollectionItem.objects.filter(
-            created__gte=now - timedelta(days=30)
-        ).count()
-
-    def _collect_link_metrics(self, metrics, collection_date, verbose=False):
-        """Collect link-related metrics."""
+        metrics['avg_items_per_collection'] = self._ratio(metrics['total_items'], metrics['total_collections'])
+
         if verbose:
-            self.stdout.write("  Collecting link metrics...")
+            self.stdout.write(f"    Total items: {metrics['total_items']}")
+
+    def _collect_item_detail_metrics(self, metrics, verbose=False):
+        """Collect the share of items with attributes and images, from the attribute value and image tables."""
+        if verbose:
+            self.stdout.write("  Collecting engagement metrics...")
 
-        metrics['total_links'] = CollectionItemLink.objects.count()
+        total_items = metrics['total_items']
 
-        # Links with/without patterns
-        metrics['matched_link_patterns'] = CollectionItemLink.objects.filter(
-            link_pattern__isnull=False
-        ).count()
-        metrics['unmatched_link_patterns'] = CollectionItemLink.objects.filter(
-            link_pattern__isnull=True
-        ).count()
+        attribute_values = CollectionItemAttributeValue.objects.filter(item__is_deleted=False).aggregate(
+            values=Count('pk'),
+            items=Count('item', distinct=True),
+        )
+        metrics['items_with_attributes_pct'] = self._pct(attribute_values['items'], total_items)
+        metrics['avg_attributes_per_item'] = self._ratio(attribute_values['values'], total_items)
+
+        images = CollectionItemImage.objects.filter(item__is_deleted=False).aggregate(
+            items=Count('item', distinct=True),
+        )
+        metrics['items_with_images_pct'] = self._pct(images['items'], total_items)
+
+    def _collect_link_metrics(self, metrics, verbose=False):
+        """Collect link metrics."""
+        if verbose:
+            self.stdout.write("  Collecting link metrics...")
+
+        links = CollectionItemLink.objects.aggregate(
+            total=Count('pk'),
+            matched=Count('pk', filter=Q(link_pattern__isnull=False)),
+            items=Count('item', distinct=True, filter=Q(item__is_deleted=False)),
+        )
+        metrics['total_links'] = links['total']
+        metrics['matched_link_patterns'] = links['matched']
+        metrics['unmatched_link_patterns'] = links['total'] - links['matched']
+        metrics['items_with_links_pct'] = self._pct(links['items'], metrics['total_items'])
 
-        # Link pattern distribution
+        # Link pattern distribution (top 20)
         pattern_dist = CollectionItemLink.objects.filter(
             link_pattern__isnull=False
         ).values('link_pattern__display_name').annotate(
@@ -295,44 +349,26 @@ class Command(BaseCommand):
             for p in pattern_dist
         }
 
-    def _collect_storage_metrics(self, metrics, collection_date, verbose=False):
-        """Collect storage and media metrics."""
+    def _collect_storage_metrics(self, metrics, verbose=False):
+        """Collect storage, upload and moderation metrics."""
         if verbose:
             self.stdout.write("  Collecting storage metrics...")
 
-        metrics['total_media_files'] = MediaFile.objects.count()
-
-        # Total storage
-        total_bytes = MediaFile.objects.aggregate(
-            total=Sum('file_size')
-        )['total'] or 0
-        metrics['total_storage_bytes'] = total_bytes
-
-        # Recent uploads
-        now = timezone.now()
-        metrics['recent_uploads_24h'] = MediaFile.objects.filter(
-            created__gte=now - timedelta(hours=24)
-        ).count()
-        metrics['recent_uploads_7d'] = MediaFile.objects.filter(
-            created__gte=now - timedelta(days=7)
-        ).count()
-        metrics['recent_uploads_30d'] = MediaFile.objects.filter(
-            created__gte=now - timedelta(days=30)
-        ).count()
-
-        # Orphaned files (files not linked to collections or items)
-        # Count files that are not linked to any collection or item image
-        orphaned = MediaFile.objects.filter(
-            collection_images__isnull=True,
-            item_images__isnull=True
-        ).count()
-        metrics['orphaned_files'] = orphaned
-
-        # Corrupted files (files with integrity issues)
-        corrupted = MediaFile.objects.filter(
-            file_exists=False
-        ).count()
-        metrics['corrupted_files'] = corrupted
+        # Orphaned files are linked to no collection or item image (deleted image rows still count as links)
+        linked_to_collection = CollectionImage.objects.all_with_deleted().filter(media_file=OuterRef('pk'))
+        linked_to_item = CollectionItemImage.objects.all_with_deleted().filter(media_file=OuterRef('pk'))
+
+        storage = MediaFile.objects.aggregate(
+            total_media_files=Count('pk'),
+            total_storage_bytes=Sum('file_size'),
+            orphaned_files=Count('pk', filter=~Q(Exists(linked_to_collection)) & ~Q(Exists(linked_to_item))),
+            corrupted_files=Count('pk', filter=Q(file_exists=False)),
+            flagged_content=Count('pk', filter=Q(content_moderation_status=MediaFile.ContentModerationStatus.FLAGGED)),
+            pending_review=Count('pk', filter=Q(content_moderation_status=MediaFile.ContentModerationStatus.PENDING)),
+            **self._window_counts('recent_uploads', 'created'),
+        )
+        storage['total_storage_bytes'] = storage['total_storage_bytes'] or 0
+        metrics.update(storage)
 
         # Storage by type
         storage_by_type = MediaFile.objects.values('media_type').annotate(
@@ -344,9 +380,9 @@ class Command(BaseCommand):
         }
 
         if verbose:
-            self.stdout.write(f"    Total storage: {total_bytes / (1024**3):.2f} GB")
+            self.stdout.write(f"    Total storage: {metrics['total_storage_bytes'] / (1024**3):.2f} GB")
 
-    def _collect_email_metrics(self, metrics, collection_date, verbose=False):
+    def _collect_email_metrics(self, metrics, verbose=False):
         """Collect email-related metrics (from Resend if available)."""
         if verbose:
             self.stdout.write("  Collecting email metrics...")
@@ -357,106 +393,8 @@ class Command(BaseCommand):
         metrics['emails_pending'] = None
         metrics['emails_sent'] = None
         metrics['emails_failed'] = None
-
-        # Marketing consent (if UserProfile has these fields)
-        try:
-            from web.models import UserProfile
-            metrics['marketing_opt_in'] = UserProfile.objects.filter(
-                marketing_consent=True
-            ).count()
-            metrics['marketing_opt_out'] = UserProfile.objects.filter(
-                marketing_consent=False
-            ).count()
-        except:
-            metrics['marketing_opt_in'] = None
-            metrics['marketing_opt_out'] = None
-
         metrics['emails_synced_resend'] = False
 
-    def _collect_moderation_metrics(self, metrics, collection_date, verbose=False):
-        """Collect content moderation metrics."""
-        if verbose:
-            self.stdout.write("  Collecting moderation metrics...")
-
-        # Flagged content
-        metrics['flagged_content'] = MediaFile.objects.filter(
-            content_moderation_status='FLAGGED'
-        ).count() if hasattr(MediaFile, 'content_moderation_status') else 0
-
-        # Pending review
-        metrics['pending_review'] = MediaFile.objects.filter(
-            content_moderation_status='PENDING'
-        ).count() if hasattr(MediaFile, 'content_moderation_status') else 0
-
-        # User violations
-        try:
-            from web.models import UserProfile
-            metrics['user_violations'] = UserProfile.objects.filter(
-                violations_count__gt=0
-            ).count()
-            metrics['banned_users'] = UserProfile.objects.filter(
-                is_banned=True
-            ).count()
-        except:
-            metrics['user_violations'] = 0
-            metrics['banned_users'] = 0
-
-    def _collect_engagement_metrics(self, metrics, collection_date, verbose=False):
-        """Collect user engagement metrics."""
-        if verbose:
-            self.stdout.write("  Collecting engagement metrics...")
-
-        # Favorite items
-        metrics['favorite_items_total'] = CollectionItem.objects.filter(
-            is_favorite=True
-        ).count()
-
-        # Items with images
-        items_with_images = CollectionItem.objects.filter(
-            images__isnull=False
-        ).distinct().count()
-        total_items = CollectionItem.objects.count()
-        metrics['items_with_images_pct'] = Decimal(
-            (items_with_images / total_items * 100) if total_items > 0 else 0
-        ).quantize(Decimal('0.01'))
-
-        # Items with custom attributes (using relational model)
-        items_with_attrs = CollectionItem.objects.filter(
-            attribute_values__isnull=False
-        ).distinct().count()
-        metrics['items_with_attributes_pct'] = Decimal(
-            (items_with_attrs / total_items * 100) if total_items > 0 else 0
-        ).quantize(Decimal('0.01'))
-
-        # Items with links
-        items_with_links = CollectionItem.objects.filter(
-            links__isnull=False
-        ).distinct().count()
-        metrics['items_with_links_pct'] = Decimal(
-            (items_with_links / total_items * 100) if total_items > 0 else 0
-        ).quantize(Decimal('0.01'))
-
-        # Average attributes per item (using relational model)
-        avg_attrs = CollectionItem.objects.annotate(
-            attr_count=Count('attribute_values')
-        ).aggregate(avg=Avg('attr_count'))['avg'] or 0
-        metrics['avg_attributes_per_item'] = Decimal(avg_attrs).quantize(Decimal('0.01'))
-
-        # Average items per collection
-        avg_items = Collection.objects.annotate(
-            item_count=Count('items')
-        ).aggregate(avg=Avg('item_count'))['avg'] or 0
-        metrics['avg_items_per_collection'] = Decimal(avg_items).quantize(Decimal('0.01'))
-
-    def _collect_activity_metrics(self, metrics, collection_date, verbose=False):
-        """Collect activity metrics."""
-        if verbose:
-            self.stdout.write("  Collecting activity metrics...")
-
-        # Recent activity is already counted in items_created and collections_created
-        # This is a placeholder for additional activity tracking if needed
-        pass
-
     def _send_email_report(self, daily_metrics):
         """Send HTML email report to superusers."""
         self.stdout.write("  Sending email report...")
@@ -0,0 +1,108 @@
+"""
+Management command to find and collapse duplicate media files.
+
+New uploads with the same content as an existing file share its stored file
+(see web/media_dedup.py). This command backfills the SHA-256 content hash of
+files uploaded before that, then points every group of MediaFiles with the
+same content at one stored file and deletes the now unreferenced copies.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from web.media_dedup import collapse_duplicates, hash_stored_file
+from web.models import MediaFile
+
+
+class Command(BaseCommand):
+    help = 'Compute content hashes of media files and collapse files with identical content'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skip-hashing',
+            action='store_true',
+            help='Only collapse files that already have a content hash',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Hash at most this many files',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be collapsed without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        hashed = 0
+        hash_failed = 0
+        if not options['skip_hashing']:
+            hashed, hash_failed = self._hash_files(options['limit'], dry_run)
+
+        duplicate_groups = MediaFile.objects.filter(
+            content_hash__isnull=False,
+            file_exists=True
+        ).values('content_hash').annotate(
+            paths=Count('file_path', distinct=True)
+        ).filter(paths__gt=1).values_list('content_hash', flat=True)
+
+        groups = 0
+        repointed = 0
+        files_deleted = 0
+        bytes_freed = 0
+        for content_hash in list(duplicate_groups):
+            result = collapse_duplicates(content_hash, dry_run=dry_run)
+            groups += 1
+            repointed += result['repointed']
+            files_deleted += result['files_deleted']
+            bytes_freed += result['bytes_freed']
+
+        self.stdout.write('\n' + '=' * 60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: Would hash {hashed} files'))
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: Would collapse {groups} duplicate groups ({repointed} files repointed, '
+                f'{files_deleted} copies deleted, {bytes_freed / (1024 * 1024):.1f}MB freed)'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Hashed {hashed} files'))
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Collapsed {groups} duplicate groups ({repointed} files repointed, '
+                f'{files_deleted} copies deleted, {bytes_freed / (1024 * 1024):.1f}MB freed)'
+            ))
+        if hash_failed:
+            self.stdout.write(self.style.ERROR(f'✗ Could not hash {hash_failed} files'))
+        self.stdout.write('=' * 60 + '\n')
+
+    def _hash_files(self, limit, dry_run):
+        """Compute the content hash of files that do not have one yet"""
+        media_files = MediaFile.objects.filter(content_hash__isnull=True, file_exists=True).order_by('pk')
+        if limit:
+            media_files = media_files[:limit]
+
+        total = media_files.count()
+        self.stdout.write(f'Hashing {total} media files...')
+        if dry_run:
+            return total, 0
+
+        hashed = 0
+        failed = 0
+        for media_file in media_files.iterator(chunk_size=100):
+            try:
+                media_file.content_hash = hash_stored_file(media_file.file_path)
+                media_file.save(update_fields=['content_hash'])
+                hashed += 1
+            except Exception as e:  # pylint: disable=broad-except
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'  ✗ {media_file.file_path}: {e}'))
+
+            if (hashed + failed) % 100 == 0:
+                self.stdout.write(f'  {hashed + failed}/{total} files')
+
+        return hashed, failed
@@ -0,0 +1,87 @@
+"""
+Management command to export a user's collections in the import format.
+
+Same output as the export links on the collection pages (see
+web/data_export.py): records are written as they are read, so memory stays
+constant however many items the account has. A JSON or JSON Lines export
+can be imported again with --upsert to update the collections in place.
+
+Usage:
+    python manage.py export_data --user alice > alice.json
+    python manage.py export_data --user alice --format jsonl --output alice.jsonl
+    python manage.py export_data --user alice --collection AbC123 --format csv --output books.csv
+    python manage.py export_data --user alice --base-url https://beryl.example.com --output alice.json
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from web.data_export import EXPORT_FORMATS, stream_export
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Export a user's collections as JSON, JSON Lines or CSV in the import format"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, required=True, help='Username whose collections are exported')
+        parser.add_argument(
+            '--collection',
+            action='append',
+            dest='collections',
+            metavar='HASH',
+            help='Export only this collection (can be given more than once)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='json',
+            help='Output format (default: json)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='File to write (default: stdout)',
+        )
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            help='Site URL prepended to relative image URLs, e.g. https://beryl.example.com',
+        )
+
+    def handle(self, *args, **options):
+        from web.models import Collection
+
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' not found")
+
+        collections = Collection.objects.filter(created_by=user)
+        if options['collections']:
+            collections = collections.filter(hash__in=options['collections'])
+            missing = set(options['collections']) - set(collections.values_list('hash', flat=True))
+            if missing:
+                raise CommandError(f"Collections not found for '{user.username}': {', '.join(sorted(missing))}")
+
+        url_builder = None
+        if options['base_url']:
+            base_url = options['base_url'].rstrip('/')
+            url_builder = lambda path: base_url + path  # noqa: E731
+
+        chunks = stream_export(collections, options['format'], user=user, url_builder=url_builder)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Exported {collections.count()} collections of {user.username} to {options['output']}"
+        ))
+        self.stdout.write('=' * 60 + '\n')
@@ -0,0 +1,163 @@
+"""
+Management command to generate resized image variants for media files.
+
+Uploads and imports only store the original; their WebP/JPEG derivatives
+are written here, outside the request (see web/image_derivatives.py).
+
+- With --watch the command runs as a worker: it processes new images as
+  they appear and waits when there are none. It does nothing while the
+  IMAGE_DERIVATIVES feature flag is off.
+- Without --watch it processes the pending files once (backfill), or all
+  files again after IMAGE_DERIVATIVE_WIDTHS changes (--force).
+
+Usage:
+    python manage.py generate_image_derivatives --watch
+    python manage.py generate_image_derivatives --limit 1000
+    python manage.py generate_image_derivatives --force
+"""
+
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from web.image_derivatives import derivative_candidates, pending_media_files, record_derivative_error
+from web.models import MediaFile
+
+# Files taken per query in --watch mode
+WATCH_BATCH_SIZE = 50
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG variants (srcset) for image files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep running and process new images as they are uploaded',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='With --watch: seconds to wait when no image is pending (default: 5)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate derivatives of files that already have them',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Process at most this many files',
+        )
+        parser.add_argument(
+            '--media-type',
+            type=str,
+            choices=[choice[0] for choice in MediaFile.MediaType.choices],
+            help='Only process files of this media type',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many files would be processed without writing derivatives',
+        )
+
+    def handle(self, *args, **options):
+        if options['watch']:
+            self._watch(options['poll_interval'])
+            return
+
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        media_files = derivative_candidates() if options['force'] else pending_media_files()
+        if options['media_type']:
+            media_files = media_files.filter(media_type=options['media_type'])
+
+        media_files = media_files.order_by('pk')
+        if options['limit']:
+            media_files = media_files[:options['limit']]
+
+        total = media_files.count()
+        self.stdout.write(f'Processing {total} image files...')
+
+        processed = 0
+        variants = 0
+        failed = 0
+        for media_file in media_files.iterator(chunk_size=100):
+            if dry_run:
+                processed += 1
+                continue
+            written = self._process(media_file)
+            if written is None:
+                failed += 1
+            else:
+                variants += written
+                processed += 1
+
+            if (processed + failed) % 50 == 0:
+                self.stdout.write(f'  {processed + failed}/{total} files')
+
+        self.stdout.write('\n' + '=' * 60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: Would generate derivatives for {processed} files'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Processed {processed} files ({variants} variants written)'))
+            if failed:
+                self.stdout.write(self.style.ERROR(f'✗ Failed: {failed} files'))
+        self.stdout.write('=' * 60 + '\n')
+
+    def _process(self, media_file):
+        """Generate the derivatives of one file; returns the number of variants, or None on failure"""
+        try:
+            derivatives = media_file.generate_derivatives()
+            return sum(len(paths) for paths in derivatives.values())
+        except Exception as e:  # pylint: disable=broad-except
+            self.stdout.write(self.style.ERROR(f'  ✗ {media_file.file_path}: {e}'))
+            try:
+                record_derivative_error(media_file, e)
+            except Exception:  # pylint: disable=broad-except
+                pass
+            return None
+
+    def _watch(self, poll_interval):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write('Image derivative worker started')
+        processed = 0
+        failed = 0
+        while not self._stopping:
+            if not getattr(settings, 'IMAGE_DERIVATIVES_ENABLED', False):
+                time.sleep(poll_interval)
+                continue
+
+            batch = list(pending_media_files()[:WATCH_BATCH_SIZE])
+            if not batch:
+                time.sleep(poll_interval)
+                continue
+
+            for media_file in batch:
+                if self._stopping:
+                    break
+                if self._process(media_file) is None:
+                    failed += 1
+                else:
+                    processed += 1
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✓ Processed {processed} files'))
+        if failed:
+            self.stdout.write(self.style.ERROR(f'✗ Failed: {failed} files'))
+        self.stdout.write('=' * 60 + '\n')
+
+    def _stop(self, signum, frame):  # pylint: disable=unused-argument
+        # Finish the current file, then exit
+        self._stopping = True
@@ -0,0 +1,130 @@
+"""
+Management command to import a JSON Lines import file.
+
+The file is validated record by record (see web/import_validator.py) and
+then imported as a stream (see web/import_processor.py), so memory stays
+constant however large the file is. Use it for imports beyond what the sys
+import page accepts.
+
+Re-running a sync from a legacy source: --upsert updates what an earlier
+import created (collections by name, items by your_id or name) and writes
+only the changed rows; --dry-run lists what would change without changing
+anything.
+
+Usage:
+    python manage.py import_jsonl dump.jsonl --user alice --validate-only
+    python manage.py import_jsonl dump.jsonl --user alice --download-images
+    python manage.py import_jsonl dump.jsonl --user alice --upsert --delete-missing --dry-run
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from web.import_processor import MODE_CREATE, MODE_UPSERT, ImportProcessor
+from web.import_validator import ImportValidator, iter_jsonl_records
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Validate and import a JSON Lines import file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('import_file', type=str, help='Path to the .jsonl file')
+        parser.add_argument('--user', type=str, required=True, help='Username to assign imported data to')
+        parser.add_argument(
+            '--download-images',
+            action='store_true',
+            help='Download and store images from URLs in the file',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Items inserted per transaction (default: IMPORT_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--validate-only',
+            action='store_true',
+            help='Validate the file without importing',
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Update existing collections and items instead of creating duplicates',
+        )
+        parser.add_argument(
+            '--create',
+            action='store_true',
+            help='Always create new collections and items, even if the file header asks for upsert',
+        )
+        parser.add_argument(
+            '--delete-missing',
+            action='store_true',
+            help='With --upsert: delete items of matched collections that are not in the file',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what the import would change without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        if options['upsert'] and options['create']:
+            raise CommandError('--upsert and --create are mutually exclusive')
+        mode = MODE_UPSERT if options['upsert'] else MODE_CREATE if options['create'] else None
+        
+        try:
+            target_user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' not found")
+
+        validator = ImportValidator()
+        try:
+            with open(options['import_file'], 'rb') as import_file:
+                summary, errors = validator.validate_jsonl_stream(import_file)
+        except FileNotFoundError:
+            raise CommandError(f"File '{options['import_file']}' not found")
+
+        self.stdout.write(
+            f"Validated {summary['lines']} lines: {summary['item_type_count']} item types, "
+            f"{summary['collection_count']} collections, {summary['item_count']} items"
+        )
+        if errors:
+            self.stdout.write(validator.generate_validation_report(errors))
+            if summary['error_count'] > len(errors):
+                self.stdout.write(f"... and {summary['error_count'] - len(errors)} more error(s)")
+            raise CommandError(f"Validation failed with {summary['error_count']} error(s)")
+
+        if options['validate_only']:
+            self.stdout.write(self.style.SUCCESS('✓ Import file is valid'))
+            return
+
+        processor = ImportProcessor()
+        with open(options['import_file'], 'rb') as import_file:
+            result = processor.process_records(
+                iter_jsonl_records(import_file),
+                target_user=target_user,
+                download_images=options['download_images'],
+                chunk_size=options['chunk_size'],
+                mode=mode,
+                delete_missing=options['delete_missing'] or None,
+                dry_run=options['dry_run'],
+            )
+
+        self.stdout.write(processor.generate_summary_report(result))
+        self.stdout.write('=' * 60)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f"DRY RUN: would create {result['collections_created']} collections and {result['items_created']} items, "
+                f"update {result['items_updated']} items and delete {result['items_deleted']} items"
+            ))
+        elif result['errors']:
+            self.stdout.write(self.style.WARNING(
+                f"Imported {result['items_created']} items with {len(result['errors'])} errors"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Imported {result['collections_created']} collections and {result['items_created']} items "
+                f"in {result['duration']:.1f}s"
+            ))
+        self.stdout.write('=' * 60 + '\n')
@@ -0,0 +1,80 @@
+"""
+Management command to (re)build the facet summaries of collections.
+
+CollectionFacetCount rows are maintained by signals on item and attribute
+value writes, and a missing summary is built on the first page view. This
+command rebuilds them after bulk changes that bypass signals
+(queryset.update(), raw SQL, imports with signals disabled) and lets you
+check existing summaries for drift.
+"""
+
+from django.core.management.base import BaseCommand
+
+from web.facets import rebuild_collection_facets
+from web.models import Collection, CollectionFacetCount, CollectionItem
+
+
+class Command(BaseCommand):
+    help = 'Rebuild precomputed facet counts (status, item type, attribute values) of collections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--collection',
+            type=str,
+            help='Only rebuild the collection with this hash',
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Only rebuild collections owned by this username',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report collections whose summary is missing or out of date without rebuilding',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        collections = Collection.objects.all()
+        if options['collection']:
+            collections = collections.filter(hash=options['collection'])
+        if options['user']:
+            collections = collections.filter(created_by__username=options['user'])
+
+        total = collections.count()
+        self.stdout.write(f'Processing {total} collections...')
+
+        rebuilt = 0
+        rows_written = 0
+        drifted = 0
+        for collection in collections.order_by('pk').iterator():
+            if dry_run:
+                actual = CollectionItem.objects.filter(collection=collection).count()
+                summarized = CollectionFacetCount.objects.filter(
+                    collection=collection, facet=CollectionFacetCount.Facet.TOTAL
+                ).values_list('count', flat=True).first()
+                if summarized != actual:
+                    drifted += 1
+                    summary = 'not built' if summarized is None else f'{summarized} summarized'
+                    self.stdout.write(f'  {collection.hash} "{collection.name}": {summary}, {actual} items')
+                continue
+
+            rows_written += rebuild_collection_facets(collection.pk)
+            rebuilt += 1
+            if rebuilt % 100 == 0:
+                self.stdout.write(f'  {rebuilt}/{total} collections')
+
+        self.stdout.write('\n' + '=' * 60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: Would rebuild {total} collections ({drifted} missing or out of date)'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt facets of {rebuilt} collections'))
+            self.stdout.write(self.style.SUCCESS(f'✓ Wrote {rows_written} facet rows'))
+        self.stdout.write('=' * 60 + '\n')
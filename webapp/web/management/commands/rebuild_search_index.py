@@ -0,0 +1,91 @@
+"""
+Management command to (re)build the full-text search documents of items.
+
+ItemSearchDocument rows are maintained by signals on every item, attribute
+value and link change; migration 0050 built them for the items that existed
+before. This command repairs the index after bulk changes that bypass
+signals (queryset.update(), raw SQL, imports with signals disabled).
+"""
+
+from django.core.management.base import BaseCommand
+
+from web.models import CollectionItem, ItemSearchDocument
+from web.search import search_backend
+
+
+class Command(BaseCommand):
+    help = 'Build full-text search documents for collection items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of items processed per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Only rebuild items of collections owned by this username',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many documents would be written without writing',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        self.stdout.write(f'Search backend: {search_backend()}')
+
+        items = CollectionItem.objects.all()
+        if options['user']:
+            items = items.filter(collection__created_by__username=options['user'])
+
+        total = items.count()
+        self.stdout.write(f'Building search documents for {total} items...')
+
+        written = 0
+        batch = []
+        for item in items.order_by('pk').prefetch_related(*ItemSearchDocument.PREFETCH).iterator(chunk_size=batch_size):
+            batch.append(ItemSearchDocument(item_id=item.pk, document=ItemSearchDocument.build_document(item)))
+            if len(batch) >= batch_size:
+                written += self._flush(batch, dry_run)
+                batch = []
+                self.stdout.write(f'  {written}/{total} documents')
+
+        written += self._flush(batch, dry_run)
+
+        # Documents of soft-deleted items must not show up in searches
+        stale = ItemSearchDocument.objects.filter(item__is_deleted=True)
+        if options['user']:
+            stale = stale.filter(item__collection__created_by__username=options['user'])
+        stale_count = stale.count()
+        if not dry_run:
+            stale.delete()
+
+        self.stdout.write('\n' + '=' * 60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: Would write {written} documents and remove {stale_count} stale documents'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Wrote {written} search documents'))
+            self.stdout.write(self.style.SUCCESS(f'✓ Removed {stale_count} stale documents'))
+        self.stdout.write('=' * 60 + '\n')
+
+    def _flush(self, batch, dry_run):
+        """Upsert a batch of documents (one INSERT ... ON CONFLICT per batch)"""
+        if batch and not dry_run:
+            ItemSearchDocument.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['item'],
+                update_fields=['document', 'updated'],
+            )
+        return len(batch)
@@ -0,0 +1,113 @@
+"""
+Management command to run the data import worker.
+
+The sys import page only validates and stages the uploaded file and queues
+an ImportJob (see web/import_jobs.py). This worker claims queued jobs one
+at a time and imports them, updating the job's counters as it goes. On
+SIGTERM the current import stops at its next collection boundary and is
+resumed from there by the next worker run.
+
+The worker also deletes staged files of uploads that were never confirmed
+(see cleanup_staged_files()), once at start and then hourly.
+
+Usage:
+    python manage.py run_import_worker            # run until stopped
+    python manage.py run_import_worker --once     # drain the queue and exit
+"""
+
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from web.import_jobs import claim_job, cleanup_staged_files, release_stale_jobs, run_job
+
+# Seconds between cleanups of unused staged import files
+CLEANUP_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Process queued data import jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait when the queue is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit as soon as no pending jobs are left',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            help='Exit after processing this many jobs',
+        )
+
+    def handle(self, *args, **options):
+        from web.models import ImportJob
+
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        pending = ImportJob.objects.filter(status=ImportJob.Status.PENDING).count()
+        self.stdout.write(f"Import worker {worker_id} started ({pending} jobs pending)")
+
+        done = 0
+        requeued = 0
+        failed = 0
+        lost = 0
+        last_cleanup = None
+        while not self._stopping:
+            if last_cleanup is None or time.monotonic() - last_cleanup > CLEANUP_INTERVAL:
+                cleanup_staged_files()
+                last_cleanup = time.monotonic()
+            release_stale_jobs()
+            job = claim_job(worker_id)
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"  Importing {job.file_name} for {job.target_user.username} (job {job.pk})")
+            status = run_job(job, should_stop=lambda: self._stopping)
+            if status == ImportJob.Status.DONE:
+                done += 1
+                job.refresh_from_db()
+                self.stdout.write(self.style.SUCCESS(
+                    f"  ✓ {job.file_name}: {job.collections_created} collections, {job.items_created} items"
+                ))
+            elif status == ImportJob.Status.FAILED:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'  ✗ {job.file_name}: failed'))
+            elif status is None:
+                lost += 1
+                self.stdout.write(self.style.WARNING(f'  {job.file_name}: taken over by another worker'))
+            else:
+                requeued += 1
+
+            if options['max_jobs'] and done + requeued + failed + lost >= options['max_jobs']:
+                break
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✓ Processed {done} import jobs'))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Queued again (resume from checkpoint): {requeued} jobs'))
+        if failed:
+            self.stdout.write(self.style.ERROR(f'✗ Failed: {failed} jobs'))
+        if lost:
+            self.stdout.write(self.style.WARNING(f'Taken over by another worker: {lost} jobs'))
+        self.stdout.write('=' * 60 + '\n')
+
+    def _stop(self, signum, frame):  # pylint: disable=unused-argument
+        # Stop the current import at its next collection boundary, then exit
+        self._stopping = True
@@ -0,0 +1,114 @@
+"""
+Management command to run the content moderation worker.
+
+Uploads queue a ModerationJob instead of running the detector inside the
+request (see web/moderation_queue.py). This worker claims queued jobs in
+batches, moderates the files and retries failures with backoff. Several
+workers can run side by side.
+
+Usage:
+    python manage.py run_moderation_worker            # run until stopped
+    python manage.py run_moderation_worker --once     # drain the queue and exit
+"""
+
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from web.moderation_queue import claim_jobs, complete_job, fail_job, process_job, queue_depth, release_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued content moderation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Jobs claimed per batch (default: 10)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait when the queue is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit as soon as no due jobs are left',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            help='Exit after processing this many jobs',
+        )
+
+    def handle(self, *args, **options):
+        from web.services.content_moderation import content_moderation_service
+
+        if not content_moderation_service.is_enabled():
+            self.stdout.write(self.style.WARNING('Content moderation is disabled - nothing to do'))
+            return
+
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        # Load the model before claiming jobs, so no job waits for it
+        timings = content_moderation_service.warm_up()
+        self.stdout.write(
+            f"NudeNet loaded in {timings['load_seconds'] or 0:.2f}s, warmed up in {timings['warm_up_seconds']:.2f}s"
+        )
+
+        depth = queue_depth()
+        self.stdout.write(f"Moderation worker {worker_id} started ({depth['pending']} jobs pending)")
+
+        processed = 0
+        retried = 0
+        failed = 0
+        while not self._stopping:
+            release_stale_jobs()
+            jobs = claim_jobs(worker_id, limit=options['batch_size'])
+
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            for job in jobs:
+                try:
+                    result = process_job(job, content_moderation_service)
+                    complete_job(job)
+                    processed += 1
+                    if result.get('is_inappropriate'):
+                        self.stdout.write(self.style.WARNING(
+                            f"  ! {job.media_file.original_filename}: flagged ({result.get('action')})"
+                        ))
+                except Exception as e:  # pylint: disable=broad-except
+                    if fail_job(job, e):
+                        retried += 1
+                    else:
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(f'  ✗ {job.media_file.original_filename}: {e}'))
+
+            if options['max_jobs'] and processed + retried + failed >= options['max_jobs']:
+                break
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✓ Processed {processed} moderation jobs'))
+        if retried:
+            self.stdout.write(self.style.WARNING(f'Scheduled for retry: {retried} jobs'))
+        if failed:
+            self.stdout.write(self.style.ERROR(f'✗ Failed permanently: {failed} jobs'))
+        self.stdout.write('=' * 60 + '\n')
+
+    def _stop(self, signum, frame):  # pylint: disable=unused-argument
+        # Finish the current batch, then exit
+        self._stopping = True
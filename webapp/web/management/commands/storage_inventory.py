@@ -0,0 +1,106 @@
+"""
+Management command to take a storage inventory snapshot.
+
+Streams a listing of media storage into a StorageInventorySnapshot and
+counts orphaned files (files without a MediaFile record) in the database;
+see web/storage_inventory.py. The sys media page shows the counts of the
+latest snapshot. Run it periodically (e.g. nightly).
+
+Usage:
+    python manage.py storage_inventory                      # take a snapshot
+    python manage.py storage_inventory --cleanup --dry-run  # show what would be deleted
+    python manage.py storage_inventory --cleanup            # take a snapshot and delete orphans
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from web.storage_inventory import DEFAULT_DELETE_WORKERS, delete_orphans, latest_snapshot, orphan_entries, take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'List media storage into an inventory snapshot and find orphaned files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete orphaned files from storage',
+        )
+        parser.add_argument(
+            '--reuse',
+            action='store_true',
+            help='Use the latest complete snapshot instead of listing storage again',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_DELETE_WORKERS,
+            help=f'Concurrent deletes (default: {DEFAULT_DELETE_WORKERS})',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Delete at most this many orphaned files',
+        )
+        parser.add_argument(
+            '--show',
+            type=int,
+            default=20,
+            help='Orphaned files to list (default: 20)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be deleted without deleting',
+        )
+
+    def handle(self, *args, **options):
+        if options['reuse']:
+            snapshot = latest_snapshot()
+            if snapshot is None:
+                raise CommandError('No complete snapshot yet - run without --reuse first')
+            self.stdout.write(f"Using snapshot of {snapshot.started:%Y-%m-%d %H:%M}")
+        else:
+            self.stdout.write('Listing storage...')
+
+            def progress(current):
+                self.stdout.write(f"  {current.file_count} files", ending='\r')
+                self.stdout.flush()
+
+            snapshot = take_snapshot(progress=progress)
+            self.stdout.write('')
+            if snapshot.error:
+                raise CommandError(f'Storage inventory failed: {snapshot.error}')
+
+        self.stdout.write(f"Files in storage: {snapshot.file_count} ({filesizeformat(snapshot.total_size)})")
+        self.stdout.write(f"Orphaned files: {snapshot.orphan_count} ({filesizeformat(snapshot.orphan_size)})")
+
+        if options['show'] and snapshot.orphan_count:
+            for path, size in orphan_entries(snapshot).order_by('path').values_list('path', 'size')[:options['show']]:
+                self.stdout.write(f"  {path} ({filesizeformat(size or 0)})")
+            if snapshot.orphan_count > options['show']:
+                self.stdout.write(f"  ... and {snapshot.orphan_count - options['show']} more")
+
+        if options['cleanup'] and snapshot.orphan_count:
+            result = delete_orphans(
+                snapshot,
+                workers=options['workers'],
+                limit=options['limit'],
+                dry_run=options['dry_run'],
+            )
+
+            self.stdout.write('\n' + '=' * 60)
+            if options['dry_run']:
+                self.stdout.write(self.style.WARNING(
+                    f"DRY RUN: would delete {result['deleted']} orphaned files ({filesizeformat(result['freed'])})"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✓ Deleted {result['deleted']} orphaned files ({filesizeformat(result['freed'])})"
+                ))
+            if result['skipped']:
+                self.stdout.write(f"Skipped (referenced since the snapshot): {result['skipped']}")
+            if result['errors']:
+                self.stdout.write(self.style.ERROR(f"✗ Errors: {result['errors']}"))
+            self.stdout.write('=' * 60 + '\n')
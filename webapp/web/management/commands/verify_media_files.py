@@ -0,0 +1,77 @@
+"""
+Management command to verify that media files exist in storage.
+
+Checks files concurrently and writes results in bulk (see
+web/media_verification.py). Files verified longest ago come first, so
+running this regularly with --budget verifies the whole library
+incrementally.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from web.media_verification import DEFAULT_WORKERS, verify_media_files
+
+
+class Command(BaseCommand):
+    help = 'Verify that media files exist in storage (concurrent, incremental)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f'Concurrent storage checks (default: {DEFAULT_WORKERS})',
+        )
+        parser.add_argument(
+            '--budget',
+            type=int,
+            help='Stop after about this many seconds (the next run continues where this one stopped)',
+        )
+        parser.add_argument(
+            '--stale-hours',
+            type=int,
+            help='Only verify files not verified within this many hours',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Verify at most this many files',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Check storage without updating the records',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        def progress(result):
+            self.stdout.write(f"  {result['checked'] + result['errors']} files checked ({result['missing']} missing)")
+
+        result = verify_media_files(
+            workers=options['workers'],
+            budget_seconds=options['budget'],
+            stale_after=timedelta(hours=options['stale_hours']) if options['stale_hours'] else None,
+            limit=options['limit'],
+            dry_run=dry_run,
+            progress=progress,
+        )
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Verified {result['checked']} files in {result['duration']:.1f}s ({result['files_per_second']:.0f} files/s)"
+        ))
+        self.stdout.write(f"  Found: {result['found']}")
+        if result['missing']:
+            self.stdout.write(self.style.WARNING(f"  Missing: {result['missing']} ({result['newly_missing']} newly missing)"))
+        if result['errors']:
+            self.stdout.write(self.style.ERROR(f"✗ Could not check {result['errors']} files"))
+        if result['budget_exhausted']:
+            self.stdout.write(self.style.WARNING(f"Time budget reached: {result['remaining']} files left for the next run"))
+        self.stdout.write('=' * 60 + '\n')
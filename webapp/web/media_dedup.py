@@ -0,0 +1,219 @@
+"""
+Media Deduplication
+===================
+
+Content-addressed storage for MediaFile.
+
+Every MediaFile records the SHA-256 digest of its bytes in `content_hash`.
+When a MediaFile is created, its digest is looked up: if a live MediaFile
+with the same content already has a file in storage, the new MediaFile
+points to that file and its own copy is deleted (uploads skip writing it).
+It also inherits the dimensions and the resized derivatives, so the same
+bytes are not resized twice.
+
+The moderation verdict is not inherited: every new MediaFile is queued for
+moderation, so the moderation policy (flag, delete, violation, ban) applies
+to this file and its uploader. The detector does not run again, the
+verdict cache (web/moderation_verdicts.py) answers for known content.
+
+Each MediaFile keeps its own row (owner, media type, collection links); a
+stored file is referenced by every live MediaFile with its `file_path`.
+MediaFile.delete_file() only removes the file from storage when the last
+reference is released.
+
+Adopting a file and releasing the last reference are serialized by row
+locks: MediaFile.save() locks the MediaFile it adopts from (find_existing_file
+with lock=True) until the new row is saved, and MediaFile.delete_file()
+locks the live rows of its file path (lock_references) before counting them.
+So a file is never deleted while a new MediaFile is adopting it, and an
+adopter that waited on a deletion no longer finds the file and keeps its own
+copy. Upload paths therefore only skip writing their bytes when they hold
+that lock (see MediaFileForm); downloads always write theirs and are
+collapsed in MediaFile.save().
+
+`manage.py deduplicate_media_files` computes missing digests and collapses
+duplicates uploaded before this existed.
+"""
+
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+logger = logging.getLogger("webapp")
+
+CHUNK_SIZE = 64 * 1024
+
+def deduplication_enabled() -> bool:
+    return getattr(settings, 'MEDIA_DEDUPLICATION_ENABLED', False)
+
+
+def compute_content_hash(file_obj) -> str:
+    """SHA-256 hex digest of a file object (uploaded or opened from storage), read in chunks"""
+    digest = hashlib.sha256()
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+    if hasattr(file_obj, 'chunks'):
+        for chunk in file_obj.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: file_obj.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def hash_stored_file(file_path: str) -> str:
+    """SHA-256 hex digest of a file in storage"""
+    with default_storage.open(file_path, 'rb') as stored:
+        return compute_content_hash(stored)
+
+
+def find_existing_file(content_hash, exclude_pk=None, lock=False):
+    """
+    Oldest live MediaFile whose stored file has the given content.
+
+    Args:
+        lock: Lock the row (SELECT ... FOR UPDATE) until the surrounding
+            transaction ends, so its file cannot be deleted meanwhile
+
+    Returns:
+        MediaFile or None (always None when deduplication is disabled)
+    """
+    from web.models import MediaFile
+
+    if not content_hash or not deduplication_enabled():
+        return None
+
+    candidates = MediaFile.objects.filter(content_hash=content_hash, file_exists=True)
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+    if lock:
+        candidates = candidates.select_for_update()
+    return candidates.order_by('created', 'pk').first()
+
+
+def lock_references(file_paths, pks=()) -> None:
+    """
+    Lock the live MediaFiles stored at the given file paths (and the given
+    rows) until the surrounding transaction ends, in pk order so concurrent
+    lockers cannot deadlock; must run inside transaction.atomic()
+    """
+    from django.db.models import Q
+
+    from web.models import MediaFile
+
+    list(
+        MediaFile.objects.all_with_deleted().filter(Q(file_path__in=file_paths, file_exists=True) | Q(pk__in=pks))
+        .select_for_update().order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def reference_count(file_path, exclude_pk=None) -> int:
+    """Number of live MediaFiles stored at a file path (optionally not counting one of them)"""
+    from web.models import MediaFile
+
+    references = MediaFile.objects.filter(file_path=file_path, file_exists=True)
+    if exclude_pk is not None:
+        references = references.exclude(pk=exclude_pk)
+    return references.count()
+
+
+def adopt_existing_file(media_file, existing):
+    """
+    Point an unsaved (or duplicate) MediaFile at the stored file of `existing`.
+
+    The file previously stored for `media_file` is deleted from storage when
+    no other MediaFile references it. Changes are not saved.
+
+    Returns:
+        bool: True if a now unreferenced file was deleted from storage
+    """
+    from web.image_derivatives import delete_derivatives
+
+    deleted = False
+    old_path = media_file.file_path
+    if old_path and old_path != existing.file_path and not reference_count(old_path, exclude_pk=media_file.pk):
+        try:
+            delete_derivatives(media_file)
+            if default_storage.exists(old_path):
+                default_storage.delete(old_path)
+                deleted = True
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("media_dedup: error deleting duplicate file %s: %s", old_path, str(e))
+
+    media_file.file_path = existing.file_path
+    media_file.file_size = existing.file_size
+    media_file.content_type = existing.content_type
+    media_file.storage_backend = existing.storage_backend
+    media_file.content_hash = existing.content_hash
+    media_file.file_exists = True
+    if existing.width and existing.height:
+        media_file.width = existing.width
+        media_file.height = existing.height
+
+    metadata = dict(media_file.metadata or {})
+    metadata.pop('derivatives', None)
+    if 'derivatives' in (existing.metadata or {}):
+        metadata['derivatives'] = existing.metadata['derivatives']
+    metadata['deduplicated_from'] = existing.hash
+    media_file.metadata = metadata
+
+    logger.info("media_dedup: %s now shares %s with MediaFile %s", media_file.original_filename, existing.file_path, existing.hash)
+    return deleted
+
+
+def collapse_duplicates(content_hash, dry_run=False):
+    """
+    Make all live MediaFiles with the same content share one stored file.
+
+    The oldest MediaFile with an existing file keeps its file; the others are
+    pointed at it and their own files are deleted once unreferenced.
+
+    Returns:
+        dict: {'repointed': int, 'files_deleted': int, 'bytes_freed': int}
+    """
+    from web.models import MediaFile
+
+    result = {'repointed': 0, 'files_deleted': 0, 'bytes_freed': 0}
+
+    duplicates = list(MediaFile.objects.filter(content_hash=content_hash, file_exists=True).order_by('created', 'pk'))
+    if len(duplicates) < 2:
+        return result
+
+    canonical = duplicates[0]
+    for media_file in duplicates[1:]:
+        if media_file.file_path == canonical.file_path:
+            continue
+
+        if dry_run:
+            result['repointed'] += 1
+            if not reference_count(media_file.file_path, exclude_pk=media_file.pk):
+                result['files_deleted'] += 1
+                result['bytes_freed'] += media_file.file_size or 0
+            continue
+
+        with transaction.atomic():
+            # Neither file may be deleted or adopted while this one is repointed
+            lock_references([canonical.file_path, media_file.file_path], [canonical.pk, media_file.pk])
+            if not MediaFile.objects.filter(pk=canonical.pk, file_exists=True).exists():
+                logger.warning("media_dedup: %s was deleted while collapsing duplicates", canonical.file_path)
+                break
+            media_file.refresh_from_db()
+            if not media_file.file_exists or media_file.file_path == canonical.file_path:
+                continue
+
+            result['repointed'] += 1
+            file_size = media_file.file_size or 0
+            if adopt_existing_file(media_file, canonical):
+                result['files_deleted'] += 1
+                result['bytes_freed'] += file_size
+            media_file.save(update_fields=[
+                'file_path', 'file_size', 'content_type', 'storage_backend', 'content_hash',
+                'file_exists', 'width', 'height', 'metadata'
+            ])
+
+    return result
@@ -0,0 +1,130 @@
+"""
+Media Verification
+==================
+
+Checks that the files of MediaFile records exist in storage.
+
+Checking one file costs a storage round trip (an HTTP request on GCS), so
+files are checked concurrently by a bounded thread pool; database access
+stays in the calling thread. Records are processed in chunks, oldest
+`last_verified` first, and each chunk is written back with one
+bulk_update(). A time budget stops the run between chunks, so repeated runs
+verify the whole library incrementally without ever running for too long.
+
+A file that could not be checked (storage error) keeps its previous state
+and `last_verified`, so it comes first again in the next run.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+logger = logging.getLogger("webapp")
+
+DEFAULT_WORKERS = 8
+CHUNK_SIZE = 500
+
+
+def _check_exists(file_path):
+    """(exists, error) for one storage path; runs in a pool thread"""
+    try:
+        return default_storage.exists(file_path), None
+    except Exception as e:  # pylint: disable=broad-except
+        return None, e
+
+
+def verify_media_files(queryset=None, workers=DEFAULT_WORKERS, budget_seconds=None,
+                       stale_after=None, limit=None, dry_run=False, progress=None):
+    """
+    Verify that media files exist in storage.
+
+    Args:
+        queryset: MediaFiles to verify (all live MediaFiles if None)
+        workers: Concurrent storage checks
+        budget_seconds: Stop starting new chunks after this many seconds
+        stale_after: Only verify files not verified within this timedelta
+        limit: Verify at most this many files
+        dry_run: Check storage without writing results
+        progress: Optional callback(result dict) after each chunk
+
+    Returns:
+        Dict with checked/found/missing/errors counts, remaining, duration
+        and files_per_second
+    """
+    from web.models import MediaFile
+
+    if queryset is None:
+        queryset = MediaFile.objects.all()
+    if stale_after is not None:
+        queryset = queryset.filter(last_verified__lt=timezone.now() - stale_after)
+    queryset = queryset.order_by('last_verified', 'pk')
+
+    result = {
+        'checked': 0,
+        'found': 0,
+        'missing': 0,
+        'errors': 0,
+        'newly_missing': 0,
+        'remaining': 0,
+        'budget_exhausted': False,
+    }
+
+    started = time.monotonic()
+    # Work through primary keys so updated rows never shift the next chunk
+    candidate_ids = queryset.values_list('pk', flat=True)
+    if limit:
+        candidate_ids = candidate_ids[:limit]
+    candidate_ids = list(candidate_ids)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for offset in range(0, len(candidate_ids), CHUNK_SIZE):
+            if budget_seconds is not None and time.monotonic() - started >= budget_seconds:
+                result['budget_exhausted'] = True
+                result['remaining'] = len(candidate_ids) - offset
+                break
+
+            chunk = list(MediaFile.objects.filter(pk__in=candidate_ids[offset:offset + CHUNK_SIZE]).only(
+                'pk', 'file_path', 'file_exists', 'last_verified'
+            ))
+
+            # Deduplicated uploads share a path: check each path once
+            paths = sorted({media_file.file_path for media_file in chunk})
+            checks = dict(zip(paths, pool.map(_check_exists, paths)))
+
+            now = timezone.now()
+            changed = []
+            for media_file in chunk:
+                exists, error = checks[media_file.file_path]
+                if error is not None:
+                    logger.error(f"Error verifying MediaFile {media_file.pk} ({media_file.file_path}): {error}")
+                    result['errors'] += 1
+                    continue
+
+                result['checked'] += 1
+                if exists:
+                    result['found'] += 1
+                else:
+                    result['missing'] += 1
+                    if media_file.file_exists:
+                        result['newly_missing'] += 1
+                media_file.file_exists = exists
+                media_file.last_verified = now
+                changed.append(media_file)
+
+            if changed and not dry_run:
+                MediaFile.objects.bulk_update(changed, ['file_exists', 'last_verified'])
+
+            if progress:
+                progress(result)
+
+    result['duration'] = time.monotonic() - started
+    result['files_per_second'] = result['checked'] / result['duration'] if result['duration'] > 0 else 0.0
+
+    logger.info(
+        f"Media verification: {result['checked']} files checked ({result['missing']} missing, "
+        f"{result['errors']} errors) in {result['duration']:.1f}s, {result['remaining']} remaining"
+    )
+    return result
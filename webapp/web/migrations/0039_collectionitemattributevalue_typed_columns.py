@@ -0,0 +1,67 @@
+# Generated by Django 5.2 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0038_remove_collectionitem_web_collectionitem_collection_status_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="collectionitemattributevalue",
+            name="value_boolean",
+            field=models.BooleanField(
+                blank=True,
+                editable=False,
+                help_text="Boolean interpretation of the value (BOOLEAN attributes)",
+                null=True,
+                verbose_name="Boolean Value",
+            ),
+        ),
+        migrations.AddField(
+            model_name="collectionitemattributevalue",
+            name="value_date",
+            field=models.DateField(
+                blank=True,
+                editable=False,
+                help_text="Date interpretation of the value (DATE attributes)",
+                null=True,
+                verbose_name="Date Value",
+            ),
+        ),
+        migrations.AddField(
+            model_name="collectionitemattributevalue",
+            name="value_number",
+            field=models.FloatField(
+                blank=True,
+                editable=False,
+                help_text="Numeric interpretation of the value (NUMBER attributes and numeric text)",
+                null=True,
+                verbose_name="Numeric Value",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="collectionitemattributevalue",
+            index=models.Index(
+                fields=["item_attribute", "value_number"],
+                name="web_attrvalue_attr_number_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="collectionitemattributevalue",
+            index=models.Index(
+                fields=["item_attribute", "value_date"],
+                name="web_attrvalue_attr_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="collectionitemattributevalue",
+            index=models.Index(
+                fields=["item_attribute", "value_boolean"],
+                name="web_attrvalue_attr_bool_idx",
+            ),
+        ),
+    ]
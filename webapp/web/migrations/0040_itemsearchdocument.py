@@ -0,0 +1,113 @@
+# Generated by Django 5.2 on 2026-10-16 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE web_itemsearchdocument
+    ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', document)) STORED
+    """,
+    "CREATE INDEX web_itemsearch_vector_gin ON web_itemsearchdocument USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS web_itemsearch_vector_gin",
+    "ALTER TABLE web_itemsearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE web_itemsearch_fts USING fts5(
+        document,
+        content='web_itemsearchdocument',
+        content_rowid='item_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER web_itemsearch_fts_ai AFTER INSERT ON web_itemsearchdocument BEGIN
+        INSERT INTO web_itemsearch_fts(rowid, document) VALUES (new.item_id, new.document);
+    END
+    """,
+    """
+    CREATE TRIGGER web_itemsearch_fts_ad AFTER DELETE ON web_itemsearchdocument BEGIN
+        INSERT INTO web_itemsearch_fts(web_itemsearch_fts, rowid, document) VALUES ('delete', old.item_id, old.document);
+    END
+    """,
+    """
+    CREATE TRIGGER web_itemsearch_fts_au AFTER UPDATE ON web_itemsearchdocument BEGIN
+        INSERT INTO web_itemsearch_fts(web_itemsearch_fts, rowid, document) VALUES ('delete', old.item_id, old.document);
+        INSERT INTO web_itemsearch_fts(rowid, document) VALUES (new.item_id, new.document);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS web_itemsearch_fts_au",
+    "DROP TRIGGER IF EXISTS web_itemsearch_fts_ad",
+    "DROP TRIGGER IF EXISTS web_itemsearch_fts_ai",
+    "DROP TABLE IF EXISTS web_itemsearch_fts",
+]
+
+
+def _run_statements(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run_statements(schema_editor, POSTGRES_FORWARD)
+    elif vendor == "sqlite":
+        _run_statements(schema_editor, SQLITE_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run_statements(schema_editor, POSTGRES_REVERSE)
+    elif vendor == "sqlite":
+        _run_statements(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0039_collectionitemattributevalue_typed_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItemSearchDocument",
+            fields=[
+                (
+                    "item",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="web.collectionitem",
+                        verbose_name="Collection Item",
+                    ),
+                ),
+                (
+                    "document",
+                    models.TextField(blank=True, default="", verbose_name="Search Document"),
+                ),
+                (
+                    "updated",
+                    models.DateTimeField(auto_now=True, verbose_name="Date updated"),
+                ),
+            ],
+            options={
+                "verbose_name": "Item Search Document",
+                "verbose_name_plural": "Item Search Documents",
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-16 12:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0040_itemsearchdocument"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollectionFacetCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "facet",
+                    models.CharField(
+                        choices=[
+                            ("TOTAL", "Total"),
+                            ("STATUS", "Status"),
+                            ("ITEM_TYPE", "Item Type"),
+                            ("ATTRIBUTE", "Attribute Value"),
+                        ],
+                        max_length=20,
+                        verbose_name="Facet",
+                    ),
+                ),
+                (
+                    "value",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="Status value or attribute value of the facet (empty for TOTAL and ITEM_TYPE)",
+                        verbose_name="Value",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0, verbose_name="Count")),
+                (
+                    "collection",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="facet_counts",
+                        to="web.collection",
+                        verbose_name="Collection",
+                    ),
+                ),
+                (
+                    "item_attribute",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="web.itemattribute",
+                        verbose_name="Attribute Definition",
+                    ),
+                ),
+                (
+                    "item_type",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="web.itemtype",
+                        verbose_name="Item Type",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Collection Facet Count",
+                "verbose_name_plural": "Collection Facet Counts",
+                "indexes": [
+                    models.Index(
+                        fields=["collection", "facet"],
+                        name="web_facet_collection_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-16 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0041_collectionfacetcount"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="collectionfacetcount",
+            index=models.Index(
+                fields=["item_attribute", "collection"], name="web_facet_attribute_idx"
+            ),
+        ),
+    ]
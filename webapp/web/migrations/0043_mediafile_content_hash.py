@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-16 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0042_collectionfacetcount_attribute_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mediafile",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                help_text="SHA-256 of the file content; MediaFiles with the same content share one stored file",
+                max_length=64,
+                null=True,
+                verbose_name="Content Hash",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="mediafile",
+            index=models.Index(fields=["content_hash"], name="web_mediafile_hash_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="mediafile",
+            index=models.Index(fields=["file_path"], name="web_mediafile_path_idx"),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2 on 2026-10-16 15:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0043_mediafile_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ModerationJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("RUNNING", "Running"),
+                            ("DONE", "Done"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="PENDING",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "force",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Re-analyze even if the file has already been checked",
+                        verbose_name="Force",
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0, verbose_name="Attempts")),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="The job is not claimed before this time (retry backoff)",
+                        verbose_name="Run After",
+                    ),
+                ),
+                (
+                    "locked_by",
+                    models.CharField(
+                        blank=True, default="", max_length=100, verbose_name="Locked By"
+                    ),
+                ),
+                (
+                    "locked_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Locked At"),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, default="", verbose_name="Last Error"),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Date created"),
+                ),
+                (
+                    "updated",
+                    models.DateTimeField(auto_now=True, verbose_name="Date updated"),
+                ),
+                (
+                    "media_file",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="moderation_jobs",
+                        to="web.mediafile",
+                        verbose_name="Media File",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Moderation Job",
+                "verbose_name_plural": "Moderation Jobs",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"], name="web_modjob_claim_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-16 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0044_moderationjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ModerationVerdict",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(max_length=64, verbose_name="Content Hash"),
+                ),
+                (
+                    "version",
+                    models.CharField(max_length=100, verbose_name="Detector Version"),
+                ),
+                (
+                    "is_inappropriate",
+                    models.BooleanField(verbose_name="Inappropriate"),
+                ),
+                (
+                    "confidence_score",
+                    models.FloatField(verbose_name="Confidence Score"),
+                ),
+                (
+                    "details",
+                    models.JSONField(blank=True, default=dict, verbose_name="Details"),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Date created"),
+                ),
+            ],
+            options={
+                "verbose_name": "Moderation Verdict",
+                "verbose_name_plural": "Moderation Verdicts",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("content_hash", "version"),
+                        name="web_verdict_hash_version_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.2 on 2026-10-16 17:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0045_moderationverdict"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StorageInventorySnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("RUNNING", "Running"),
+                            ("COMPLETE", "Complete"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="RUNNING",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "backend",
+                    models.CharField(
+                        blank=True, default="", max_length=100, verbose_name="Storage Backend"
+                    ),
+                ),
+                (
+                    "started",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Started"),
+                ),
+                (
+                    "completed",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Completed"),
+                ),
+                ("file_count", models.IntegerField(default=0, verbose_name="Files")),
+                (
+                    "total_size",
+                    models.BigIntegerField(default=0, verbose_name="Total Size (bytes)"),
+                ),
+                (
+                    "orphan_count",
+                    models.IntegerField(default=0, verbose_name="Orphaned Files"),
+                ),
+                (
+                    "orphan_size",
+                    models.BigIntegerField(default=0, verbose_name="Orphaned Size (bytes)"),
+                ),
+                ("error", models.TextField(blank=True, default="", verbose_name="Error")),
+            ],
+            options={
+                "verbose_name": "Storage Inventory Snapshot",
+                "verbose_name_plural": "Storage Inventory Snapshots",
+                "ordering": ["-started"],
+            },
+        ),
+        migrations.CreateModel(
+            name="StorageInventoryEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(max_length=500, verbose_name="Path")),
+                (
+                    "size",
+                    models.BigIntegerField(blank=True, null=True, verbose_name="Size (bytes)"),
+                ),
+                (
+                    "generation",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="GCS object generation, or modification time (ns) on the local filesystem",
+                        max_length=64,
+                        verbose_name="Generation",
+                    ),
+                ),
+                (
+                    "modified",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Modified"),
+                ),
+                (
+                    "snapshot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entries",
+                        to="web.storageinventorysnapshot",
+                        verbose_name="Snapshot",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Storage Inventory Entry",
+                "verbose_name_plural": "Storage Inventory Entries",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("snapshot", "path"),
+                        name="web_inventory_snapshot_path_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,206 @@
+# Generated by Django 5.2 on 2026-10-16 18:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0046_storageinventory"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("RUNNING", "Running"),
+                            ("DONE", "Done"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="PENDING",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "file_name",
+                    models.CharField(max_length=255, verbose_name="File Name"),
+                ),
+                (
+                    "file_path",
+                    models.CharField(
+                        help_text="Path of the uploaded file in storage, deleted when the job finishes",
+                        max_length=500,
+                        verbose_name="Staged File",
+                    ),
+                ),
+                (
+                    "file_format",
+                    models.CharField(
+                        choices=[
+                            ("json", "JSON"),
+                            ("yaml", "YAML"),
+                            ("jsonl", "JSON Lines"),
+                        ],
+                        max_length=10,
+                        verbose_name="Format",
+                    ),
+                ),
+                (
+                    "download_images",
+                    models.BooleanField(default=False, verbose_name="Download Images"),
+                ),
+                (
+                    "records_total",
+                    models.IntegerField(default=0, verbose_name="Records"),
+                ),
+                (
+                    "records_processed",
+                    models.IntegerField(default=0, verbose_name="Records Processed"),
+                ),
+                (
+                    "collections_created",
+                    models.IntegerField(default=0, verbose_name="Collections Created"),
+                ),
+                (
+                    "items_created",
+                    models.IntegerField(default=0, verbose_name="Items Created"),
+                ),
+                (
+                    "images_downloaded",
+                    models.IntegerField(default=0, verbose_name="Images Downloaded"),
+                ),
+                (
+                    "links_created",
+                    models.IntegerField(default=0, verbose_name="Links Created"),
+                ),
+                (
+                    "item_types_created",
+                    models.IntegerField(default=0, verbose_name="Item Types Created"),
+                ),
+                (
+                    "warnings",
+                    models.JSONField(blank=True, default=list, verbose_name="Warnings"),
+                ),
+                (
+                    "errors",
+                    models.JSONField(blank=True, default=list, verbose_name="Errors"),
+                ),
+                (
+                    "warning_count",
+                    models.IntegerField(default=0, verbose_name="Warnings"),
+                ),
+                (
+                    "error_count",
+                    models.IntegerField(default=0, verbose_name="Errors"),
+                ),
+                (
+                    "checkpoint",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Records committed at the last collection boundary; a resumed job skips them",
+                        verbose_name="Checkpoint",
+                    ),
+                ),
+                (
+                    "checkpoint_state",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="Counters, warnings and errors at the checkpoint",
+                        verbose_name="Checkpoint State",
+                    ),
+                ),
+                (
+                    "partial_collection_id",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Collection being imported after the checkpoint, deleted when the job is resumed",
+                        null=True,
+                        verbose_name="Partial Collection",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.IntegerField(default=0, verbose_name="Attempts"),
+                ),
+                (
+                    "locked_by",
+                    models.CharField(
+                        blank=True, default="", max_length=100, verbose_name="Locked By"
+                    ),
+                ),
+                (
+                    "locked_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Locked At"),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, default="", verbose_name="Last Error"),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Date created"),
+                ),
+                (
+                    "started",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Started"),
+                ),
+                (
+                    "finished",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Finished"),
+                ),
+                (
+                    "updated",
+                    models.DateTimeField(auto_now=True, verbose_name="Date updated"),
+                ),
+                (
+                    "admin_user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Started By",
+                    ),
+                ),
+                (
+                    "target_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="import_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Target User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Import Job",
+                "verbose_name_plural": "Import Jobs",
+                "ordering": ["-created"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created"], name="web_importjob_claim_idx"
+                    )
+                ],
+            },
+        ),
+    ]
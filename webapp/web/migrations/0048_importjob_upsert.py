@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-16 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0047_importjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="mode",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="create or upsert; empty uses the mode option of the file",
+                max_length=10,
+                verbose_name="Mode",
+            ),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="delete_missing",
+            field=models.BooleanField(
+                default=False,
+                help_text="Upsert: delete items of matched collections that are not in the file",
+                verbose_name="Delete Missing Items",
+            ),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="collections_updated",
+            field=models.IntegerField(default=0, verbose_name="Collections Updated"),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="items_updated",
+            field=models.IntegerField(default=0, verbose_name="Items Updated"),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="items_unchanged",
+            field=models.IntegerField(default=0, verbose_name="Items Unchanged"),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="items_deleted",
+            field=models.IntegerField(default=0, verbose_name="Items Deleted"),
+        ),
+    ]
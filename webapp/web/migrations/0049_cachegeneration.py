@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0048_importjob_upsert"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheGeneration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(max_length=100, unique=True, verbose_name="Scope"),
+                ),
+                (
+                    "generation",
+                    models.BigIntegerField(default=0, verbose_name="Generation"),
+                ),
+                (
+                    "updated",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated"),
+                ),
+            ],
+            options={
+                "verbose_name": "Cache Generation",
+                "verbose_name_plural": "Cache Generations",
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2 on 2026-10-16 21:30
+
+from datetime import datetime
+from urllib.parse import urlparse
+
+from django.db import migrations
+from django.db.models import Prefetch
+
+BATCH_SIZE = 500
+
+
+def _display_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%B %d, %Y")
+    except (ValueError, TypeError):
+        return value
+
+
+def _link_name(link):
+    if link.display_name:
+        return link.display_name
+    if link.link_pattern_id and link.link_pattern:
+        return link.link_pattern.display_name
+    domain = urlparse(link.url).netloc.lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def _build_document(item):
+    """Same text as ItemSearchDocument.build_document(), from the historical models"""
+    parts = [item.name, item.description or "", item.your_id or ""]
+
+    for attr_value in item.live_attribute_values:
+        attr_type = attr_value.item_attribute.attribute_type
+        if attr_type == "BOOLEAN" or not attr_value.value:
+            continue
+        display_value = _display_date(attr_value.value) if attr_type == "DATE" else attr_value.value
+        parts.append(display_value)
+        if attr_value.value != display_value:
+            parts.append(attr_value.value)
+
+    for link in item.live_links:
+        parts.append(_link_name(link))
+
+    return "\n".join(part for part in parts if part)
+
+
+def backfill_search_documents(apps, schema_editor):
+    """Build the search documents of existing items, in batches of BATCH_SIZE"""
+    CollectionItem = apps.get_model("web", "CollectionItem")
+    CollectionItemAttributeValue = apps.get_model("web", "CollectionItemAttributeValue")
+    CollectionItemLink = apps.get_model("web", "CollectionItemLink")
+    ItemSearchDocument = apps.get_model("web", "ItemSearchDocument")
+
+    items = CollectionItem.objects.filter(is_deleted=False, search_document__isnull=True).prefetch_related(
+        Prefetch(
+            "attribute_values",
+            queryset=CollectionItemAttributeValue.objects.filter(is_deleted=False).select_related("item_attribute"),
+            to_attr="live_attribute_values",
+        ),
+        Prefetch(
+            "links",
+            queryset=CollectionItemLink.objects.filter(is_deleted=False).select_related("link_pattern"),
+            to_attr="live_links",
+        ),
+    ).order_by("pk")
+
+    last_pk = 0
+    while True:
+        batch = list(items.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        ItemSearchDocument.objects.bulk_create(
+            [ItemSearchDocument(item_id=item.pk, document=_build_document(item)) for item in batch],
+            ignore_conflicts=True,
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own, so large tables are not filled in one transaction
+    atomic = False
+
+    dependencies = [
+        ("web", "0049_cachegeneration"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
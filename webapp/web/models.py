@@ -6,9 +6,11 @@
 # pylint: disable=line-too-long
 
 import logging
+import math
 import os
 import re
 import urllib.parse
+from contextlib import nullcontext
 from datetime import datetime
 
 from django.conf import settings
@@ -16,8 +18,9 @@ from django.contrib.auth import get_user_model
 from django.contrib.sites.models import Site
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.files.storage import default_storage
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from nanoid_field import NanoidField
 
@@ -103,6 +106,13 @@ class MediaFile(BerylModel):
     original_filename = models.CharField(max_length=255, verbose_name=_("Original Filename"))
     file_size = models.BigIntegerField(null=True, blank=True, verbose_name=_("File Size (bytes)"))
     content_type = models.CharField(max_length=100, blank=True, null=True, verbose_name=_("Content Type"))
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        verbose_name=_("Content Hash"),
+        help_text=_("SHA-256 of the file content; MediaFiles with the same content share one stored file")
+    )
     
     # Media categorization
     media_type = models.CharField(
@@ -171,6 +181,8 @@ class MediaFile(BerylModel):
             models.Index(fields=['file_exists', 'last_verified']),
             models.Index(fields=['content_moderation_status']),
             models.Index(fields=['content_moderation_checked_at']),
+            models.Index(fields=['content_hash'], name='web_mediafile_hash_idx'),
+            models.Index(fields=['file_path'], name='web_mediafile_path_idx'),
         ]
     
     def __str__(self):
@@ -200,22 +212,81 @@ class MediaFile(BerylModel):
             str: File URL or error image URL
         """
         # For SYS admin views, always return actual file URL
-        if request and hasattr(request, 'resolver_match') and request.resolver_match:
-            url_name = getattr(request.resolver_match, 'url_name', '')
-            if url_name and url_name.startswith('sys_'):
-                return self.file_url
+        if self._is_sys_request(request):
+            return self.file_url
         
         # For user-facing content, check moderation status
-        if self.content_moderation_status in [
-            self.ContentModerationStatus.FLAGGED, 
-            self.ContentModerationStatus.REJECTED
-        ]:
+        if self._is_blocked_content():
             # Return a static error image URL
             from django.conf import settings
             return f"{settings.STATIC_URL}images/content-unavailable.svg"
         
         return self.file_url
     
+    @staticmethod
+    def _is_sys_request(request):
+        """True for requests to SYS admin views"""
+        if request and hasattr(request, 'resolver_match') and request.resolver_match:
+            url_name = getattr(request.resolver_match, 'url_name', '')
+            return bool(url_name and url_name.startswith('sys_'))
+        return False
+    
+    def _is_blocked_content(self):
+        return self.content_moderation_status in [
+            self.ContentModerationStatus.FLAGGED, 
+            self.ContentModerationStatus.REJECTED
+        ]
+    
+    def get_derivatives(self, fmt='jpeg'):
+        """
+        Resized variants of this image (see web/image_derivatives.py)
+        
+        Returns:
+            list: (width, storage path) tuples, narrowest first
+        """
+        paths = (self.metadata or {}).get('derivatives', {}).get(fmt, {})
+        return sorted((int(width), path) for width, path in paths.items())
+    
+    def get_srcset(self, fmt='jpeg'):
+        """
+        srcset attribute value listing the resized variants in a format.
+        The original is added as the widest JPEG candidate.
+        Returns an empty string when there are no variants.
+        """
+        derivatives = self.get_derivatives(fmt)
+        if not derivatives:
+            return ""
+        
+        candidates = []
+        for width, path in derivatives:
+            try:
+                candidates.append(f"{default_storage.url(path)} {width}w")
+            except Exception as e:
+                logger.error(f"Error generating URL for {path}: {str(e)}")
+        if fmt == 'jpeg' and self.width and self.width > derivatives[-1][0] and self.file_url:
+            candidates.append(f"{self.file_url} {self.width}w")
+        return ", ".join(candidates)
+    
+    def get_user_safe_srcset(self, request=None, fmt='jpeg'):
+        """
+        srcset for user-facing content: empty for flagged or rejected images
+        (their src is the content-unavailable image). SYS admin views always
+        get the real variants.
+        """
+        if not self._is_sys_request(request) and self._is_blocked_content():
+            return ""
+        return self.get_srcset(fmt)
+    
+    def generate_derivatives(self, image=None):
+        """
+        Write resized WebP/JPEG variants of this image and record them in metadata
+        
+        Args:
+            image: Already decoded PIL image of the file (read from storage if None)
+        """
+        from web.image_derivatives import generate_derivatives
+        return generate_derivatives(self, image=image)
+    
     @property
     def formatted_file_size(self):
         """
@@ -248,16 +319,38 @@ class MediaFile(BerylModel):
             self.save(update_fields=['file_exists', 'last_verified'])
             return False
     
+    def get_reference_count(self):
+        """
+        Number of other live MediaFiles sharing this file in storage
+        (deduplicated uploads, see web/media_dedup.py)
+        """
+        from web.media_dedup import reference_count
+        return reference_count(self.file_path, exclude_pk=self.pk)
+    
     def delete_file(self):
         """
-        Delete the actual file from storage (not the database record)
+        Delete the actual file from storage (not the database record).
+        A file shared with other MediaFiles stays in storage until the last
+        of them is deleted; this record is released either way. The references
+        are locked while counting, so no upload adopts the file meanwhile.
         """
+        from web.media_dedup import lock_references
+
         try:
-            if default_storage.exists(self.file_path):
-                default_storage.delete(self.file_path)
-                self.file_exists = False
-                self.save(update_fields=['file_exists'])
-                return True
+            with transaction.atomic():
+                lock_references([self.file_path], [self.pk])
+                if self.get_reference_count():
+                    self.file_exists = False
+                    self.save(update_fields=['file_exists'])
+                    logger.info(f"Released shared file {self.file_path} for MediaFile {self.hash}")
+                    return True
+                if default_storage.exists(self.file_path):
+                    from web.image_derivatives import delete_derivatives
+                    delete_derivatives(self)
+                    default_storage.delete(self.file_path)
+                    self.file_exists = False
+                    self.save(update_fields=['file_exists'])
+                    return True
         except Exception as e:
             logger.error(f"Error deleting file for MediaFile {self.hash}: {str(e)}")
         return False
@@ -318,7 +411,8 @@ class MediaFile(BerylModel):
     @classmethod
     def cleanup_missing_files(cls):
         """
-        Remove database records for files that no longer exist in storage
+        Remove database records for files that no longer exist in storage.
+        Only records are removed, so files shared with other MediaFiles are kept.
         """
         missing_files = cls.objects.filter(file_exists=False)
         count = missing_files.count()
@@ -331,24 +425,40 @@ class MediaFile(BerylModel):
         """
         is_new = self.pk is None
         
-        if not self.storage_backend:
-            # Determine storage backend based on feature flag only
-            use_gcs = getattr(settings, 'FEATURE_FLAGS', {}).get('USE_GCS_STORAGE', False)
+        # The adopted file stays locked until this record is saved (see delete_file)
+        with transaction.atomic() if is_new and self.content_hash else nullcontext():
+            # Share the stored file of an earlier upload with the same content
+            if is_new and self.content_hash:
+                from web.media_dedup import adopt_existing_file, find_existing_file
+                existing = find_existing_file(self.content_hash, lock=True)
+                if existing:
+                    adopt_existing_file(self, existing)
             
-            if use_gcs:
-                self.storage_backend = self.StorageBackend.GCS
-            else:
-                self.storage_backend = self.StorageBackend.LOCAL
+            if not self.storage_backend:
+                # Determine storage backend based on feature flag only
+                use_gcs = getattr(settings, 'FEATURE_FLAGS', {}).get('USE_GCS_STORAGE', False)
+                
+                if use_gcs:
+                    self.storage_backend = self.StorageBackend.GCS
+                else:
+                    self.storage_backend = self.StorageBackend.LOCAL
+            
+            super().save(*args, **kwargs)
         
-        super().save(*args, **kwargs)
+        is_new_image = is_new and self.content_type and self.content_type.startswith('image/')
         
-        # Trigger content moderation for new image files
-        if is_new and self.content_type and self.content_type.startswith('image/'):
+        # Resized variants for srcset are generated in the background
+        # (`manage.py generate_image_derivatives --watch`), not in the upload request
+        
+        # Trigger content moderation for new image files, shared files included: the
+        # verdict cache makes the rerun free and the policy applies to this file's owner
+        if is_new_image and not self.content_moderation_checked_at:
             self.schedule_content_moderation()
     
     def schedule_content_moderation(self):
         """
-        Schedule content moderation analysis for this media file
+        Schedule content moderation analysis for this media file.
+        Only a job is queued; `manage.py run_moderation_worker` runs the analysis.
         """
         from django.conf import settings
         
@@ -358,13 +468,10 @@ class MediaFile(BerylModel):
         
         try:
             # Import here to avoid circular imports
-            from web.services.content_moderation import content_moderation_service
-            
-            # Process in background or immediately based on configuration
-            # For now, process immediately
-            result = content_moderation_service.process_media_file(self)
+            from web.moderation_queue import enqueue_moderation
             
-            logger.info(f"Content moderation completed for {self.original_filename}: {result}")
+            job = enqueue_moderation(self)
+            logger.info(f"Content moderation queued for {self.original_filename} (job {job.pk})")
             
         except Exception as e:
             logger.error(f"Failed to schedule content moderation for {self.original_filename}: {e}")
@@ -609,6 +716,30 @@ class ItemAttribute(BerylModel):
             
         return value
 
+    def sync_value_typed_columns(self, batch_size=1000):
+        """
+        Recompute the typed shadow columns of every stored value of this
+        attribute. Needed after attribute_type changes, since the columns are
+        derived from the attribute type.
+
+        Returns:
+            int: Number of values processed
+        """
+        processed = 0
+        batch = []
+        values = CollectionItemAttributeValue.objects.all_with_deleted().filter(item_attribute=self)
+        for attr_value in values.select_related('item_attribute').iterator(chunk_size=batch_size):
+            attr_value.sync_typed_columns()
+            batch.append(attr_value)
+            if len(batch) >= batch_size:
+                CollectionItemAttributeValue.objects.all_with_deleted().bulk_update(batch, CollectionItemAttributeValue.TYPED_FIELDS)
+                processed += len(batch)
+                batch = []
+        if batch:
+            CollectionItemAttributeValue.objects.all_with_deleted().bulk_update(batch, CollectionItemAttributeValue.TYPED_FIELDS)
+            processed += len(batch)
+        return processed
+
 
 class Location(BerylModel):
     """
@@ -783,6 +914,73 @@ class Collection(BerylModel):
         """Get the default image for this collection"""
         return self.images.filter(is_default=True).first()
 
+    def order_items(self, items):
+        """
+        Apply this collection's sort_by setting to a CollectionItem queryset.
+
+        Attribute sorting is done in the database using the typed shadow
+        columns of CollectionItemAttributeValue: numeric values first (numeric
+        order), then text values (case-insensitive), items without the
+        attribute last. Name (case-insensitive, annotated as `name_lower`) is
+        always the final tie-breaker.
+
+        Args:
+            items: QuerySet of CollectionItem objects
+
+        Returns:
+            Ordered QuerySet
+        """
+        from django.db.models.functions import Lower
+
+        items = items.annotate(name_lower=Lower('name'))
+        if self.sort_by == self.SortBy.CREATED:
+            return items.order_by('-created', 'name_lower')
+        if self.sort_by == self.SortBy.UPDATED:
+            return items.order_by('-updated', 'name_lower')
+        if self.sort_by != self.SortBy.ATTRIBUTE or not self.sort_attribute_id:
+            return items.order_by('name_lower')
+
+        attr_values = CollectionItemAttributeValue.objects.filter(
+            item=models.OuterRef('pk'),
+            item_attribute_id=self.sort_attribute_id
+        )
+        attr_type = self.sort_attribute.attribute_type
+
+        if attr_type == ItemAttribute.AttributeType.BOOLEAN:
+            typed_field = 'value_boolean'
+        elif attr_type == ItemAttribute.AttributeType.DATE:
+            typed_field = 'value_date'
+        else:
+            typed_field = 'value_number'
+
+        items = items.annotate(
+            sort_typed=models.Subquery(attr_values.order_by(models.F(typed_field).asc(nulls_last=True)).values(typed_field)[:1]),
+            sort_text=models.Subquery(attr_values.order_by('value').values('value')[:1]),
+        )
+        return items.order_by(
+            models.F('sort_typed').asc(nulls_last=True),
+            Lower('sort_text').asc(nulls_last=True),
+            'name_lower'
+        )
+
+    def get_item_keyset_ordering(self):
+        """
+        Ordering of items for cursor pagination (web.pagination.CursorPaginator),
+        matching order_items() with `id` as the unique tie-breaker. The
+        queryset must come from order_items(), which annotates `name_lower`.
+
+        Returns:
+            tuple of field names, or None for attribute sorting (nullable
+            annotated sort keys cannot be keyed; use order_items() instead)
+        """
+        if self.sort_by == self.SortBy.CREATED:
+            return ('-created', 'name_lower', 'id')
+        if self.sort_by == self.SortBy.UPDATED:
+            return ('-updated', 'name_lower', 'id')
+        if self.sort_by != self.SortBy.ATTRIBUTE or not self.sort_attribute_id:
+            return ('name_lower', 'id')
+        return None
+
 
 class CollectionItem(BerylModel):
 
@@ -1390,11 +1588,21 @@ class LinkPattern(BerylModel):
     def find_matching_pattern(cls, url):
         """
         Find the first matching pattern for a given URL
+        (uses the process-wide compiled matcher, see web/link_matching.py)
         """
-        for pattern in cls.objects.filter(is_active=True):
-            if pattern.matches_url(url):
-                return pattern
-        return None
+        from web.link_matching import match_link_pattern
+        return match_link_pattern(url)
+
+    @classmethod
+    def find_matching_patterns(cls, urls):
+        """
+        Find the first matching pattern for each of several URLs
+
+        Returns:
+            list: LinkPattern or None per URL, in order
+        """
+        from web.link_matching import match_link_patterns
+        return match_link_patterns(urls)
 
 
 class CollectionItemLink(BerylModel):
@@ -1483,6 +1691,32 @@ class CollectionItemAttributeValue(BerylModel):
         help_text=_("Stored as text, converted to appropriate type on retrieval")
     )
 
+    # Typed shadow columns, derived from `value` on save so the database can
+    # sort, range-filter and group attribute values without Python conversion.
+    value_number = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_("Numeric Value"),
+        help_text=_("Numeric interpretation of the value (NUMBER attributes and numeric text)")
+    )
+    value_date = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_("Date Value"),
+        help_text=_("Date interpretation of the value (DATE attributes)")
+    )
+    value_boolean = models.BooleanField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_("Boolean Value"),
+        help_text=_("Boolean interpretation of the value (BOOLEAN attributes)")
+    )
+
+    TYPED_FIELDS = ['value_number', 'value_date', 'value_boolean']
+
     class Meta:
         verbose_name = _("Collection Item Attribute Value")
         verbose_name_plural = _("Collection Item Attribute Values")
@@ -1490,6 +1724,9 @@ class CollectionItemAttributeValue(BerylModel):
         indexes = [
             models.Index(fields=["item", "item_attribute"]),
             models.Index(fields=["item", "item_attribute", "value"]),
+            models.Index(fields=["item_attribute", "value_number"], name="web_attrvalue_attr_number_idx"),
+            models.Index(fields=["item_attribute", "value_date"], name="web_attrvalue_attr_date_idx"),
+            models.Index(fields=["item_attribute", "value_boolean"], name="web_attrvalue_attr_bool_idx"),
         ]
 
     def __str__(self):
@@ -1571,6 +1808,45 @@ class CollectionItemAttributeValue(BerylModel):
             # Everything else stored as string
             self.value = str(value)
 
+        self.sync_typed_columns()
+
+    def sync_typed_columns(self):
+        """
+        Populate the typed shadow columns from the stored text value.
+
+        NUMBER values (and any other value that parses as a finite number, to
+        match the legacy "numbers first" attribute sort) fill value_number,
+        DATE values fill value_date and BOOLEAN values fill value_boolean.
+        Values that cannot be converted leave the column NULL.
+        """
+        self.value_number = None
+        self.value_date = None
+        self.value_boolean = None
+
+        if not self.value:
+            return
+
+        attr_type = self.item_attribute.attribute_type
+        raw = str(self.value).strip()
+
+        if attr_type == ItemAttribute.AttributeType.BOOLEAN:
+            self.value_boolean = raw.lower() in ('true', '1', 'yes', 'on')
+            return
+
+        if attr_type == ItemAttribute.AttributeType.DATE:
+            try:
+                self.value_date = datetime.strptime(raw, '%Y-%m-%d').date()
+            except ValueError:
+                pass
+            return
+
+        try:
+            number = float(raw)
+        except (ValueError, TypeError):
+            return
+        if math.isfinite(number):
+            self.value_number = number
+
     def get_display_value(self):
         """
         Get a formatted display value suitable for templates.
@@ -1622,6 +1898,12 @@ class CollectionItemAttributeValue(BerylModel):
         if not self.item_attribute.skip_validation:
             self.validate()
 
+        # Keep typed shadow columns in step with the text value
+        self.sync_typed_columns()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'value' in update_fields:
+            kwargs['update_fields'] = list(set(update_fields) | set(self.TYPED_FIELDS))
+
         super().save(*args, **kwargs)
 
 
@@ -1765,6 +2047,451 @@ class CollectionItemImage(BerylModel):
         return cls.objects.filter(item=item).count() < 3
 
 
+class ItemSearchDocument(models.Model):
+    """
+    Full-text search document for a CollectionItem.
+
+    Concatenates the searchable text of an item (name, description, your_id,
+    attribute values and link names). The database indexes it natively:
+    a generated tsvector column with a GIN index on PostgreSQL, an FTS5
+    external-content table on SQLite (see migration 0040 and web/search.py).
+    """
+    item = models.OneToOneField(
+        CollectionItem,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+        verbose_name=_("Collection Item")
+    )
+    document = models.TextField(blank=True, default="", verbose_name=_("Search Document"))
+    updated = models.DateTimeField(auto_now=True, verbose_name=_("Date updated"))
+
+    class Meta:
+        verbose_name = _("Item Search Document")
+        verbose_name_plural = _("Item Search Documents")
+
+    def __str__(self):
+        return f"Search document for item {self.item_id}"
+
+    # Relations read by build_document(); prefetch them when building in bulk
+    PREFETCH = ('attribute_values__item_attribute', 'links__link_pattern')
+
+    @staticmethod
+    def build_document(item):
+        """
+        Build the searchable text of an item.
+
+        Args:
+            item: CollectionItem instance (ideally with PREFETCH relations prefetched)
+
+        Returns:
+            str: Newline separated text fragments
+        """
+        parts = [item.name, item.description or "", item.your_id or ""]
+
+        for attr_value in item.attribute_values.all():
+            # Yes/No of boolean attributes is not useful search text
+            if attr_value.item_attribute.attribute_type == ItemAttribute.AttributeType.BOOLEAN:
+                continue
+            display_value = attr_value.get_display_value()
+            parts.append(display_value)
+            if attr_value.value != display_value:
+                parts.append(attr_value.value)
+
+        for link in item.links.all():
+            parts.append(link.get_display_name())
+
+        return "\n".join(part for part in parts if part)
+
+    @classmethod
+    def refresh_for_item(cls, item_id):
+        """
+        Rebuild the search document of an item, or remove it for deleted items.
+
+        The item is reloaded so the document never reflects stale prefetched
+        relations of the caller's instance.
+        """
+        item = CollectionItem.objects.all_with_deleted().prefetch_related(*cls.PREFETCH).filter(pk=item_id).first()
+        if item is None or item.is_deleted:
+            cls.objects.filter(item_id=item_id).delete()
+            return None
+
+        search_document, _created = cls.objects.update_or_create(
+            item_id=item.pk,
+            defaults={'document': cls.build_document(item)}
+        )
+        return search_document
+
+
+class CollectionFacetCount(models.Model):
+    """
+    Precomputed facet count of a collection: number of live items per status,
+    per item type and per attribute value, plus a TOTAL row.
+
+    Maintained incrementally by signals on item and attribute value writes
+    and read with one query per collection page (see web/facets.py). The
+    TOTAL row marks the summary as built; collections without it are
+    rebuilt on first read.
+    """
+
+    class Facet(models.TextChoices):
+        TOTAL = "TOTAL", _("Total")
+        STATUS = "STATUS", _("Status")
+        ITEM_TYPE = "ITEM_TYPE", _("Item Type")
+        ATTRIBUTE = "ATTRIBUTE", _("Attribute Value")
+
+    collection = models.ForeignKey(
+        Collection,
+        on_delete=models.CASCADE,
+        related_name="facet_counts",
+        verbose_name=_("Collection")
+    )
+    facet = models.CharField(max_length=20, choices=Facet.choices, verbose_name=_("Facet"))
+    item_type = models.ForeignKey(
+        ItemType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Item Type")
+    )
+    item_attribute = models.ForeignKey(
+        ItemAttribute,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Attribute Definition")
+    )
+    value = models.TextField(
+        blank=True,
+        default="",
+        verbose_name=_("Value"),
+        help_text=_("Status value or attribute value of the facet (empty for TOTAL and ITEM_TYPE)")
+    )
+    count = models.IntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        verbose_name = _("Collection Facet Count")
+        verbose_name_plural = _("Collection Facet Counts")
+        indexes = [
+            models.Index(fields=["collection", "facet"], name="web_facet_collection_idx"),
+            # Attribute value autocomplete (web/autocomplete.py)
+            models.Index(fields=["item_attribute", "collection"], name="web_facet_attribute_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.collection_id} {self.facet} {self.item_type_id or self.item_attribute_id or ''} {self.value}: {self.count}"
+
+
+class CacheGeneration(models.Model):
+    """
+    Invalidation counter of a cache scope, e.g. the item cards of a collection.
+
+    Cached entries embed the generation of their scope in their key, so
+    bumping it makes them unreachable. The counters live in the database
+    (see web/cache_generations.py) because the Django cache is per process:
+    a write in a worker or another instance must invalidate every process.
+    """
+
+    scope = models.CharField(max_length=100, unique=True, verbose_name=_("Scope"))
+    generation = models.BigIntegerField(default=0, verbose_name=_("Generation"))
+    updated = models.DateTimeField(auto_now=True, verbose_name=_("Updated"))
+
+    class Meta:
+        verbose_name = _("Cache Generation")
+        verbose_name_plural = _("Cache Generations")
+
+    def __str__(self):
+        return f"{self.scope}: {self.generation}"
+
+
+class ModerationJob(models.Model):
+    """
+    Queued content moderation of a MediaFile.
+
+    Uploads only insert a job; `manage.py run_moderation_worker` claims jobs,
+    runs the detector and retries failures with exponential backoff (see
+    web/moderation_queue.py).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        RUNNING = "RUNNING", _("Running")
+        DONE = "DONE", _("Done")
+        FAILED = "FAILED", _("Failed")
+
+    media_file = models.ForeignKey(
+        MediaFile,
+        on_delete=models.CASCADE,
+        related_name="moderation_jobs",
+        verbose_name=_("Media File")
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name=_("Status")
+    )
+    force = models.BooleanField(
+        default=False,
+        verbose_name=_("Force"),
+        help_text=_("Re-analyze even if the file has already been checked")
+    )
+    attempts = models.IntegerField(default=0, verbose_name=_("Attempts"))
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("Run After"),
+        help_text=_("The job is not claimed before this time (retry backoff)")
+    )
+    locked_by = models.CharField(max_length=100, blank=True, default="", verbose_name=_("Locked By"))
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Locked At"))
+    last_error = models.TextField(blank=True, default="", verbose_name=_("Last Error"))
+    created = models.DateTimeField(auto_now_add=True, verbose_name=_("Date created"))
+    updated = models.DateTimeField(auto_now=True, verbose_name=_("Date updated"))
+
+    class Meta:
+        verbose_name = _("Moderation Job")
+        verbose_name_plural = _("Moderation Jobs")
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="web_modjob_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.media_file_id} {self.status} (attempt {self.attempts})"
+
+
+class ModerationVerdict(models.Model):
+    """
+    Cached content moderation verdict for a file content (SHA-256).
+
+    The same bytes get the same verdict from the same detector and
+    threshold, so re-imports, copies and duplicate uploads reuse it instead
+    of running inference again. `version` identifies the detector model,
+    threshold and class list (see web/moderation_verdicts.py); a settings
+    change starts a new version.
+    """
+
+    content_hash = models.CharField(max_length=64, verbose_name=_("Content Hash"))
+    version = models.CharField(max_length=100, verbose_name=_("Detector Version"))
+    is_inappropriate = models.BooleanField(verbose_name=_("Inappropriate"))
+    confidence_score = models.FloatField(verbose_name=_("Confidence Score"))
+    details = models.JSONField(default=dict, blank=True, verbose_name=_("Details"))
+    created = models.DateTimeField(auto_now_add=True, verbose_name=_("Date created"))
+
+    class Meta:
+        verbose_name = _("Moderation Verdict")
+        verbose_name_plural = _("Moderation Verdicts")
+        constraints = [
+            models.UniqueConstraint(fields=["content_hash", "version"], name="web_verdict_hash_version_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} {self.version}: {'inappropriate' if self.is_inappropriate else 'ok'} ({self.confidence_score:.2f})"
+
+
+class StorageInventorySnapshot(models.Model):
+    """
+    Listing of every file in media storage at one point in time.
+
+    Built page by page by `manage.py storage_inventory` (see
+    web/storage_inventory.py); orphaned files (in storage without a
+    MediaFile) are found with an anti-join against StorageInventoryEntry,
+    and the sys media page reads the counts of the latest snapshot instead
+    of listing the bucket.
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = "RUNNING", _("Running")
+        COMPLETE = "COMPLETE", _("Complete")
+        FAILED = "FAILED", _("Failed")
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING, verbose_name=_("Status"))
+    backend = models.CharField(max_length=100, blank=True, default="", verbose_name=_("Storage Backend"))
+    started = models.DateTimeField(auto_now_add=True, verbose_name=_("Started"))
+    completed = models.DateTimeField(null=True, blank=True, verbose_name=_("Completed"))
+    file_count = models.IntegerField(default=0, verbose_name=_("Files"))
+    total_size = models.BigIntegerField(default=0, verbose_name=_("Total Size (bytes)"))
+    orphan_count = models.IntegerField(default=0, verbose_name=_("Orphaned Files"))
+    orphan_size = models.BigIntegerField(default=0, verbose_name=_("Orphaned Size (bytes)"))
+    error = models.TextField(blank=True, default="", verbose_name=_("Error"))
+
+    class Meta:
+        verbose_name = _("Storage Inventory Snapshot")
+        verbose_name_plural = _("Storage Inventory Snapshots")
+        ordering = ["-started"]
+
+    def __str__(self):
+        return f"{self.started:%Y-%m-%d %H:%M} {self.status}: {self.file_count} files, {self.orphan_count} orphaned"
+
+
+class StorageInventoryEntry(models.Model):
+    """One file of a StorageInventorySnapshot"""
+
+    snapshot = models.ForeignKey(
+        StorageInventorySnapshot,
+        on_delete=models.CASCADE,
+        related_name="entries",
+        verbose_name=_("Snapshot")
+    )
+    path = models.CharField(max_length=500, verbose_name=_("Path"))
+    size = models.BigIntegerField(null=True, blank=True, verbose_name=_("Size (bytes)"))
+    generation = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        verbose_name=_("Generation"),
+        help_text=_("GCS object generation, or modification time (ns) on the local filesystem")
+    )
+    modified = models.DateTimeField(null=True, blank=True, verbose_name=_("Modified"))
+
+    class Meta:
+        verbose_name = _("Storage Inventory Entry")
+        verbose_name_plural = _("Storage Inventory Entries")
+        constraints = [
+            models.UniqueConstraint(fields=["snapshot", "path"], name="web_inventory_snapshot_path_uniq"),
+        ]
+
+    def __str__(self):
+        return self.path
+
+
+class ImportJob(models.Model):
+    """
+    Persisted data import run by `manage.py run_import_worker`.
+
+    The uploaded file is staged in storage and the worker streams it through
+    ImportProcessor (see web/import_jobs.py), updating the counters after
+    every chunk. `checkpoint` is the number of records committed at the last
+    collection boundary: a job interrupted by a worker restart is resumed
+    from there after deleting the partially imported collection.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        RUNNING = "RUNNING", _("Running")
+        DONE = "DONE", _("Done")
+        FAILED = "FAILED", _("Failed")
+
+    class Format(models.TextChoices):
+        JSON = "json", _("JSON")
+        YAML = "yaml", _("YAML")
+        JSONL = "jsonl", _("JSON Lines")
+
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name=_("Status")
+    )
+    target_user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="import_jobs",
+        verbose_name=_("Target User")
+    )
+    admin_user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Started By")
+    )
+    file_name = models.CharField(max_length=255, verbose_name=_("File Name"))
+    file_path = models.CharField(
+        max_length=500,
+        verbose_name=_("Staged File"),
+        help_text=_("Path of the uploaded file in storage, deleted when the job finishes")
+    )
+    file_format = models.CharField(max_length=10, choices=Format.choices, verbose_name=_("Format"))
+    download_images = models.BooleanField(default=False, verbose_name=_("Download Images"))
+    mode = models.CharField(
+        max_length=10,
+        blank=True,
+        default="",
+        verbose_name=_("Mode"),
+        help_text=_("create or upsert; empty uses the mode option of the file")
+    )
+    delete_missing = models.BooleanField(
+        default=False,
+        verbose_name=_("Delete Missing Items"),
+        help_text=_("Upsert: delete items of matched collections that are not in the file")
+    )
+
+    records_total = models.IntegerField(default=0, verbose_name=_("Records"))
+    records_processed = models.IntegerField(default=0, verbose_name=_("Records Processed"))
+    collections_created = models.IntegerField(default=0, verbose_name=_("Collections Created"))
+    items_created = models.IntegerField(default=0, verbose_name=_("Items Created"))
+    images_downloaded = models.IntegerField(default=0, verbose_name=_("Images Downloaded"))
+    links_created = models.IntegerField(default=0, verbose_name=_("Links Created"))
+    item_types_created = models.IntegerField(default=0, verbose_name=_("Item Types Created"))
+    collections_updated = models.IntegerField(default=0, verbose_name=_("Collections Updated"))
+    items_updated = models.IntegerField(default=0, verbose_name=_("Items Updated"))
+    items_unchanged = models.IntegerField(default=0, verbose_name=_("Items Unchanged"))
+    items_deleted = models.IntegerField(default=0, verbose_name=_("Items Deleted"))
+    warnings = models.JSONField(default=list, blank=True, verbose_name=_("Warnings"))
+    errors = models.JSONField(default=list, blank=True, verbose_name=_("Errors"))
+    warning_count = models.IntegerField(default=0, verbose_name=_("Warnings"))
+    error_count = models.IntegerField(default=0, verbose_name=_("Errors"))
+
+    checkpoint = models.IntegerField(
+        default=0,
+        verbose_name=_("Checkpoint"),
+        help_text=_("Records committed at the last collection boundary; a resumed job skips them")
+    )
+    checkpoint_state = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_("Checkpoint State"),
+        help_text=_("Counters, warnings and errors at the checkpoint")
+    )
+    partial_collection_id = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Partial Collection"),
+        help_text=_("Collection being imported after the checkpoint, deleted when the job is resumed")
+    )
+
+    attempts = models.IntegerField(default=0, verbose_name=_("Attempts"))
+    locked_by = models.CharField(max_length=100, blank=True, default="", verbose_name=_("Locked By"))
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Locked At"))
+    last_error = models.TextField(blank=True, default="", verbose_name=_("Last Error"))
+    created = models.DateTimeField(auto_now_add=True, verbose_name=_("Date created"))
+    started = models.DateTimeField(null=True, blank=True, verbose_name=_("Started"))
+    finished = models.DateTimeField(null=True, blank=True, verbose_name=_("Finished"))
+    updated = models.DateTimeField(auto_now=True, verbose_name=_("Date updated"))
+
+    class Meta:
+        verbose_name = _("Import Job")
+        verbose_name_plural = _("Import Jobs")
+        ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["status", "created"], name="web_importjob_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} {self.status} ({self.items_created} items)"
+
+    @property
+    def is_active(self):
+        return self.status in (self.Status.PENDING, self.Status.RUNNING)
+
+    @property
+    def progress_percent(self):
+        if self.status == self.Status.DONE:
+            return 100
+        if not self.records_total:
+            return 0
+        return min(99, int(self.records_processed * 100 / self.records_total))
+
+    @property
+    def duration(self):
+        """Seconds from start to finish (or until now while running)"""
+        if not self.started:
+            return None
+        return ((self.finished or timezone.now()) - self.started).total_seconds()
+
 # Import user profile models
 from .models_user_profile import UserProfile
 
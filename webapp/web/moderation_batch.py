@@ -0,0 +1,301 @@
+"""
+Batch Content Moderation
+========================
+
+Runs NudeNet over many images at once, for backlogs and for re-moderating
+the media library after a threshold change.
+
+- Images are read from storage and decoded in memory (no temporary files);
+  JPEGs are decoded at reduced scale, since the detector works on a 320px
+  input anyway.
+- Images are handed to the detector in batches (NudeDetector.detect_batch).
+- With workers > 1 the batches are spread over a process pool. Each worker
+  loads the model once, in its initializer, and only runs inference; the
+  main process reads the files and records the verdicts, so workers never
+  touch the database. At most two batches per worker are in flight, which
+  bounds memory.
+
+Verdicts are cached by content hash (web/moderation_verdicts.py), so
+content that was already judged is not analyzed again. The engine reports
+throughput (images/s) in its result.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+
+from PIL import Image
+
+from web.moderation_verdicts import get_cached_verdict, get_cached_verdicts, store_verdict
+
+logger = logging.getLogger("webapp")
+
+# Longest side JPEGs are decoded at (the detector resizes to 320px)
+DECODE_MAX_SIDE = 640
+
+# Batches in flight per worker process
+BATCHES_IN_FLIGHT = 2
+
+
+def decode_image(content: bytes):
+    """
+    Decode image bytes into the BGR array NudeNet expects.
+
+    Returns:
+        numpy.ndarray: height x width x 3, uint8, BGR
+    """
+    import numpy as np
+
+    with Image.open(BytesIO(content)) as image:
+        # JPEG only: decode at a reduced scale via DCT scaling (no-op for other formats)
+        image.draft('RGB', (DECODE_MAX_SIDE, DECODE_MAX_SIDE))
+        rgb = image.convert('RGB')
+    return np.asarray(rgb)[:, :, ::-1].copy()
+
+
+def detect_images(detector, contents):
+    """
+    Run the detector over several images.
+
+    Args:
+        detector: NudeDetector
+        contents: list of image bytes
+
+    Returns:
+        list: detections (list of dicts) or an Exception, per image
+    """
+    results = [None] * len(contents)
+    arrays = []
+    positions = []
+    for position, content in enumerate(contents):
+        try:
+            arrays.append(decode_image(content))
+            positions.append(position)
+        except Exception as e:  # pylint: disable=broad-except
+            results[position] = e
+
+    if arrays:
+        try:
+            if hasattr(detector, 'detect_batch'):
+                detections = detector.detect_batch(arrays, batch_size=len(arrays))
+            else:
+                detections = [detector.detect(array) for array in arrays]
+            for position, detection in zip(positions, detections):
+                results[position] = detection
+        except Exception:  # pylint: disable=broad-except
+            # One bad image fails the whole batch call: retry one by one
+            for position, array in zip(positions, arrays):
+                try:
+                    results[position] = detector.detect(array)
+                except Exception as e:  # pylint: disable=broad-except
+                    results[position] = e
+    return results
+
+
+# Detector of a pool worker process, loaded once by _init_worker()
+_worker_detector = None
+
+
+def _init_worker():
+    global _worker_detector  # pylint: disable=global-statement
+    from nudenet import NudeDetector
+    started = time.monotonic()
+    _worker_detector = NudeDetector()
+    logger.info(f"Moderation worker process loaded NudeNet in {time.monotonic() - started:.2f}s")
+
+
+def _detect_in_worker(batch):
+    """Pool task: [(media_file_id, bytes)] -> [(media_file_id, detections or Exception)]"""
+    ids = [media_file_id for media_file_id, _content in batch]
+    return list(zip(ids, detect_images(_worker_detector, [content for _media_file_id, content in batch])))
+
+
+class BatchModerationEngine:
+    """
+    Moderates many MediaFiles with batched (and optionally multi-process) inference.
+
+    Files whose content already has a cached verdict (web/moderation_verdicts.py)
+    are not read at all, and files sharing content within a run are analyzed
+    once.
+
+    Args:
+        service: ContentModerationService that records the verdicts (and
+            provides the detector when workers == 1)
+        workers: Inference processes; 1 runs in the current process
+        batch_size: Images per detector call
+    """
+
+    def __init__(self, service, workers=1, batch_size=16):
+        self.service = service
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+
+    def _read_batches(self, targets, content_hashes, followers, results, on_result):
+        """Yield [(media_file_id, bytes)] batches read from storage"""
+        from django.core.files.storage import default_storage
+
+        batch = []
+        for media_file_id, file_path, content_hash in targets:
+            try:
+                with default_storage.open(file_path, 'rb') as stored:
+                    content = stored.read()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Failed to read {file_path} for moderation: {e}")
+                content_hashes[media_file_id] = content_hash
+                self._record_detection(media_file_id, e, content_hashes, followers, results, on_result)
+                continue
+
+            if not content_hash:
+                content_hash = hashlib.sha256(content).hexdigest()
+                cached = get_cached_verdict(content_hash, self._version)
+                if cached:
+                    self._record(media_file_id, cached, results, on_result)
+                    continue
+            content_hashes[media_file_id] = content_hash
+
+            batch.append((media_file_id, content))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _record(self, media_file_id, verdict, results, on_result):
+        """Record a verdict tuple (or an Exception) on a MediaFile"""
+        from web.models import MediaFile
+
+        media_file = MediaFile.objects.filter(pk=media_file_id).first()
+        if media_file is None:
+            return
+        if isinstance(verdict, Exception):
+            logger.error(f"Failed to analyze image {media_file.original_filename}: {verdict}")
+            results["errors"] += 1
+            result = {"status": "error", "error": str(verdict), "action": "none"}
+        else:
+            is_inappropriate, confidence_score, detailed_results = verdict
+            result = self.service.record_verdict(media_file, is_inappropriate, confidence_score, detailed_results)
+            results["processed"] += 1
+            if detailed_results.get("cached_verdict"):
+                results["cached"] += 1
+            if is_inappropriate:
+                results["flagged"] += 1
+            else:
+                results["approved"] += 1
+            if result.get("action") != "none":
+                action = result["action"]
+                results["actions_taken"][action] = results["actions_taken"].get(action, 0) + 1
+        if on_result:
+            on_result(media_file, result)
+
+    def _record_detection(self, media_file_id, detection, content_hashes, followers, results, on_result):
+        """Turn detections into a verdict, cache it and record it on the file and its duplicates"""
+        content_hash = content_hashes.get(media_file_id)
+        if isinstance(detection, Exception):
+            verdict = detection
+            follower_verdict = detection
+        else:
+            verdict = self.service.build_verdict(detection)
+            store_verdict(content_hash, self._version, *verdict)
+            follower_verdict = (verdict[0], verdict[1], {**verdict[2], "cached_verdict": True})
+
+        self._record(media_file_id, verdict, results, on_result)
+        for follower_id in followers.pop(content_hash, []):
+            self._record(follower_id, follower_verdict, results, on_result)
+
+    def run(self, media_files, on_result=None):
+        """
+        Moderate MediaFiles.
+
+        Args:
+            media_files: MediaFile queryset (or iterable of MediaFiles)
+            on_result: Optional callback(media_file, result) per file
+
+        Returns:
+            Dict with counts, duration and images_per_second
+        """
+        results = {
+            "status": "completed",
+            "processed": 0,
+            "flagged": 0,
+            "approved": 0,
+            "cached": 0,
+            "errors": 0,
+            "actions_taken": {},
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+        }
+
+        if hasattr(media_files, 'values_list'):
+            targets = list(media_files.values_list('pk', 'file_path', 'content_hash'))
+        else:
+            targets = [(media_file.pk, media_file.file_path, media_file.content_hash) for media_file in media_files]
+
+        started = time.monotonic()
+        self._version = self.service.verdict_version()
+
+        # Known content: reuse cached verdicts, analyze each content hash once
+        cached = get_cached_verdicts((content_hash for _pk, _path, content_hash in targets), self._version)
+        followers = {}
+        to_analyze = []
+        for media_file_id, file_path, content_hash in targets:
+            if content_hash in cached:
+                self._record(media_file_id, cached[content_hash], results, on_result)
+            elif content_hash in followers:
+                followers[content_hash].append(media_file_id)
+            else:
+                if content_hash:
+                    followers[content_hash] = []
+                to_analyze.append((media_file_id, file_path, content_hash))
+
+        content_hashes = {}
+        batches = self._read_batches(to_analyze, content_hashes, followers, results, on_result)
+
+        if self.workers == 1:
+            detector = self.service.detector if to_analyze else None
+            for batch in batches:
+                ids = [media_file_id for media_file_id, _content in batch]
+                for media_file_id, detection in zip(ids, detect_images(detector, [content for _media_file_id, content in batch])):
+                    self._record_detection(media_file_id, detection, content_hashes, followers, results, on_result)
+        else:
+            from django.db import connections
+
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     mp_context=multiprocessing.get_context(start_method),
+                                     initializer=_init_worker) as pool:
+                in_flight = {}
+                for batch in batches:
+                    in_flight[pool.submit(_detect_in_worker, batch)] = batch
+                    if len(in_flight) >= self.workers * BATCHES_IN_FLIGHT:
+                        done, _pending = wait(in_flight, return_when=FIRST_COMPLETED)
+                        self._record_futures(done, in_flight, content_hashes, followers, results, on_result)
+                done, _pending = wait(in_flight)
+                self._record_futures(done, in_flight, content_hashes, followers, results, on_result)
+
+        duration = time.monotonic() - started
+        handled = results["processed"] + results["errors"]
+        results["duration"] = duration
+        results["images_per_second"] = handled / duration if duration > 0 else 0.0
+
+        logger.info(
+            f"Batch moderation complete: {results['processed']} images ({results['cached']} cached verdicts) "
+            f"in {duration:.1f}s ({results['images_per_second']:.1f} images/s, {self.workers} workers)"
+        )
+        return results
+
+    def _record_futures(self, futures, in_flight, content_hashes, followers, results, on_result):
+        for future in futures:
+            batch = in_flight.pop(future)
+            try:
+                batch_results = future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                # A crashed worker loses its batch; the files stay pending
+                logger.error(f"Moderation worker failed: {e}")
+                batch_results = [(media_file_id, e) for media_file_id, _content in batch]
+            for media_file_id, detection in batch_results:
+                self._record_detection(media_file_id, detection, content_hashes, followers, results, on_result)
@@ -0,0 +1,208 @@
+"""
+Content Moderation Queue
+========================
+
+Durable, database-backed queue of content moderation jobs.
+
+MediaFile.save() only inserts a ModerationJob, so an upload never waits for
+a detector pass. `manage.py run_moderation_worker` claims jobs in batches:
+
+- on PostgreSQL with `SELECT ... FOR UPDATE SKIP LOCKED`, so several
+  workers never claim the same job and never wait on each other,
+- elsewhere (SQLite) with a conditional UPDATE per job: a job is claimed by
+  the worker whose `UPDATE ... WHERE status = 'PENDING'` changed the row.
+
+Failed jobs are retried with exponential backoff (`run_after`) until
+CONTENT_MODERATION_MAX_ATTEMPTS is reached. Jobs left RUNNING by a worker
+that died are released after LOCK_TIMEOUT, or marked FAILED once they used
+all their attempts (a file that kills the worker is not retried forever).
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+logger = logging.getLogger("webapp")
+
+# Retry delays: BACKOFF_BASE * 2 ** (attempt - 1), capped at BACKOFF_MAX
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+
+# RUNNING jobs not finished after this long are handed to another worker
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def max_attempts() -> int:
+    return getattr(settings, 'CONTENT_MODERATION_MAX_ATTEMPTS', 5)
+
+
+def enqueue_moderation(media_file, force=False):
+    """
+    Queue a MediaFile for moderation (no-op if it is already queued).
+
+    Returns:
+        ModerationJob
+    """
+    from web.models import ModerationJob
+
+    job = ModerationJob.objects.filter(
+        media_file=media_file,
+        status__in=[ModerationJob.Status.PENDING, ModerationJob.Status.RUNNING]
+    ).first()
+    if job:
+        if force and not job.force:
+            ModerationJob.objects.filter(pk=job.pk).update(force=True)
+        return job
+
+    job = ModerationJob.objects.create(media_file=media_file, force=force)
+    logger.debug("moderation_queue: queued %s (job %s)", media_file.original_filename, job.pk)
+    return job
+
+
+def release_stale_jobs() -> int:
+    """
+    Put RUNNING jobs of dead workers back into the queue; jobs that used all
+    their attempts are marked FAILED instead.
+
+    Returns:
+        int: Number of jobs put back into the queue
+    """
+    from web.models import ModerationJob
+
+    stale = ModerationJob.objects.filter(
+        status=ModerationJob.Status.RUNNING,
+        locked_at__lt=timezone.now() - LOCK_TIMEOUT
+    )
+    failed = stale.filter(attempts__gte=max_attempts()).update(
+        status=ModerationJob.Status.FAILED, locked_by="", locked_at=None, last_error="worker died"
+    )
+    if failed:
+        logger.error("moderation_queue: %d jobs failed, their worker died on the last attempt", failed)
+
+    released = stale.update(status=ModerationJob.Status.PENDING, locked_by="", locked_at=None)
+    if released:
+        logger.warning("moderation_queue: released %d stale jobs", released)
+    return released
+
+
+def claim_jobs(worker_id: str, limit: int = 10):
+    """
+    Claim up to `limit` due jobs for a worker.
+
+    Returns:
+        list: Claimed ModerationJob objects (status RUNNING, attempts incremented)
+    """
+    from web.models import ModerationJob
+
+    now = timezone.now()
+    due = ModerationJob.objects.filter(
+        status=ModerationJob.Status.PENDING,
+        run_after__lte=now
+    ).order_by('run_after', 'pk')
+    claim = {
+        'status': ModerationJob.Status.RUNNING,
+        'locked_by': worker_id,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            ModerationJob.objects.filter(pk__in=job_ids).update(**claim)
+    else:
+        # No row locks (SQLite): the conditional update decides which worker gets a job
+        job_ids = []
+        for job_id in due.values_list('pk', flat=True)[:limit]:
+            if ModerationJob.objects.filter(pk=job_id, status=ModerationJob.Status.PENDING).update(**claim):
+                job_ids.append(job_id)
+
+    if not job_ids:
+        return []
+    return list(ModerationJob.objects.filter(pk__in=job_ids).select_related('media_file').order_by('run_after', 'pk'))
+
+
+def complete_job(job) -> None:
+    from web.models import ModerationJob
+
+    ModerationJob.objects.filter(pk=job.pk).update(
+        status=ModerationJob.Status.DONE, locked_by="", locked_at=None, last_error=""
+    )
+
+
+def fail_job(job, error) -> bool:
+    """
+    Record a failed attempt and schedule a retry.
+
+    Returns:
+        bool: True if the job will be retried, False if it gave up
+    """
+    from web.models import ModerationJob
+
+    attempts = job.attempts
+    if attempts >= max_attempts():
+        ModerationJob.objects.filter(pk=job.pk).update(
+            status=ModerationJob.Status.FAILED, locked_by="", locked_at=None, last_error=str(error)
+        )
+        logger.error("moderation_queue: job %s failed after %d attempts: %s", job.pk, attempts, error)
+        return False
+
+    delay = min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+    ModerationJob.objects.filter(pk=job.pk).update(
+        status=ModerationJob.Status.PENDING,
+        locked_by="",
+        locked_at=None,
+        run_after=timezone.now() + delay,
+        last_error=str(error)
+    )
+    logger.warning("moderation_queue: job %s attempt %d failed, retrying in %ds: %s", job.pk, attempts, delay.total_seconds(), error)
+    return True
+
+
+def process_job(job, service) -> dict:
+    """
+    Moderate the MediaFile of a claimed job.
+
+    Returns:
+        dict: Result of ContentModerationService.process_media_file(), or a
+        skip reason
+
+    Raises:
+        Exception: Analysis failed (the caller retries the job)
+    """
+    from web.models import MediaFile
+
+    media_file = MediaFile.objects.filter(pk=job.media_file_id, file_exists=True).first()
+    if media_file is None:
+        return {"status": "skipped", "reason": "file_missing", "action": "none"}
+    if media_file.content_moderation_checked_at and not job.force:
+        return {"status": "skipped", "reason": "already_checked", "action": "none"}
+
+    result = service.process_media_file(media_file)
+    if result.get("status") == "error":
+        raise RuntimeError(result.get("error", "analysis failed"))
+    return result
+
+
+def queue_depth() -> dict:
+    """Job counts per status and the creation time of the oldest due job, for the moderation dashboard"""
+    from web.models import ModerationJob
+
+    counts = dict(ModerationJob.objects.exclude(
+        status=ModerationJob.Status.DONE
+    ).values_list('status').annotate(count=Count('id')).order_by())
+
+    due = ModerationJob.objects.filter(status=ModerationJob.Status.PENDING, run_after__lte=timezone.now())
+    oldest = due.aggregate(oldest=Min('created'))['oldest']
+
+    return {
+        'pending': counts.get(ModerationJob.Status.PENDING, 0),
+        'running': counts.get(ModerationJob.Status.RUNNING, 0),
+        'failed': counts.get(ModerationJob.Status.FAILED, 0),
+        'retrying': ModerationJob.objects.filter(status=ModerationJob.Status.PENDING, attempts__gt=0).count(),
+        'oldest_created': oldest,
+    }
@@ -0,0 +1,91 @@
+"""
+Moderation Verdict Cache
+========================
+
+Persistent cache of moderation verdicts keyed by file content (SHA-256)
+and detector version.
+
+Inference only depends on the image bytes, the detector model, the
+threshold and the list of inappropriate classes. Verdicts are stored per
+(content hash, version) in ModerationVerdict and reused for every other
+MediaFile with the same bytes: re-imports, copied items and duplicate
+uploads are moderated without running the detector. Changing the threshold
+or upgrading the model changes the version, so old verdicts are simply not
+found anymore.
+
+Only the verdict is cached; the moderation action (flag, delete, ban) is
+applied per MediaFile with the current settings.
+"""
+
+import logging
+
+from django.db import IntegrityError
+from django.utils import timezone
+
+logger = logging.getLogger("webapp")
+
+
+def _as_verdict(verdict):
+    """(is_inappropriate, confidence_score, detailed_results) of a stored verdict"""
+    details = dict(verdict.details or {})
+    details.update({
+        "timestamp": timezone.now().isoformat(),
+        "cached_verdict": True,
+        "verdict_created": verdict.created.isoformat() if verdict.created else None,
+    })
+    return verdict.is_inappropriate, verdict.confidence_score, details
+
+
+def get_cached_verdict(content_hash, version):
+    """
+    Stored verdict for a content hash, or None.
+
+    Returns:
+        Tuple of (is_inappropriate, confidence_score, detailed_results) or None
+    """
+    from web.models import ModerationVerdict
+
+    if not content_hash:
+        return None
+    verdict = ModerationVerdict.objects.filter(content_hash=content_hash, version=version).first()
+    if verdict is None:
+        return None
+    logger.debug("moderation_verdicts: cache hit for %s", content_hash)
+    return _as_verdict(verdict)
+
+
+def get_cached_verdicts(content_hashes, version):
+    """
+    Stored verdicts for many content hashes with one query.
+
+    Returns:
+        dict: content hash -> (is_inappropriate, confidence_score, detailed_results)
+    """
+    from web.models import ModerationVerdict
+
+    content_hashes = {content_hash for content_hash in content_hashes if content_hash}
+    if not content_hashes:
+        return {}
+    verdicts = ModerationVerdict.objects.filter(content_hash__in=content_hashes, version=version)
+    return {verdict.content_hash: _as_verdict(verdict) for verdict in verdicts}
+
+
+def store_verdict(content_hash, version, is_inappropriate, confidence_score, detailed_results):
+    """Remember the verdict on some content (first verdict wins for concurrent writers)"""
+    from web.models import ModerationVerdict
+
+    if not content_hash:
+        return
+    try:
+        ModerationVerdict.objects.get_or_create(
+            content_hash=content_hash,
+            version=version,
+            defaults={
+                "is_inappropriate": is_inappropriate,
+                "confidence_score": confidence_score,
+                "details": detailed_results,
+            }
+        )
+    except IntegrityError:
+        # Stored concurrently by another worker
+        pass
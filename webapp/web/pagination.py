@@ -0,0 +1,286 @@
+"""
+Cursor (Keyset) Pagination
+==========================
+
+Django's Paginator runs `OFFSET n` plus a full `COUNT(*)` for every page, so
+deep pages get slower with the page number. CursorPaginator instead filters
+on the sort key of the last (or first) row shown, e.g.
+
+    WHERE (name > 'Foo') OR (name = 'Foo' AND id > 42) ORDER BY name, id
+
+which uses the index and costs the same on every page.
+
+The ordering must end with a unique field (normally `id`) and contain only
+non-nullable model fields. For orderings that cannot be keyed (e.g. nullable
+annotations) pass ordering=None: the paginator then uses the queryset's own
+ordering with offset cursors, behind the same interface.
+
+Templates use the page like this:
+
+    {% for obj in page_obj %}...{% endfor %}
+    {% if page_obj.has_previous %}<a href="?{{ page_obj.first_query }}">«</a>
+        <a href="?{{ page_obj.previous_query }}">‹</a>{% endif %}
+    {% if page_obj.has_next %}<a href="?{{ page_obj.next_query }}">›</a>
+        <a href="?{{ page_obj.last_query }}">»</a>{% endif %}
+"""
+
+import base64
+import binascii
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.db import connection
+from django.db.models import Q
+from django.http import QueryDict
+
+logger = logging.getLogger("webapp")
+
+CURSOR_PARAM = "cursor"
+DIRECTION_PARAM = "dir"
+DIRECTION_NEXT = "next"
+DIRECTION_PREVIOUS = "prev"
+
+# Query parameters dropped from the base query string of pagination links
+PAGINATION_PARAMS = (CURSOR_PARAM, DIRECTION_PARAM, "page")
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise InvalidCursor("Unknown cursor value type")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort key values as an opaque URL-safe cursor"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor created by encode_cursor()"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(str(e)) from e
+    if not isinstance(values, list):
+        raise InvalidCursor("Cursor must encode a list")
+    try:
+        return [_decode_value(value) for value in values]
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+def estimate_count(queryset) -> int:
+    """
+    Row count of a queryset, estimated from the query planner on PostgreSQL
+    (no table scan) and counted exactly elsewhere.
+    """
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("estimate_count: planner estimate failed, counting instead: %s", str(e))
+        return queryset.count()
+
+
+class CursorPage:
+    """One page of results with cursor links to its neighbours"""
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, base_query, count=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self._base_query = base_query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _query(self, **params) -> str:
+        query = self._base_query.copy()
+        for key, value in params.items():
+            query[key] = value
+        return query.urlencode()
+
+    @property
+    def first_query(self) -> str:
+        return self._query()
+
+    @property
+    def last_query(self) -> str:
+        return self._query(**{DIRECTION_PARAM: DIRECTION_PREVIOUS})
+
+    @property
+    def next_query(self) -> str:
+        return self._query(**{CURSOR_PARAM: self.next_cursor}) if self.next_cursor else ""
+
+    @property
+    def previous_query(self) -> str:
+        return self._query(**{CURSOR_PARAM: self.previous_cursor, DIRECTION_PARAM: DIRECTION_PREVIOUS}) if self.previous_cursor else ""
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by (sort key, id) instead of OFFSET.
+
+    Args:
+        queryset: QuerySet to paginate
+        per_page: Rows per page
+        ordering: Field names, '-' prefix for descending, ending with a unique
+            field, e.g. ('-created', 'id'). None uses the queryset's ordering
+            with offset cursors.
+        params: Request QueryDict; its other parameters are kept in page links
+        count: Optional total (exact or estimated) exposed as page.count
+    """
+
+    def __init__(self, queryset, per_page: int, ordering: Optional[Sequence[str]] = None, params: Optional[QueryDict] = None, count: Optional[int] = None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering) if ordering else None
+        self.count = count
+
+        self.base_query = QueryDict(mutable=True)
+        if params is not None:
+            for key, values in params.lists():
+                if key not in PAGINATION_PARAMS:
+                    self.base_query.setlist(key, values)
+
+    @property
+    def _fields(self) -> List[Tuple[str, bool]]:
+        """(field name, descending) pairs of the ordering"""
+        return [(field.lstrip("-"), field.startswith("-")) for field in self.ordering]
+
+    def _keyset_filter(self, values, reverse: bool) -> Q:
+        """Rows strictly after `values` in the ordering (before it when reverse)"""
+        fields = self._fields
+        condition = Q()
+        for index, (field, descending) in enumerate(fields):
+            lookup = "lt" if descending != reverse else "gt"
+            clause = Q(**{f"{field}__{lookup}": values[index]})
+            for previous_index in range(index):
+                clause &= Q(**{fields[previous_index][0]: values[previous_index]})
+            condition |= clause
+        return condition
+
+    def _row_key(self, obj) -> List[Any]:
+        return [getattr(obj, field) for field, _descending in self._fields]
+
+    def page_from_request(self, params) -> CursorPage:
+        """Build the page requested by ?cursor=...&dir=... parameters"""
+        return self.page(params.get(CURSOR_PARAM) or None, params.get(DIRECTION_PARAM, DIRECTION_NEXT))
+
+    def page(self, cursor: Optional[str] = None, direction: str = DIRECTION_NEXT) -> CursorPage:
+        """
+        Get a page.
+
+        Args:
+            cursor: Cursor of the neighbouring page (None for the first page,
+                or the last page when direction is 'prev')
+            direction: 'next' for rows after the cursor, 'prev' for rows before it
+        """
+        backwards = direction == DIRECTION_PREVIOUS
+
+        values = None
+        if cursor:
+            try:
+                values = decode_cursor(cursor)
+            except InvalidCursor:
+                logger.warning("CursorPaginator: ignoring invalid cursor '%s'", cursor)
+                values, backwards = None, False
+
+        if self.ordering is None:
+            return self._offset_page(values, backwards)
+
+        if values is not None and len(values) != len(self.ordering):
+            values, backwards = None, False
+
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._keyset_filter(values, reverse=backwards))
+
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(
+            rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=encode_cursor(self._row_key(rows[-1])) if has_next and rows else None,
+            previous_cursor=encode_cursor(self._row_key(rows[0])) if has_previous and rows else None,
+            base_query=self.base_query,
+            count=self.count,
+        )
+
+    def _offset_page(self, values, backwards: bool) -> CursorPage:
+        """Fallback for unkeyable orderings: the cursor encodes a row offset"""
+        if values is not None and len(values) == 1 and isinstance(values[0], int) and values[0] >= 0:
+            offset = values[0]
+        elif backwards:
+            # Last page
+            total = self.count if self.count is not None else self.queryset.count()
+            offset = max(total - self.per_page, 0)
+        else:
+            offset = 0
+
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        return CursorPage(
+            rows,
+            has_next=has_next,
+            has_previous=offset > 0,
+            next_cursor=encode_cursor([offset + self.per_page]) if has_next else None,
+            previous_cursor=encode_cursor([max(offset - self.per_page, 0)]) if offset > 0 else None,
+            base_query=self.base_query,
+            count=self.count,
+        )
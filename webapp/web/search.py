@@ -0,0 +1,144 @@
+"""
+Item Full-Text Search
+=====================
+
+Searches CollectionItems through their ItemSearchDocument using the native
+full-text index of the database:
+
+- PostgreSQL: generated `search_vector` tsvector column with a GIN index,
+  matched with to_tsquery and ranked with ts_rank.
+- SQLite: FTS5 external-content table `web_itemsearch_fts`, matched with
+  MATCH and ranked with bm25.
+- Anything else (or SQLite built without FTS5): case-insensitive substring
+  match on the document, unranked.
+
+Every search term must match (prefix matching, so "terr" finds "Terry").
+"""
+
+import logging
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger("webapp")
+
+# Longer queries are truncated to keep the generated FTS query small
+MAX_SEARCH_TERMS = 10
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+_fts5_available = None
+
+
+def parse_search_terms(query: str):
+    """Split a user query into lower-case word terms (punctuation and FTS operators are dropped)"""
+    return _TERM_RE.findall((query or "").lower())[:MAX_SEARCH_TERMS]
+
+
+def _has_sqlite_fts5() -> bool:
+    """True if the FTS5 table from migration 0040 exists (cached per process)"""
+    global _fts5_available  # pylint: disable=global-statement
+    if _fts5_available is None:
+        _fts5_available = "web_itemsearch_fts" in connection.introspection.table_names()
+    return _fts5_available
+
+
+def search_backend() -> str:
+    """Name of the search implementation used for the current database"""
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    if connection.vendor == "sqlite" and _has_sqlite_fts5():
+        return "sqlite"
+    return "fallback"
+
+
+def _match_expression(terms, backend: str) -> str:
+    if backend == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    # FTS5: quoted prefix terms, implicitly AND-ed
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def filter_items(items, query: str):
+    """
+    Restrict a CollectionItem queryset to items matching the search query.
+
+    The match is a non-correlated subquery, so the result can be combined
+    with other filters and used inside other querysets.
+
+    Args:
+        items: QuerySet of CollectionItem objects
+        query: Raw user query
+
+    Returns:
+        QuerySet: Filtered items (unchanged if the query has no terms)
+    """
+    terms = parse_search_terms(query)
+    if not terms:
+        return items
+
+    backend = search_backend()
+    match = _match_expression(terms, backend)
+
+    if backend == "postgresql":
+        return items.filter(id__in=RawSQL(
+            "SELECT item_id FROM web_itemsearchdocument WHERE search_vector @@ to_tsquery('simple', %s)",
+            [match]
+        ))
+
+    if backend == "sqlite":
+        return items.filter(id__in=RawSQL(
+            "SELECT rowid FROM web_itemsearch_fts WHERE web_itemsearch_fts MATCH %s",
+            [match]
+        ))
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(search_document__document__icontains=term)
+    return items.filter(condition)
+
+
+def rank_items(items, query: str):
+    """
+    Filter items by the search query and order them by relevance.
+
+    Adds a `search_rank` annotation (higher is more relevant); ties are
+    ordered by name.
+
+    Args:
+        items: QuerySet of CollectionItem objects (top-level query, not a subquery)
+        query: Raw user query
+
+    Returns:
+        QuerySet: Matching items, best matches first
+    """
+    terms = parse_search_terms(query)
+    if not terms:
+        return items.none()
+
+    backend = search_backend()
+    match = _match_expression(terms, backend)
+    items = filter_items(items, query)
+
+    if backend == "postgresql":
+        rank = RawSQL(
+            "SELECT ts_rank(d.search_vector, to_tsquery('simple', %s)) FROM web_itemsearchdocument d "
+            "WHERE d.item_id = web_collectionitem.id",
+            [match],
+            output_field=FloatField()
+        )
+    elif backend == "sqlite":
+        # bm25() is lower for better matches; negate so higher means more relevant
+        rank = RawSQL(
+            "SELECT -bm25(web_itemsearch_fts) FROM web_itemsearch_fts "
+            "WHERE web_itemsearch_fts MATCH %s AND rowid = web_collectionitem.id",
+            [match],
+            output_field=FloatField()
+        )
+    else:
+        rank = Value(0.0, output_field=FloatField())
+
+    logger.debug("search: ranking items for %d terms using %s backend", len(terms), backend)
+    return items.annotate(search_rank=rank).order_by('-search_rank', 'name')
@@ -4,8 +4,10 @@ Content Moderation Service using NudeNet
 Provides image content analysis and moderation functionality
 """
 
+import hashlib
 import logging
-import tempfile
+import threading
+import time
 from typing import Dict, Tuple, Optional
 from datetime import datetime
 
@@ -13,8 +15,19 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from django.utils import timezone
 
+from web.moderation_batch import BatchModerationEngine, decode_image
+from web.moderation_verdicts import get_cached_verdict, store_verdict
+
 logger = logging.getLogger("webapp")
 
+# Detected classes that count as inappropriate content
+INAPPROPRIATE_CLASSES = [
+    'BUTTOCKS_EXPOSED', 'FEMALE_BREAST_EXPOSED', 'FEMALE_GENITALIA_EXPOSED',
+    'MALE_BREAST_EXPOSED', 'MALE_GENITALIA_EXPOSED', 'ANUS_EXPOSED'
+]
+
+MODEL_VERSION = "nudenet_3.4.2"
+
 
 class ContentModerationService:
     """
@@ -22,27 +35,67 @@ class ContentModerationService:
     """
     
     def __init__(self):
-        self.detector = None
-        self._initialize_models()
+        # The model is loaded on first use (or by warm_up()), not at import time,
+        # so processes that never moderate do not pay for it
+        self._detector = None
+        self._detector_lock = threading.Lock()
+        self.model_load_seconds = None
+    
+    @property
+    def detector(self):
+        """NudeNet detector, loaded on first access"""
+        if self._detector is None:
+            self._initialize_models()
+        return self._detector
+    
+    def is_model_loaded(self) -> bool:
+        return self._detector is not None
     
     def _initialize_models(self):
         """
         Initialize NudeNet models lazily
         """
-        try:
-            from nudenet import NudeDetector
+        with self._detector_lock:
+            if self._detector is not None:
+                return
             
-            if not self.detector:
+            try:
+                from nudenet import NudeDetector
+                
                 logger.info("Initializing NudeNet detector...")
-                self.detector = NudeDetector()
-                logger.info("NudeNet detector initialized successfully")
+                started = time.monotonic()
+                self._detector = NudeDetector()
+                self.model_load_seconds = time.monotonic() - started
+                logger.info(f"NudeNet detector initialized successfully in {self.model_load_seconds:.2f}s")
                 
-        except ImportError as e:
-            logger.error(f"Failed to import NudeNet: {e}")
-            raise ImportError("NudeNet is required for content moderation")
-        except Exception as e:
-            logger.error(f"Failed to initialize NudeNet models: {e}")
-            raise
+            except ImportError as e:
+                logger.error(f"Failed to import NudeNet: {e}")
+                raise ImportError("NudeNet is required for content moderation")
+            except Exception as e:
+                logger.error(f"Failed to initialize NudeNet models: {e}")
+                raise
+    
+    def warm_up(self) -> Dict:
+        """
+        Load the model and run one inference on a blank image, so the first
+        real image does not pay for model loading and session start-up.
+        Meant for designated moderation workers.
+        
+        Returns:
+            Dict with load_seconds and warm_up_seconds
+        """
+        import numpy as np
+        
+        detector = self.detector
+        started = time.monotonic()
+        detector.detect(np.zeros((320, 320, 3), dtype=np.uint8))
+        warm_up_seconds = time.monotonic() - started
+        
+        logger.info(f"NudeNet detector warmed up in {warm_up_seconds:.2f}s")
+        return {
+            "load_seconds": self.model_load_seconds,
+            "warm_up_seconds": warm_up_seconds,
+        }
     
     def is_enabled(self) -> bool:
         """
@@ -56,6 +109,21 @@ class ContentModerationService:
         """
         return getattr(settings, 'CONTENT_MODERATION_ACTION', 'flag_only')
     
+    def get_detection_threshold(self) -> float:
+        """
+        Get the score above which an inappropriate class flags an image
+        """
+        return getattr(settings, 'CONTENT_MODERATION_THRESHOLD', 0.6)
+    
+    def verdict_version(self) -> str:
+        """
+        Identifier of everything a verdict depends on besides the image bytes:
+        model version, threshold and inappropriate classes. Cached verdicts
+        (web/moderation_verdicts.py) are only reused for the same version.
+        """
+        classes = hashlib.sha1(",".join(sorted(INAPPROPRIATE_CLASSES)).encode()).hexdigest()[:8]
+        return f"{MODEL_VERSION}/t{self.get_detection_threshold()}/{classes}"
+    
     def analyze_image(self, media_file) -> Tuple[bool, float, Dict]:
         """
         Analyze an image for inappropriate content
@@ -71,75 +139,40 @@ class ContentModerationService:
             return False, 0.0, {"status": "disabled"}
         
         try:
-            # Download image to temporary file for analysis
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                # Get file content from storage
-                if hasattr(media_file.file_path, 'read'):
-                    # File-like object
-                    content = media_file.file_path.read()
-                else:
-                    # File path string
-                    with default_storage.open(media_file.file_path, 'rb') as f:
-                        content = f.read()
-                
-                temp_file.write(content)
-                temp_file.flush()
-                temp_path = temp_file.name
+            # Same bytes already judged by the same detector version: reuse the verdict
+            version = self.verdict_version()
+            cached = get_cached_verdict(media_file.content_hash, version)
+            if cached:
+                logger.info(f"Reusing cached moderation verdict for {media_file.original_filename}")
+                return cached
             
-            # Perform detection for detailed analysis
-            detection_result = self.detector.detect(temp_path)
-            
-            # Process results
-            is_inappropriate = False
-            confidence_score = 0.0
-            
-            # Analyze detection results
-            # NudeDetector returns list of detections: [{'class': 'type', 'score': 0.9, 'box': [x,y,w,h]}]
-            inappropriate_classes = [
-                'BUTTOCKS_EXPOSED', 'FEMALE_BREAST_EXPOSED', 'FEMALE_GENITALIA_EXPOSED',
-                'MALE_BREAST_EXPOSED', 'MALE_GENITALIA_EXPOSED', 'ANUS_EXPOSED'
-            ]
+            # Read and decode the image in memory
+            if hasattr(media_file.file_path, 'read'):
+                # File-like object
+                content = media_file.file_path.read()
+            else:
+                # File path string
+                with default_storage.open(media_file.file_path, 'rb') as f:
+                    content = f.read()
             
-            max_score = 0.0
-            detected_classes = []
+            content_hash = media_file.content_hash or hashlib.sha256(content).hexdigest()
+            if not media_file.content_hash:
+                cached = get_cached_verdict(content_hash, version)
+                if cached:
+                    logger.info(f"Reusing cached moderation verdict for {media_file.original_filename}")
+                    return cached
             
-            for detection in detection_result:
-                class_name = detection.get('class', detection.get('label', ''))
-                score = detection.get('score', 0.0)
-                detected_classes.append({'class': class_name, 'score': score})
-                
-                # Check if this is an inappropriate class
-                if class_name in inappropriate_classes:
-                    max_score = max(max_score, score)
-                    
-            # Consider image inappropriate if any inappropriate class detected with score > 0.6
-            confidence_score = max_score
-            is_inappropriate = max_score > 0.6
+            # Perform detection for detailed analysis
+            detection_result = self.detector.detect(decode_image(content))
             
-            # Compile detailed results
-            detailed_results = {
-                "timestamp": timezone.now().isoformat(),
-                "detection": detection_result,
-                "detected_classes": detected_classes,
-                "max_inappropriate_score": max_score,
-                "confidence_score": confidence_score,
-                "is_inappropriate": is_inappropriate,
-                "threshold_used": 0.6,
-                "model_version": "nudenet_3.4.2"
-            }
+            is_inappropriate, confidence_score, detailed_results = self.build_verdict(detection_result)
+            store_verdict(content_hash, version, is_inappropriate, confidence_score, detailed_results)
             
             logger.info(
                 f"Content analysis complete for {media_file.original_filename}: "
                 f"inappropriate={is_inappropriate}, confidence={confidence_score:.3f}"
             )
             
-            # Clean up temporary file
-            import os
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
-            
             return is_inappropriate, confidence_score, detailed_results
             
         except Exception as e:
@@ -153,6 +186,48 @@ class ContentModerationService:
             
             return False, 0.0, error_results
     
+    def build_verdict(self, detection_result) -> Tuple[bool, float, Dict]:
+        """
+        Turn NudeNet detections into a moderation verdict
+        
+        Args:
+            detection_result: Detections returned by NudeDetector.detect()
+            
+        Returns:
+            Tuple of (is_inappropriate, confidence_score, detailed_results)
+        """
+        # NudeDetector returns list of detections: [{'class': 'type', 'score': 0.9, 'box': [x,y,w,h]}]
+        max_score = 0.0
+        detected_classes = []
+        
+        for detection in detection_result:
+            class_name = detection.get('class', detection.get('label', ''))
+            score = detection.get('score', 0.0)
+            detected_classes.append({'class': class_name, 'score': score})
+            
+            # Check if this is an inappropriate class
+            if class_name in INAPPROPRIATE_CLASSES:
+                max_score = max(max_score, score)
+        
+        # Consider image inappropriate if any inappropriate class detected with score > threshold
+        threshold = self.get_detection_threshold()
+        confidence_score = max_score
+        is_inappropriate = max_score > threshold
+        
+        # Compile detailed results
+        detailed_results = {
+            "timestamp": timezone.now().isoformat(),
+            "detection": detection_result,
+            "detected_classes": detected_classes,
+            "max_inappropriate_score": max_score,
+            "confidence_score": confidence_score,
+            "is_inappropriate": is_inappropriate,
+            "threshold_used": threshold,
+            "model_version": MODEL_VERSION
+        }
+        
+        return is_inappropriate, confidence_score, detailed_results
+    
     def process_media_file(self, media_file) -> Dict:
         """
         Process a media file through content moderation
@@ -163,8 +238,6 @@ class ContentModerationService:
         Returns:
             Dict with processing results and actions taken
         """
-        from web.models import MediaFile
-        
         if not self.is_enabled():
             return {
                 "status": "disabled",
@@ -184,6 +257,27 @@ class ContentModerationService:
         # Analyze the image
         is_inappropriate, confidence_score, detailed_results = self.analyze_image(media_file)
         
+        # A failed analysis is not a verdict: leave the file pending so it can be retried
+        if detailed_results.get("status") == "analysis_failed":
+            return {
+                "status": "error",
+                "error": detailed_results.get("error", "analysis failed"),
+                "action": "none"
+            }
+        
+        return self.record_verdict(media_file, is_inappropriate, confidence_score, detailed_results)
+    
+    def record_verdict(self, media_file, is_inappropriate, confidence_score, detailed_results) -> Dict:
+        """
+        Store a moderation verdict on a media file and apply the moderation policy
+        
+        Returns:
+            Dict with processing results and actions taken
+        """
+        from web.models import MediaFile
+        
+        previous_status = media_file.content_moderation_status
+        
         # Update media file with moderation results
         if is_inappropriate:
             media_file.content_moderation_status = MediaFile.ContentModerationStatus.FLAGGED
@@ -199,6 +293,8 @@ class ContentModerationService:
             'content_moderation_details',
             'content_moderation_checked_at'
         ])
+        if media_file.content_moderation_status != previous_status:
+            self._invalidate_cards(media_file)
         
         result = {
             "status": "analyzed",
@@ -226,19 +322,43 @@ class ContentModerationService:
         
         return result
     
+    def _invalidate_cards(self, media_file):
+        """
+        Make cached cards showing a media file stale in every process.
+        
+        Verdicts are recorded by the moderation worker, not by the web process
+        serving the cards, so the change is written to the database: the
+        `updated` timestamps of the items and collections using the file (part
+        of the card cache keys) and their collections' card generations.
+        """
+        from web.card_cache import bump_collection_generation
+        from web.models import Collection, CollectionItem
+        
+        try:
+            now = timezone.now()
+            items = CollectionItem.objects.all_with_deleted().filter(images__media_file=media_file)
+            collection_ids = set(items.values_list('collection_id', flat=True))
+            CollectionItem.objects.all_with_deleted().filter(
+                pk__in=items.values_list('pk', flat=True)
+            ).update(updated=now)
+            Collection.objects.all_with_deleted().filter(images__media_file=media_file).update(updated=now)
+            bump_collection_generation(collection_ids)
+        except Exception as e:
+            logger.error(f"Failed to invalidate cached cards for {media_file.original_filename}: {e}")
+    
     def _delete_media_file(self, media_file):
         """
         Delete media file from storage and mark as deleted
         """
         try:
-            # Delete from storage
-            if default_storage.exists(media_file.file_path):
-                default_storage.delete(media_file.file_path)
+            # Delete from storage (a file shared with other MediaFiles is only released)
+            if media_file.delete_file():
                 logger.info(f"Deleted file from storage: {media_file.file_path}")
             
             # Mark file as non-existent
             media_file.file_exists = False
             media_file.save(update_fields=['file_exists'])
+            self._invalidate_cards(media_file)
             
         except Exception as e:
             logger.error(f"Failed to delete media file {media_file.file_path}: {e}")
@@ -339,36 +459,12 @@ The Beryl3 Team
             file_exists=True
         ).order_by('created')[:batch_size]
         
-        results = {
-            "status": "completed",
-            "processed": 0,
-            "flagged": 0,
-            "approved": 0,
-            "errors": 0,
-            "actions_taken": {}
-        }
-        
-        for media_file in pending_files:
-            try:
-                result = self.process_media_file(media_file)
-                results["processed"] += 1
-                
-                if result.get("is_inappropriate"):
-                    results["flagged"] += 1
-                else:
-                    results["approved"] += 1
-                
-                if result.get("action") != "none":
-                    action = result["action"]
-                    results["actions_taken"][action] = results["actions_taken"].get(action, 0) + 1
-                
-            except Exception as e:
-                logger.error(f"Error processing file {media_file.id}: {e}")
-                results["errors"] += 1
+        # Batched inference in this process (see web/moderation_batch.py)
+        results = BatchModerationEngine(self, workers=1, batch_size=min(batch_size, 16)).run(pending_files)
         
         logger.info(f"Batch analysis complete: {results}")
         return results
 
 
-# Global service instance
+# Global service instance (cheap: the model is loaded on first use)
 content_moderation_service = ContentModerationService()
\ No newline at end of file
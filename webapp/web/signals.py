@@ -6,11 +6,20 @@
 # pylint: disable=line-too-long
 
 import logging
+from collections import Counter, defaultdict
 from django.utils import timezone
 
+from django.db import DatabaseError
 from django.dispatch import receiver
-from django.db.models.signals import post_save, post_delete
-from web.models import Collection, CollectionItem, CollectionImage, CollectionItemImage, CollectionItemLink
+from django.db.models.signals import post_save, post_delete, pre_save
+from web.autocomplete import bump_user_generation
+from web.card_cache import bump_collection_generation, bump_generation
+from web.facets import apply_deltas, attribute_facet_key, item_facet_keys
+from web.link_matching import bump_link_pattern_version
+from web.models import (
+    Collection, CollectionFacetCount, CollectionItem, CollectionImage, CollectionItemImage, CollectionItemLink,
+    CollectionItemAttributeValue, ItemAttribute, ItemSearchDocument, ItemType, LinkPattern, Location, MediaFile
+)
 
 logger = logging.getLogger('webapp')
 
@@ -124,6 +133,284 @@ def update_collection_on_item_link_delete(sender, instance, **kwargs):
         if instance.item.collection:
             update_collection_timestamp(instance.item.collection)
 
+@receiver(post_save, sender=CollectionItemAttributeValue)
+def update_item_on_attribute_value_save(sender, instance, created, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Update item timestamp when an attribute value is saved (new item card version)
+    """
+    if instance.item_id:
+        update_item_timestamp(instance.item)
+
+@receiver(post_delete, sender=CollectionItemAttributeValue)
+def update_item_on_attribute_value_delete(sender, instance, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Update item timestamp when an attribute value is deleted (new item card version)
+    """
+    if instance.item_id:
+        update_item_timestamp(instance.item)
+
+# ============================================================================
+# Item Card Cache Invalidation Signals (see web/card_cache.py)
+# ============================================================================
+
+# MediaFile fields that change how an image appears on an item card
+# (metadata holds the resized variants used in srcset)
+CARD_MEDIA_FIELDS = {'file_path', 'file_exists', 'content_moderation_status', 'is_deleted', 'metadata'}
+
+@receiver(post_save, sender=Collection)
+def invalidate_cards_on_collection_save(sender, instance, created, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Invalidate cached item cards of a collection when the collection changes
+    """
+    if not created:
+        bump_collection_generation([instance.pk])
+
+@receiver(post_save, sender=ItemType)
+@receiver(post_delete, sender=ItemType)
+@receiver(post_save, sender=ItemAttribute)
+@receiver(post_delete, sender=ItemAttribute)
+@receiver(post_save, sender=LinkPattern)
+@receiver(post_delete, sender=LinkPattern)
+def invalidate_cards_on_definition_change(sender, instance, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Invalidate all cached item cards when item types, attributes or link
+    patterns change (icons, labels and link names are shared by all cards)
+    """
+    bump_generation()
+
+@receiver(post_save, sender=LinkPattern)
+@receiver(post_delete, sender=LinkPattern)
+def recompile_link_patterns_on_change(sender, instance, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Bump the link pattern version when a pattern is saved or soft-deleted;
+    this process recompiles right away, others within the version check interval
+    """
+    bump_link_pattern_version()
+
+@receiver(post_save, sender=MediaFile)
+def invalidate_cards_on_media_file_save(sender, instance, created, update_fields=None, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Invalidate cached cards of collections whose items use a media file
+    when its path, moderation status or deletion state changes
+    """
+    if created or (update_fields is not None and not CARD_MEDIA_FIELDS.intersection(update_fields)):
+        return
+    bump_collection_generation(
+        CollectionItemImage.objects.all_with_deleted().filter(media_file=instance).values_list('item__collection_id', flat=True)
+    )
+
+@receiver(post_save, sender=Location)
+def invalidate_cards_on_location_save(sender, instance, created, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Invalidate cached cards of collections with items stored at a location
+    """
+    if not created:
+        bump_collection_generation(
+            CollectionItem.objects.filter(location=instance).values_list('collection_id', flat=True).distinct()
+        )
+
+# ============================================================================
+# Search Document Maintenance Signals (see web/search.py)
+# ============================================================================
+
+# CollectionItem fields that are part of the search document
+SEARCH_ITEM_FIELDS = {'name', 'description', 'your_id', 'is_deleted'}
+
+def refresh_search_document(item_id):
+    """
+    Helper function to rebuild an item's search document
+    """
+    try:
+        ItemSearchDocument.refresh_for_item(item_id)
+    except DatabaseError as e:
+        logger.error("Error refreshing search document for item %s: %s", item_id, str(e))
+
+@receiver(post_save, sender=CollectionItem)
+def update_search_document_on_item_save(sender, instance, created, update_fields=None, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Rebuild the search document when searchable item fields change
+    """
+    if update_fields is not None and not SEARCH_ITEM_FIELDS.intersection(update_fields):
+        return
+    refresh_search_document(instance.pk)
+
+@receiver(post_save, sender=CollectionItemAttributeValue)
+@receiver(post_delete, sender=CollectionItemAttributeValue)
+@receiver(post_save, sender=CollectionItemLink)
+@receiver(post_delete, sender=CollectionItemLink)
+def update_search_document_on_item_detail_change(sender, instance, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Rebuild the search document when an attribute value or link of an item changes
+    """
+    if instance.item_id:
+        refresh_search_document(instance.item_id)
+
+# ============================================================================
+# Collection Facet Summary Signals (see web/facets.py)
+# ============================================================================
+
+# Fields that decide which facets an item or attribute value counts towards
+FACET_ITEM_FIELDS = {'collection', 'collection_id', 'status', 'item_type', 'item_type_id', 'is_deleted'}
+FACET_ATTRIBUTE_VALUE_FIELDS = {'item', 'item_id', 'item_attribute', 'item_attribute_id', 'value', 'is_deleted'}
+
+def apply_facet_deltas(deltas_by_collection):
+    """
+    Helper function to apply facet count changes per collection, and to
+    invalidate autocomplete suggestions of owners whose attribute values changed
+    """
+    try:
+        for collection_id, deltas in deltas_by_collection.items():
+            apply_deltas(collection_id, deltas)
+
+        attribute_collection_ids = [
+            collection_id for collection_id, deltas in deltas_by_collection.items()
+            if any(key[0] == CollectionFacetCount.Facet.ATTRIBUTE and delta for key, delta in deltas.items())
+        ]
+        if attribute_collection_ids:
+            bump_user_generation(
+                Collection.objects.all_with_deleted().filter(pk__in=attribute_collection_ids).values_list('created_by_id', flat=True)
+            )
+    except DatabaseError as e:
+        logger.error("Error updating collection facet counts: %s", str(e))
+
+def live_item_collection_id(item_id):
+    """
+    Helper function returning the collection of an item, or None for soft-deleted items
+    """
+    item = CollectionItem.objects.all_with_deleted().filter(pk=item_id).values('collection_id', 'is_deleted').first()
+    if item is None or item['is_deleted']:
+        return None
+    return item['collection_id']
+
+@receiver(pre_save, sender=CollectionItem)
+def remember_item_facets(sender, instance, update_fields=None, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Remember the facet fields of an item before it is saved
+    """
+    instance._facet_previous = None  # pylint: disable=protected-access
+    if instance.pk and (update_fields is None or FACET_ITEM_FIELDS.intersection(update_fields)):
+        instance._facet_previous = CollectionItem.objects.all_with_deleted().filter(pk=instance.pk).values(  # pylint: disable=protected-access
+            'collection_id', 'status', 'item_type_id', 'is_deleted'
+        ).first()
+
+@receiver(post_save, sender=CollectionItem)
+def update_facets_on_item_save(sender, instance, created, update_fields=None, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Move an item's facet counts when it is created, soft-deleted, restored,
+    moved to another collection or its status or item type changes
+    """
+    previous = getattr(instance, '_facet_previous', None)
+    if not created and previous is None:
+        return
+
+    current = {
+        'collection_id': instance.collection_id,
+        'status': instance.status,
+        'item_type_id': instance.item_type_id,
+        'is_deleted': instance.is_deleted,
+    }
+    if previous == current:
+        return
+
+    deltas_by_collection = defaultdict(Counter)
+    old_collection_id = previous['collection_id'] if previous and not previous['is_deleted'] else None
+    new_collection_id = instance.collection_id if not instance.is_deleted else None
+
+    if old_collection_id:
+        for key in item_facet_keys(previous['status'], previous['item_type_id']):
+            deltas_by_collection[old_collection_id][key] -= 1
+    if new_collection_id:
+        for key in item_facet_keys(instance.status, instance.item_type_id):
+            deltas_by_collection[new_collection_id][key] += 1
+
+    # Attribute values count towards the collection of a live item
+    if not created and old_collection_id != new_collection_id:
+        attribute_values = CollectionItemAttributeValue.objects.filter(item_id=instance.pk).values_list('item_attribute_id', 'value')
+        for item_attribute_id, value in attribute_values:
+            key = attribute_facet_key(item_attribute_id, value)
+            if old_collection_id:
+                deltas_by_collection[old_collection_id][key] -= 1
+            if new_collection_id:
+                deltas_by_collection[new_collection_id][key] += 1
+
+    apply_facet_deltas(deltas_by_collection)
+
+@receiver(post_delete, sender=CollectionItem)
+def update_facets_on_item_delete(sender, instance, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Remove a hard-deleted item from its collection's facet counts
+    (its attribute values are removed by their own delete signals)
+    """
+    if not instance.is_deleted:
+        apply_facet_deltas({instance.collection_id: Counter({key: -1 for key in item_facet_keys(instance.status, instance.item_type_id)})})
+
+@receiver(pre_save, sender=CollectionItemAttributeValue)
+def remember_attribute_value_facet(sender, instance, update_fields=None, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Remember the facet fields of an attribute value before it is saved
+    """
+    instance._facet_previous = None  # pylint: disable=protected-access
+    if instance.pk and (update_fields is None or FACET_ATTRIBUTE_VALUE_FIELDS.intersection(update_fields)):
+        instance._facet_previous = CollectionItemAttributeValue.objects.all_with_deleted().filter(pk=instance.pk).values(  # pylint: disable=protected-access
+            'item_id', 'item_attribute_id', 'value', 'is_deleted'
+        ).first()
+
+@receiver(post_save, sender=CollectionItemAttributeValue)
+def update_facets_on_attribute_value_save(sender, instance, created, update_fields=None, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Move facet counts when an attribute value is created, changed or soft-deleted
+    """
+    previous = getattr(instance, '_facet_previous', None)
+    if not created and previous is None:
+        return
+
+    current = {
+        'item_id': instance.item_id,
+        'item_attribute_id': instance.item_attribute_id,
+        'value': instance.value,
+        'is_deleted': instance.is_deleted,
+    }
+    if previous == current:
+        return
+
+    deltas_by_collection = defaultdict(Counter)
+    if previous and not previous['is_deleted']:
+        collection_id = live_item_collection_id(previous['item_id'])
+        if collection_id:
+            deltas_by_collection[collection_id][attribute_facet_key(previous['item_attribute_id'], previous['value'])] -= 1
+    if not instance.is_deleted:
+        collection_id = live_item_collection_id(instance.item_id)
+        if collection_id:
+            deltas_by_collection[collection_id][attribute_facet_key(instance.item_attribute_id, instance.value)] += 1
+
+    apply_facet_deltas(deltas_by_collection)
+
+@receiver(post_delete, sender=CollectionItemAttributeValue)
+def update_facets_on_attribute_value_delete(sender, instance, **kwargs):
+    # pylint: disable=unused-argument
+    """
+    Remove a hard-deleted attribute value from its collection's facet counts
+    """
+    if instance.is_deleted:
+        return
+    collection_id = live_item_collection_id(instance.item_id)
+    if collection_id:
+        apply_facet_deltas({collection_id: Counter({attribute_facet_key(instance.item_attribute_id, instance.value): -1})})
+
 # ============================================================================
 # Disabled automatic logging - using manual RecentActivity calls in views
 # ============================================================================
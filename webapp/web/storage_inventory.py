@@ -0,0 +1,284 @@
+"""
+Storage Inventory
+=================
+
+Snapshot of every file in media storage, used to find orphaned files
+(files in storage without a MediaFile record).
+
+Listing a bucket with many objects is slow, so it is not done inside a
+request anymore. `manage.py storage_inventory` streams the listing page by
+page (GCS `list_blobs` pages, `os.scandir` locally) into a
+StorageInventorySnapshot, inserting StorageInventoryEntry rows with
+bulk_create per page; memory stays flat however large the bucket is.
+Orphans are then found in the database with an anti-join against
+MediaFile.file_path instead of comparing two Python sets.
+
+- Image derivatives (`derivatives/...`) belong to their original's
+  MediaFile (see web/image_derivatives.py) and are never orphans.
+- Staged import files (`imports/...`) belong to ImportJobs, which delete
+  them when done; unconfirmed ones are cleaned up by the import worker
+  (see web/import_jobs.py).
+- Files modified within ORPHAN_GRACE_PERIOD are not orphans either: an
+  upload writes the file before its MediaFile row.
+- Before deleting, each batch of orphans is checked against MediaFile
+  again, so files adopted since the snapshot (deduplication) survive.
+
+Only the latest KEEP_SNAPSHOTS snapshots are kept.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
+
+logger = logging.getLogger("webapp")
+
+# Rows per bulk_create and per GCS listing page
+PAGE_SIZE = 1000
+
+# Files younger than this are never reported as orphans
+ORPHAN_GRACE_PERIOD = timedelta(hours=1)
+
+# Snapshots kept (the latest complete one feeds the sys media page)
+KEEP_SNAPSHOTS = 2
+
+DERIVATIVE_PREFIX = "derivatives/"
+
+DEFAULT_DELETE_WORKERS = 8
+
+
+def _gcs_pages(storage):
+    """Yield lists of (path, size, generation, modified) per GCS listing page"""
+    location = getattr(settings, 'GCS_LOCATION', 'media')
+    prefix = f"{location}/" if location else ""
+    blobs = storage.bucket.list_blobs(prefix=prefix or None, page_size=PAGE_SIZE)
+    for page in blobs.pages:
+        entries = []
+        for blob in page:
+            path = blob.name[len(prefix):]
+            if not path or path.endswith('/'):
+                continue
+            entries.append((path, blob.size, str(blob.generation or ''), blob.updated))
+        yield entries
+
+
+def _local_pages(root):
+    """Yield lists of (path, size, mtime_ns, modified) of a local directory tree"""
+    entries = []
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                        continue
+                    stat = entry.stat()
+                    path = os.path.relpath(entry.path, root).replace('\\', '/')
+                    modified = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+                    entries.append((path, stat.st_size, str(stat.st_mtime_ns), modified))
+                    if len(entries) >= PAGE_SIZE:
+                        yield entries
+                        entries = []
+        except FileNotFoundError:
+            continue
+    if entries:
+        yield entries
+
+
+def _listdir_pages(storage, directory=""):
+    """Yield lists of entries for storages that only implement listdir()"""
+    directories, files = storage.listdir(directory)
+    entries = []
+    for name in files:
+        path = f"{directory}/{name}" if directory else name
+        try:
+            size = storage.size(path)
+        except Exception:  # pylint: disable=broad-except
+            size = None
+        entries.append((path, size, "", None))
+        if len(entries) >= PAGE_SIZE:
+            yield entries
+            entries = []
+    if entries:
+        yield entries
+    for name in directories:
+        yield from _listdir_pages(storage, f"{directory}/{name}" if directory else name)
+
+
+def list_storage_pages(storage=None):
+    """Yield pages of (path, size, generation, modified) for every file in storage"""
+    storage = storage or default_storage
+    if hasattr(storage, 'bucket'):
+        yield from _gcs_pages(storage)
+    elif getattr(storage, 'location', None) and os.path.isdir(storage.location):
+        yield from _local_pages(storage.location)
+    else:
+        yield from _listdir_pages(storage)
+
+
+def latest_snapshot():
+    """The most recent complete StorageInventorySnapshot, or None"""
+    from web.models import StorageInventorySnapshot
+
+    return StorageInventorySnapshot.objects.filter(
+        status=StorageInventorySnapshot.Status.COMPLETE
+    ).order_by('-started').first()
+
+
+def orphan_entries(snapshot):
+    """
+    Entries of a snapshot without a MediaFile (database anti-join).
+
+    Soft-deleted MediaFiles still own their file, so they count as references.
+    """
+    from web.import_jobs import STAGING_PREFIX
+    from web.models import MediaFile
+
+    referenced = MediaFile.objects.all_with_deleted().filter(file_path=OuterRef('path'))
+    entries = snapshot.entries.exclude(
+        path__startswith=DERIVATIVE_PREFIX
+    ).exclude(
+        path__startswith=STAGING_PREFIX
+    ).filter(~Exists(referenced))
+    cutoff = snapshot.started - ORPHAN_GRACE_PERIOD
+    return entries.exclude(modified__gt=cutoff)
+
+
+def _count_orphans(snapshot):
+    totals = orphan_entries(snapshot).aggregate(count=Count('pk'), size=Sum('size'))
+    snapshot.orphan_count = totals['count']
+    snapshot.orphan_size = totals['size'] or 0
+
+
+def take_snapshot(storage=None, progress=None):
+    """
+    Stream a listing of media storage into a new snapshot and count its orphans.
+
+    Args:
+        storage: Storage to list (default_storage if None)
+        progress: Optional callback(snapshot) after each page
+
+    Returns:
+        StorageInventorySnapshot (status COMPLETE, or FAILED with the error)
+    """
+    from web.models import StorageInventoryEntry, StorageInventorySnapshot
+
+    storage = storage or default_storage
+    snapshot = StorageInventorySnapshot.objects.create(backend=type(storage).__name__)
+
+    try:
+        for page in list_storage_pages(storage):
+            rows = []
+            for path, size, generation, modified in page:
+                if len(path) > 500:
+                    logger.warning(f"Storage inventory: skipping over-long path {path[:100]}...")
+                    continue
+                rows.append(StorageInventoryEntry(
+                    snapshot=snapshot, path=path, size=size, generation=generation, modified=modified
+                ))
+                snapshot.file_count += 1
+                snapshot.total_size += size or 0
+            StorageInventoryEntry.objects.bulk_create(rows, batch_size=PAGE_SIZE)
+            if progress:
+                progress(snapshot)
+
+        _count_orphans(snapshot)
+        snapshot.status = StorageInventorySnapshot.Status.COMPLETE
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error(f"Storage inventory failed after {snapshot.file_count} files: {e}")
+        snapshot.status = StorageInventorySnapshot.Status.FAILED
+        snapshot.error = str(e)
+
+    snapshot.completed = timezone.now()
+    snapshot.save()
+
+    if snapshot.status == StorageInventorySnapshot.Status.COMPLETE:
+        logger.info(
+            f"Storage inventory: {snapshot.file_count} files ({snapshot.total_size} bytes), "
+            f"{snapshot.orphan_count} orphaned ({snapshot.orphan_size} bytes)"
+        )
+        prune_snapshots()
+    return snapshot
+
+
+def prune_snapshots(keep=KEEP_SNAPSHOTS):
+    """Delete all but the latest `keep` snapshots (entries cascade)"""
+    from web.models import StorageInventorySnapshot
+
+    old_ids = list(StorageInventorySnapshot.objects.order_by('-started').values_list('pk', flat=True)[keep:])
+    if old_ids:
+        StorageInventorySnapshot.objects.filter(pk__in=old_ids).delete()
+    return len(old_ids)
+
+
+def _delete_path(path):
+    """(deleted, error) for one storage path; runs in a pool thread"""
+    try:
+        default_storage.delete(path)
+        return True, None
+    except Exception as e:  # pylint: disable=broad-except
+        return False, e
+
+
+def delete_orphans(snapshot, workers=DEFAULT_DELETE_WORKERS, limit=None, dry_run=False):
+    """
+    Delete the orphaned files of a snapshot from storage.
+
+    Each batch is re-checked against MediaFile right before deleting, and
+    deletes run concurrently (one storage round trip per file).
+
+    Returns:
+        Dict with deleted/skipped/errors counts and freed bytes
+    """
+    from web.models import MediaFile
+
+    result = {'deleted': 0, 'skipped': 0, 'errors': 0, 'freed': 0}
+
+    orphans = orphan_entries(snapshot).order_by('pk').values_list('pk', 'path', 'size')
+    if limit:
+        orphans = orphans[:limit]
+    orphans = list(orphans)
+
+    deleted_ids = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for offset in range(0, len(orphans), PAGE_SIZE):
+            batch = orphans[offset:offset + PAGE_SIZE]
+
+            # Referenced since the snapshot was taken (e.g. adopted by a duplicate upload)
+            referenced = set(MediaFile.objects.all_with_deleted().filter(
+                file_path__in=[path for _pk, path, _size in batch]
+            ).values_list('file_path', flat=True))
+            batch = [entry for entry in batch if entry[1] not in referenced]
+            result['skipped'] += len(referenced)
+
+            if dry_run:
+                result['deleted'] += len(batch)
+                result['freed'] += sum(size or 0 for _pk, _path, size in batch)
+                continue
+
+            for (entry_id, path, size), (deleted, error) in zip(batch, pool.map(_delete_path, [entry[1] for entry in batch])):
+                if error is not None:
+                    logger.error(f"Error deleting orphaned file {path}: {error}")
+                    result['errors'] += 1
+                    continue
+                if not deleted:
+                    result['skipped'] += 1
+                    continue
+                logger.info(f"Deleted orphaned file: {path}")
+                result['deleted'] += 1
+                result['freed'] += size or 0
+                deleted_ids.append(entry_id)
+
+    if deleted_ids:
+        snapshot.entries.filter(pk__in=deleted_ids).delete()
+        _count_orphans(snapshot)
+        snapshot.save(update_fields=['orphan_count', 'orphan_size'])
+
+    return result
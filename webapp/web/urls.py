@@ -27,9 +27,11 @@ urlpatterns = [
     # Collection
     path('collections/', collection.collection_list_view, name='collection_list'),
     path('collections/new/', collection.collection_create, name='collection_create'),
+    path('collections/export/', collection.collection_export_all_view, name='collection_export_all'),
     path('collections/<str:hash>/', collection.collection_detail_view, name='collection_detail'),
     path('collections/<str:hash>/edit/', collection.collection_update_view, name='collection_update'),
     path('collections/<str:hash>/delete/', collection.collection_delete_view, name='collection_delete'),
+    path('collections/<str:hash>/export/', collection.collection_export_view, name='collection_export'),
     path('collections/<str:hash>/manage-images/', images.collection_manage_images, name='collection_manage_images'),
     
 
@@ -42,6 +44,14 @@ urlpatterns = [
     # Progressive item card loading for private collections (HTMX endpoint)
     path('hx/items/<str:item_hash>/card/private/', items.load_private_item_card, name='load_private_item_card'),
 
+    # Batched item card loading (one HTMX request per batch of cards)
+    path('hx/items/cards/', public.load_item_cards, name='load_item_cards'),
+    path('hx/items/cards/private/', items.load_private_item_cards, name='load_private_item_cards'),
+
+    # Task 47: Per-group item pages for grouped collections (HTMX endpoints)
+    path('hx/collections/<str:hash>/group-items/', collection.collection_group_items_view, name='collection_group_items'),
+    path('hx/share/collections/<str:hash>/group-items/', public.public_collection_group_items, name='public_collection_group_items'),
+
     # Legacy: Lazy load item images (deprecated - use card endpoint instead)
     path('hx/items/<str:item_hash>/image/', public.lazy_load_item_image, name='lazy_load_item_image'),
 
@@ -63,6 +73,9 @@ urlpatterns = [
     # User favorites
     path('favorites/', user.favorites_view, name='favorites_list'),
 
+    # Full-text search across the user's items
+    path('search/', user.search_items_view, name='search_items'),
+
     # User account settings
     path('user/settings/', user_settings.user_settings_view, name='user_settings'),
 
@@ -135,6 +148,8 @@ urlpatterns = [
     path('sys/import/', sys.sys_import_data, name='sys_import_data'),
     path('sys/import/confirm/', sys.sys_import_data_confirm, name='sys_import_data_confirm'),
     path('sys/import/result/', sys.sys_import_result, name='sys_import_result'),
+    path('sys/import/result/<int:job_id>/', sys.sys_import_result, name='sys_import_job'),
+    path('sys/import/result/<int:job_id>/progress/', sys.sys_import_job_progress, name='sys_import_job_progress'),
     path('sys/fix-attributes/', fix_attrs.fix_production_attributes, name='sys_fix_attributes'),
     
     # Content moderation
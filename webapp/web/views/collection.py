@@ -6,6 +6,7 @@
 # pylint: disable=line-too-long
 
 import logging
+from urllib.parse import quote
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -36,6 +37,7 @@ def get_attribute_statistics(items_queryset, collection):
     Returns:
         list: List of dicts with keys: attribute_name, attribute_id, value, count
     """
+    from web.facets import format_attribute_stat
     from web.models import CollectionItemAttributeValue
     from django.db.models import Count
 
@@ -56,22 +58,196 @@ def get_attribute_statistics(items_queryset, collection):
     )[:20]  # Limit to top 20 at database level
 
     # Convert to list format for template with display values
-    result = []
-    for stat in attribute_stats:
-        # Truncate long values for display
-        display_value = stat['value']
-        if len(display_value) > 30:
-            display_value = display_value[:27] + '...'
+    return [
+        format_attribute_stat(stat['item_attribute__display_name'], stat['item_attribute__id'], stat['value'], stat['count'])
+        for stat in attribute_stats
+    ]
 
-        result.append({
-            'attribute_name': stat['item_attribute__display_name'],
-            'attribute_id': stat['item_attribute__id'],
-            'value': stat['value'],
-            'display_value': display_value,
-            'count': stat['count']
-        })
 
-    return result
+def apply_attribute_range_filter(items_queryset, attribute, range_min, range_max):
+    """
+    Filter items by a numeric or date range on one attribute.
+
+    Uses the typed shadow columns of CollectionItemAttributeValue so the
+    comparison happens in the database (value_number for NUMBER attributes,
+    value_date for DATE attributes). Invalid bounds are ignored.
+
+    Args:
+        items_queryset: QuerySet of CollectionItem objects
+        attribute: ItemAttribute to filter on
+        range_min: Lower bound as submitted (string, may be empty)
+        range_max: Upper bound as submitted (string, may be empty)
+
+    Returns:
+        QuerySet: Filtered items
+    """
+    from datetime import datetime
+    from web.models import CollectionItemAttributeValue, ItemAttribute
+
+    if attribute.attribute_type == ItemAttribute.AttributeType.DATE:
+        typed_field = 'value_date'
+
+        def parse(raw):
+            return datetime.strptime(raw, '%Y-%m-%d').date()
+    elif attribute.attribute_type == ItemAttribute.AttributeType.NUMBER:
+        typed_field = 'value_number'
+        parse = float
+    else:
+        return items_queryset
+
+    lookups = {}
+    for bound, suffix in ((range_min, 'gte'), (range_max, 'lte')):
+        if not bound:
+            continue
+        try:
+            lookups[f'{typed_field}__{suffix}'] = parse(bound.strip())
+        except (ValueError, TypeError):
+            logger.warning("Ignoring invalid range bound '%s' for attribute '%s'", bound, attribute.name)
+
+    if not lookups:
+        return items_queryset
+
+    matching_item_ids = CollectionItemAttributeValue.objects.filter(
+        item_attribute=attribute,
+        **lookups
+    ).values('item_id')
+    return items_queryset.filter(id__in=matching_item_ids)
+
+
+# Query parameters that carry item filters; preserved when loading group pages
+COLLECTION_FILTER_PARAMS = ('status', 'item_type', 'search', 'attribute', 'attribute_value', 'attribute_min', 'attribute_max', 'facet')
+
+
+def apply_collection_filters(items_queryset, params):
+    """
+    Apply the collection detail filters (status, item type, search, attribute
+    value, attribute range and facet quick filters) from request parameters.
+
+    Args:
+        items_queryset: QuerySet of CollectionItem objects
+        params: QueryDict (request.GET)
+
+    Returns:
+        tuple: (filtered QuerySet, dict of filter values for the template context)
+    """
+    from web.facets import apply_facet_filters, parse_facet_params
+    from web.models import CollectionItemAttributeValue, ItemAttribute
+
+    filter_status = params.get('status', '')
+    filter_item_type = params.get('item_type', '')
+    filter_search = params.get('search', '')
+
+    # Task 52: Add attribute filter
+    filter_attribute = params.get('attribute', '')
+    filter_attribute_value = params.get('attribute_value', '')
+    filter_attribute_min = params.get('attribute_min', '')
+    filter_attribute_max = params.get('attribute_max', '')
+
+    if filter_status and filter_status in dict(CollectionItem.Status.choices):
+        items_queryset = items_queryset.filter(status=filter_status)
+
+    if filter_item_type:
+        if filter_item_type == 'none':
+            items_queryset = items_queryset.filter(item_type__isnull=True)
+        elif filter_item_type.isdigit():
+            items_queryset = items_queryset.filter(item_type_id=filter_item_type)
+
+    # Full-text search over name, description, your_id, attribute values and link names
+    if filter_search:
+        from web.search import filter_items
+        items_queryset = filter_items(items_queryset, filter_search)
+
+    # Task 52: Apply attribute filter (subquery keeps one row per item, no DISTINCT needed)
+    if filter_attribute.isdigit() and filter_attribute_value:
+        items_queryset = items_queryset.filter(
+            id__in=CollectionItemAttributeValue.objects.filter(
+                item_attribute_id=filter_attribute,
+                value=filter_attribute_value
+            ).values('item_id')
+        )
+
+    # Quick filters: every selected attribute value must match (AND)
+    filter_facets = parse_facet_params(params)
+    items_queryset = apply_facet_filters(items_queryset, filter_facets)
+
+    # Range filter on NUMBER/DATE attributes, evaluated against typed columns
+    filter_attribute_obj = None
+    if filter_attribute.isdigit():
+        filter_attribute_obj = ItemAttribute.objects.filter(id=filter_attribute).first()
+    if filter_attribute_obj and (filter_attribute_min or filter_attribute_max):
+        items_queryset = apply_attribute_range_filter(items_queryset, filter_attribute_obj, filter_attribute_min, filter_attribute_max)
+
+    filters = {
+        'filter_status': filter_status,
+        'filter_item_type': filter_item_type,
+        'filter_search': filter_search,
+        'filter_attribute': filter_attribute,
+        'filter_attribute_value': filter_attribute_value,
+        'filter_attribute_obj': filter_attribute_obj,
+        'filter_attribute_min': filter_attribute_min,
+        'filter_attribute_max': filter_attribute_max,
+        'filter_facets': filter_facets,
+    }
+    return items_queryset, filters
+
+
+def get_items_per_page(params, default=25):
+    """Task 46: Read the per_page parameter, limited to the supported page sizes"""
+    try:
+        items_per_page = int(params.get('per_page', default))
+    except (ValueError, TypeError):
+        return default
+    return items_per_page if items_per_page in [10, 25, 50, 100] else default
+
+
+def paginate_collection_items(collection, items, per_page, params, count=None):
+    """
+    Task 46: Cursor-paginate collection items in the collection's sort order.
+
+    Keyset pagination is used for name/created/updated sorting; attribute
+    sorting falls back to offset cursors over Collection.order_items().
+
+    Args:
+        collection: Collection whose sort_by setting is used
+        items: QuerySet of CollectionItem objects
+        per_page: Items per page
+        params: Request QueryDict (cursor/dir plus parameters kept in links)
+        count: Known total number of items (shown in the UI)
+
+    Returns:
+        CursorPage
+    """
+    from web.pagination import CursorPaginator
+
+    # Only hashes are rendered; cards (and their relations) load via HTMX
+    items = items.prefetch_related(None)
+    # order_items() also annotates the keys of the keyset ordering (name_lower)
+    queryset = collection.order_items(items)
+    return CursorPaginator(queryset, per_page, collection.get_item_keyset_ordering(), params=params, count=count).page_from_request(params)
+
+
+def facet_clear_query(params):
+    """Query string of the current filters without the attribute and quick filters"""
+    from django.http import QueryDict
+    from web.pagination import PAGINATION_PARAMS
+
+    query = QueryDict(mutable=True)
+    for key, values in params.lists():
+        if key not in ('attribute', 'attribute_value', 'attribute_min', 'attribute_max', 'facet') + PAGINATION_PARAMS:
+            query.setlist(key, values)
+    return query.urlencode()
+
+
+def get_filter_querystring(params):
+    """Encode the active item filters (and page size) for group 'load more' URLs"""
+    from django.http import QueryDict
+
+    query = QueryDict(mutable=True)
+    for key in COLLECTION_FILTER_PARAMS + ('per_page',):
+        values = [value for value in params.getlist(key) if value]
+        if values:
+            query.setlist(key, values)
+    return query.urlencode()
 
 
 @login_required
@@ -204,227 +380,62 @@ def collection_detail_view(request, hash):
             'item_type__attributes'  # Task 65 fix: Prefetch item type attributes to avoid N+1 in get_display_attributes()
         )
 
-        # Task 45: Apply filters
-        filter_status = request.GET.get('status', '')
-        filter_item_type = request.GET.get('item_type', '')
-        filter_search = request.GET.get('search', '')
-
-        # Task 52: Add attribute filter
-        filter_attribute = request.GET.get('attribute', '')
-        filter_attribute_value = request.GET.get('attribute_value', '')
-
-        if filter_status and filter_status in dict(CollectionItem.Status.choices):
-            items = items.filter(status=filter_status)
-
-        if filter_item_type:
-            if filter_item_type == 'none':
-                items = items.filter(item_type__isnull=True)
-            else:
-                items = items.filter(item_type_id=filter_item_type)
-
-        if filter_search:
-            items = items.filter(
-                Q(name__icontains=filter_search) |
-                Q(description__icontains=filter_search)
-            )
-
-        # Task 52: Apply attribute filter
-        if filter_attribute and filter_attribute_value:
-            from web.models import CollectionItemAttributeValue
-            items = items.filter(
-                attribute_values__item_attribute_id=filter_attribute,
-                attribute_values__value=filter_attribute_value
-            ).distinct()
+        # Task 45/52: Apply status, item type, search and attribute filters
+        items, filters = apply_collection_filters(items, request.GET)
+        filter_attribute = filters['filter_attribute']
 
         # Order items
         items = items.order_by('name')
 
-        # Calculate stats before pagination
-        stats = items.aggregate(
-            total_items=Count('id'),
-            in_collection_count=Count('id', filter=Q(status=CollectionItem.Status.IN_COLLECTION)),
-            wanted_count=Count('id', filter=Q(status=CollectionItem.Status.WANTED)),
-            reserved_count=Count('id', filter=Q(status=CollectionItem.Status.RESERVED))
-        )
-
-        # Task 52: Calculate attribute statistics
-        attribute_stats = get_attribute_statistics(items, collection)
-
-        # Task 45: Get available statuses and item types in collection (before filtering)
-        all_items = collection.items.all()
-        available_statuses = list(all_items.values_list('status', flat=True).distinct())
-        available_item_types = ItemType.objects.filter(
-            id__in=all_items.exclude(item_type__isnull=True).values_list('item_type_id', flat=True).distinct()
-        ).order_by('display_name')
-        has_items_without_type = all_items.filter(item_type__isnull=True).exists()
-
-        # Task 45: Get available attributes for filtering
-        from web.models import ItemAttribute
-        available_attributes = ItemAttribute.objects.filter(
-            id__in=all_items.values_list('attribute_values__item_attribute_id', flat=True).distinct()
-        ).order_by('display_name')
-
-        # Task 45: Get available values for selected attribute
-        available_attribute_values = []
-        if filter_attribute:
-            from web.models import CollectionItemAttributeValue
-            available_attribute_values = CollectionItemAttributeValue.objects.filter(
-                item__collection=collection,
-                item_attribute_id=filter_attribute
-            ).values_list('value', flat=True).distinct().order_by('value')
-
-        # Task 47: Apply grouping if enabled
-        grouped_items = None
-        if collection.group_by != Collection.GroupBy.NONE:
-            from collections import defaultdict
-            from web.models import CollectionItemAttributeValue
-
-            groups = defaultdict(list)
-            ungrouped_items = []
-
-            if collection.group_by == Collection.GroupBy.ITEM_TYPE:
-                # Group by item type
-                for item in items:
-                    if item.item_type:
-                        groups[item.item_type.display_name].append(item)
-                    else:
-                        ungrouped_items.append(item)
-
-                grouped_items = [
-                    {'attribute_name': 'Item Type', 'attribute_value': group_name, 'items': group_items}
-                    for group_name, group_items in groups.items()
-                ]
-
-            elif collection.group_by == Collection.GroupBy.STATUS:
-                # Group by status
-                for item in items:
-                    status_label = dict(CollectionItem.Status.choices).get(item.status, item.status)
-                    groups[item.status].append(item)
-
-                grouped_items = [
-                    {'attribute_name': 'Status', 'attribute_value': dict(CollectionItem.Status.choices).get(status, status), 'items': group_items}
-                    for status, group_items in groups.items()
-                ]
-
-            elif collection.group_by == Collection.GroupBy.ATTRIBUTE and collection.grouping_attribute:
-                # Group by specific attribute
-                # Task 65: Pre-fetch all attribute values to avoid N+1 queries (100+ queries → 0 queries)
-                attr_lookup = {}
-                for attr_val in CollectionItemAttributeValue.objects.filter(
-                    item__in=items,
-                    item_attribute=collection.grouping_attribute
-                ).select_related('item'):
-                    attr_lookup[attr_val.item_id] = attr_val.value
-
-                for item in items:
-                    if item.id in attr_lookup:
-                        group_key = attr_lookup[item.id]
-                        groups[group_key].append(item)
-                    else:
-                        ungrouped_items.append(item)
-
-                grouped_items = [
-                    {'attribute_name': collection.grouping_attribute.display_name, 'attribute_value': group_key, 'items': group_items}
-                    for group_key, group_items in groups.items()
-                ]
-
-            # Sort groups
-            if grouped_items:
-                grouped_items.sort(key=lambda x: str(x['attribute_value']))
-
-            # Sort items within each group
-            if grouped_items:
-                for group in grouped_items:
-                    if collection.sort_by == Collection.SortBy.NAME:
-                        group['items'].sort(key=lambda x: x.name.lower())
-                    elif collection.sort_by == Collection.SortBy.CREATED:
-                        group['items'].sort(key=lambda x: x.created, reverse=True)
-                    elif collection.sort_by == Collection.SortBy.UPDATED:
-                        group['items'].sort(key=lambda x: x.updated, reverse=True)
-                    elif collection.sort_by == Collection.SortBy.ATTRIBUTE and collection.sort_attribute:
-                        # Sort by attribute value
-                        # Task 65: Pre-fetch all sort attribute values to avoid N+1 queries (100+ queries → 0 queries)
-                        sort_lookup = {}
-                        for attr_val in CollectionItemAttributeValue.objects.filter(
-                            item__in=group['items'],
-                            item_attribute=collection.sort_attribute
-                        ).select_related('item'):
-                            sort_lookup[attr_val.item_id] = attr_val.get_typed_value()
-
-                        def get_attr_value(item):
-                            value = sort_lookup.get(item.id)
-                            if value is None:
-                                return (3, '')  # Items without the attribute at the end
-                            # Handle different types for sorting
-                            if isinstance(value, (int, float)):
-                                return (0, value)  # Numbers first, sorted numerically
-                            elif isinstance(value, str):
-                                # Try to convert to number for numeric strings
-                                try:
-                                    return (0, float(value))
-                                except (ValueError, TypeError):
-                                    return (1, value.lower())  # Strings second, case-insensitive
-                            else:
-                                return (2, str(value))  # Others last
-
-                        group['items'].sort(key=get_attr_value)
-
-            # Add ungrouped items as a special group if any exist
-            if ungrouped_items:
-                if collection.sort_by == Collection.SortBy.NAME:
-                    ungrouped_items.sort(key=lambda x: x.name.lower())
-                grouped_items.append({
-                    'attribute_name': 'Other Items',
-                    'attribute_value': None,
-                    'items': ungrouped_items
-                })
-
-        # Task 46: Add pagination
-        from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-
-        items_per_page = request.GET.get('per_page', '25')
-        try:
-            items_per_page = int(items_per_page)
-            if items_per_page not in [10, 25, 50, 100]:
-                items_per_page = 25
-        except (ValueError, TypeError):
-            items_per_page = 25
-
-        paginator = Paginator(items, items_per_page)
-        page_number = request.GET.get('page', 1)
-
-        try:
-            items_page = paginator.page(page_number)
-        except PageNotAnInteger:
-            items_page = paginator.page(1)
-        except EmptyPage:
-            items_page = paginator.page(paginator.num_pages)
+        # Task 45/52: Filter options and quick filters come from the
+        # precomputed facet summary (one query instead of six aggregates)
+        from web.facets import add_facet_links, get_facet_summary
+
+        facets = get_facet_summary(collection)
+        # Selecting an attribute alone (without value or range) does not filter items
+        filters_active = any(value for key, value in filters.items() if key not in ('filter_attribute', 'filter_attribute_obj'))
+
+        if filters_active:
+            # Stats and quick filters describe the filtered items
+            stats = items.aggregate(
+                total_items=Count('id'),
+                in_collection_count=Count('id', filter=Q(status=CollectionItem.Status.IN_COLLECTION)),
+                wanted_count=Count('id', filter=Q(status=CollectionItem.Status.WANTED)),
+                reserved_count=Count('id', filter=Q(status=CollectionItem.Status.RESERVED))
+            )
+            attribute_stats = get_attribute_statistics(items, collection)
+        else:
+            stats = {
+                'total_items': facets.total_items,
+                'in_collection_count': facets.status_count(CollectionItem.Status.IN_COLLECTION),
+                'wanted_count': facets.status_count(CollectionItem.Status.WANTED),
+                'reserved_count': facets.status_count(CollectionItem.Status.RESERVED),
+            }
+            attribute_stats = facets.top_attribute_values()
+        attribute_stats = add_facet_links(attribute_stats, request.GET)
+
+        # Task 47: Grouped collections render group headers only; each group's
+        # items are paged in via HTMX (collection_group_items_view)
+        from web.grouping import CollectionGrouping
+
+        items_per_page = get_items_per_page(request.GET)
+        grouping = CollectionGrouping(collection, items)
+        groups = grouping.get_groups() if grouping.is_active else None
 
         # Progressive loading: Pass only item hashes, not full items
         # Items will be loaded via HTMX as user scrolls
         item_hashes = None
-        item_hashes_grouped = None
+        items_page = None
 
-        if items_page:
-            # Paginated view: get hashes from current page
+        if groups is None:
+            # Task 46: Cursor pagination in the collection's sort order
+            items_page = paginate_collection_items(collection, items, items_per_page, request.GET, count=stats['total_items'])
             item_hashes = [item.hash for item in items_page]
-        elif grouped_items:
-            # Grouped view: extract hashes from groups
-            item_hashes_grouped = []
-            for group in grouped_items:
-                group_hashes = [item.hash for item in group['items']]
-                item_hashes_grouped.append({
-                    'attribute_name': group['attribute_name'],
-                    'attribute_value': group['attribute_value'],
-                    'item_hashes': group_hashes
-                })
-        else:
-            # All items view: get all hashes
-            item_hashes = [item.hash for item in items]
 
         # Log successful detail view
-        logger.info('collection_detail_view: Collection "%s" viewed with %d items (page %s of %s) by user %s [%s]',
-                   collection.name, stats['total_items'], items_page.number, paginator.num_pages,
+        logger.info('collection_detail_view: Collection "%s" viewed with %d items (%s) by user %s [%s]',
+                   collection.name, stats['total_items'],
+                   f'{len(groups)} groups' if groups is not None else f'{len(items_page)} on page',
                    request.user.username, request.user.id,
                    extra={'function': 'collection_detail_view', 'action': 'detail_view',
                          'object_type': 'Collection', 'object_hash': collection.hash,
@@ -434,22 +445,20 @@ def collection_detail_view(request, hash):
         context = {
             'collection': collection,
             'item_hashes': item_hashes,  # Pass hashes instead of full items
-            'item_hashes_grouped': item_hashes_grouped if grouped_items else None,  # Grouped structure
-            'page_obj': items_page,  # For pagination controls
+            'groups': groups,  # Group headers; items are loaded per group
+            'group_filter_query': get_filter_querystring(request.GET),
+            'page_obj': items_page,  # For pagination controls (ungrouped only)
             'stats': stats,
             'visibility_choices': Collection.Visibility.choices,
             'status_choices': CollectionItem.Status.choices,  # Task 45: Add status choices for filter
             'item_types': ItemType.objects.all(),
-            'available_statuses': available_statuses,
-            'available_item_types': available_item_types,
-            'has_items_without_type': has_items_without_type,
-            'available_attributes': available_attributes,
-            'available_attribute_values': available_attribute_values,
-            'filter_status': filter_status,
-            'filter_item_type': filter_item_type,
-            'filter_search': filter_search,
-            'filter_attribute': filter_attribute,
-            'filter_attribute_value': filter_attribute_value,
+            'available_statuses': facets.available_statuses,
+            'available_item_types': facets.item_types,
+            'has_items_without_type': facets.has_items_without_type,
+            'available_attributes': facets.attributes,
+            'available_attribute_values': facets.attribute_values(filter_attribute) if filter_attribute else [],
+            'facet_clear_query': facet_clear_query(request.GET),
+            **filters,
             'items_per_page': items_per_page,
             'attribute_stats': attribute_stats,
         }
@@ -465,6 +474,43 @@ def collection_detail_view(request, hash):
                             'function_args': {'hash': hash, 'request_method': request.method}})
         raise
 
+
+@login_required
+@log_execution_time
+def collection_group_items_view(request, hash):
+    """
+    HTMX: Return one page of item card placeholders for a single group
+    of a grouped collection, followed by a "load more" button when the
+    group has more items. Filters from the detail view are preserved.
+    """
+    from web.grouping import CollectionGrouping
+
+    collection = get_object_or_404(Collection, hash=hash, created_by=request.user)
+
+    group_key = request.GET.get('group', '')
+    items, _filters = apply_collection_filters(collection.items.all(), request.GET)
+    page = CollectionGrouping(collection, items).get_group_page(
+        group_key, request.GET.get('page', 1), get_items_per_page(request.GET)
+    )
+
+    next_page_url = None
+    if page['next_page']:
+        next_page_url = '{}?group={}&page={}&{}'.format(
+            reverse('collection_group_items', kwargs={'hash': collection.hash}),
+            quote(group_key), page['next_page'], get_filter_querystring(request.GET)
+        )
+
+    logger.debug("collection_group_items_view: %d items for group '%s' of collection '%s' [%s]",
+                 len(page['item_hashes']), group_key, collection.name, collection.hash)
+
+    return render(request, 'partials/_collection_group_items.html', {
+        'item_hashes': page['item_hashes'],
+        'card_batch_url_name': 'load_private_item_cards',
+        'next_page_url': next_page_url,
+        'remaining_count': page['remaining_count'],
+    })
+
+
 @login_required
 @log_execution_time
 def collection_update_view(request, hash):
@@ -578,3 +624,51 @@ def collection_delete_view(request, hash):
                           'function_args': {'hash': hash, 'request_method': request.method}})
         raise
 
+
+
+def _export_response(request, collections, filename):
+    """StreamingHttpResponse of an export in the format given by ?format= (json, jsonl or csv)"""
+    from django.http import Http404, StreamingHttpResponse
+    from web.data_export import CONTENT_TYPES, EXPORT_FORMATS, stream_export
+
+    export_format = request.GET.get('format', 'json')
+    if export_format not in EXPORT_FORMATS:
+        raise Http404("Unknown export format")
+
+    response = StreamingHttpResponse(
+        stream_export(collections, export_format, user=request.user, url_builder=request.build_absolute_uri),
+        content_type=f"{CONTENT_TYPES[export_format]}; charset=utf-8",
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+@login_required
+@log_execution_time
+def collection_export_view(request, hash):
+    """
+    Streams one collection in the import format (?format=json|jsonl|csv).
+    """
+    collection = get_object_or_404(Collection, hash=hash, created_by=request.user)
+    logger.info("User '%s [%s]' exporting collection '%s [%s]' as %s", request.user.username, request.user.id, collection.name, collection.hash, request.GET.get('format', 'json'))
+
+    return _export_response(
+        request,
+        Collection.objects.filter(pk=collection.pk),
+        f"beryl-{collection.hash}",
+    )
+
+
+@login_required
+@log_execution_time
+def collection_export_all_view(request):
+    """
+    Streams all collections of the user in the import format (?format=json|jsonl|csv).
+    """
+    logger.info("User '%s [%s]' exporting all collections as %s", request.user.username, request.user.id, request.GET.get('format', 'json'))
+
+    return _export_response(
+        request,
+        Collection.objects.filter(created_by=request.user),
+        f"beryl-export-{request.user.username}",
+    )
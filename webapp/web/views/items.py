@@ -9,11 +9,12 @@ import logging
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import redirect, render, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.db import transaction
 
+from web.card_cache import render_item_card, render_item_cards
 from web.decorators import log_execution_time
 from web.forms import CollectionItemForm
 from web.models import Collection, CollectionItem, RecentActivity, ItemType, CollectionItemAttributeValue
@@ -524,6 +525,34 @@ def load_private_item_card(request, item_hash):
         collection__created_by=request.user
     )
 
-    return render(request, 'partials/_item_list_item.html', {
-        'item': item,
+    return HttpResponse(render_item_card(request, item, 'partials/_item_list_item.html'))
+
+
+@login_required
+@log_execution_time
+def load_private_item_cards(request):
+    """
+    HTMX endpoint to load a batch of private item cards in one request.
+    Only items from the current user's collections are rendered.
+    """
+    from web.views.public import get_requested_item_hashes, order_by_requested_hashes
+
+    item_hashes = get_requested_item_hashes(request)
+    if not item_hashes:
+        return HttpResponseBadRequest("No items requested.")
+
+    items = CollectionItem.objects.filter(
+        hash__in=item_hashes,
+        collection__created_by=request.user
+    ).select_related(
+        'item_type', 'collection', 'location'
+    ).prefetch_related(
+        'images__media_file',
+        'attribute_values__item_attribute',
+        'item_type__attributes',
+        'links'
+    )
+
+    return render(request, 'partials/_item_card_batch.html', {
+        'cards': render_item_cards(request, order_by_requested_hashes(items, item_hashes), 'partials/_item_list_item.html'),
     })
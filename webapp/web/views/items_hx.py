@@ -9,7 +9,6 @@ import logging
 
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
-from django.db.models import Count
 from django.http import Http404, JsonResponse, HttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.views.decorators.http import require_POST, require_http_methods
@@ -354,8 +353,8 @@ def item_autocomplete_attribute_value(request, hash):
     Requirements:
     - Min 3 characters to trigger
     - Search user's existing values
-    - Filter by item type (if applicable)
-    - Fuzzy matching (substring search)
+    - Filter by attribute (attributes belong to an item type)
+    - Fuzzy matching (prefix matches first, then substring matches)
     """
     item = get_object_or_404(CollectionItem, hash=hash)
 
@@ -385,27 +384,11 @@ def item_autocomplete_attribute_value(request, hash):
     except ItemAttribute.DoesNotExist:
         return JsonResponse({'suggestions': []})
 
-    # Query CollectionItemAttributeValue for user's items
-    # Filter by attribute and item type if available
-    values_query = CollectionItemAttributeValue.objects.filter(
-        item__collection__created_by=request.user,
-        item_attribute=attribute
-    )
+    # Suggestions come from the user's precomputed attribute value counts,
+    # cached in memory between keystrokes (see web/autocomplete.py)
+    from web.autocomplete import suggest_attribute_values
 
-    # Task 57: Filter by item type if item has one
-    if item.item_type:
-        values_query = values_query.filter(item__item_type=item.item_type)
-
-    # Fuzzy matching: search anywhere in the string (case-insensitive)
-    values_query = values_query.filter(value__icontains=query)
-
-    # Get distinct values, order by frequency (most used first)
-    suggestions = values_query.values('value').annotate(
-        count=Count('id')
-    ).order_by('-count', 'value')[:10]  # Limit to top 10 suggestions
-
-    # Extract just the values for response
-    suggestion_list = [s['value'] for s in suggestions]
+    suggestion_list = suggest_attribute_values(request.user, attribute, query)
 
     logger.info("item_autocomplete_attribute_value: Autocomplete for attribute '%s' query '%s' returned %d suggestions for item '%s' [%s]",
                attribute_name, query, len(suggestion_list), item.name, item.hash,
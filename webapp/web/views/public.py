@@ -12,12 +12,11 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.sites.models import Site
 from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from post_office import mail
 from django.core.validators import validate_email
 from django.db import transaction
-from django.db.models import Count, Q
-from django.http import Http404, HttpResponseBadRequest
+from django.db.models import Count
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, render
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -25,6 +24,7 @@ from django.utils import timezone
 from django.views.decorators.http import require_POST
 from faker import Faker
 
+from web.card_cache import render_item_card, render_item_cards
 from web.models import Collection, CollectionItem, RecentActivity, ItemType
 from django.contrib.auth import get_user_model
 
@@ -78,173 +78,79 @@ def public_collection_view(request, hash):
         'item_type__attributes'  # Task 65 fix: Prefetch item type attributes to avoid N+1 in get_display_attributes()
     ).order_by('name')
 
-    stats = all_items.aggregate(
-        total_items=Count('id'),
-        in_collection_count=Count('id', filter=Q(status=CollectionItem.Status.IN_COLLECTION)),
-        wanted_count=Count('id', filter=Q(status=CollectionItem.Status.WANTED)),
-        reserved_count=Count('id', filter=Q(status=CollectionItem.Status.RESERVED))
-    )
+    # Stats and item type distribution (of all items) come from the
+    # precomputed facet summary instead of aggregates over all items
+    from web.facets import get_facet_summary
 
-    # Get item type distribution for all items (not paginated)
-    item_type_distribution = all_items.values('item_type__display_name', 'item_type__icon').annotate(
-        count=Count('id')
-    ).order_by('-count')
-
-    # Task 47: Apply grouping if enabled (same logic as collection_detail_view)
-    grouped_items = None
-    if collection.group_by != Collection.GroupBy.NONE:
-        from collections import defaultdict
-        from web.models import CollectionItemAttributeValue
-
-        groups = defaultdict(list)
-        ungrouped_items = []
-
-        # Task 65: Pre-fetch attribute values for grouping to avoid N+1 queries
-        attr_lookup = {}
-        if collection.group_by == Collection.GroupBy.ATTRIBUTE and collection.grouping_attribute:
-            for attr_val in CollectionItemAttributeValue.objects.filter(
-                item__in=all_items,
-                item_attribute=collection.grouping_attribute
-            ).select_related('item'):
-                attr_lookup[attr_val.item_id] = attr_val.value
-
-        for item in all_items:
-            if collection.group_by == Collection.GroupBy.ITEM_TYPE:
-                if item.item_type:
-                    groups[item.item_type.display_name].append(item)
-                else:
-                    ungrouped_items.append(item)
-            elif collection.group_by == Collection.GroupBy.STATUS:
-                status_label = dict(CollectionItem.Status.choices).get(item.status, item.status)
-                groups[item.status].append(item)
-            elif collection.group_by == Collection.GroupBy.ATTRIBUTE and collection.grouping_attribute:
-                if item.id in attr_lookup:
-                    groups[attr_lookup[item.id]].append(item)
-                else:
-                    ungrouped_items.append(item)
-
-        # Create grouped items list
-        if collection.group_by == Collection.GroupBy.ITEM_TYPE:
-            grouped_items = [
-                {'attribute_name': 'Item Type', 'attribute_value': group_name, 'items': group_items}
-                for group_name, group_items in groups.items()
-            ]
-        elif collection.group_by == Collection.GroupBy.STATUS:
-            grouped_items = [
-                {'attribute_name': 'Status', 'attribute_value': dict(CollectionItem.Status.choices).get(status, status), 'items': group_items}
-                for status, group_items in groups.items()
-            ]
-        elif collection.group_by == Collection.GroupBy.ATTRIBUTE and collection.grouping_attribute:
-            grouped_items = [
-                {'attribute_name': collection.grouping_attribute.display_name, 'attribute_value': group_key, 'items': group_items}
-                for group_key, group_items in groups.items()
-            ]
-
-        # Sort groups
-        if grouped_items:
-            grouped_items.sort(key=lambda x: str(x['attribute_value']))
-
-        # Sort items within each group
-        if grouped_items:
-            for group in grouped_items:
-                if collection.sort_by == Collection.SortBy.NAME:
-                    group['items'].sort(key=lambda x: x.name.lower())
-                elif collection.sort_by == Collection.SortBy.CREATED:
-                    group['items'].sort(key=lambda x: x.created, reverse=True)
-                elif collection.sort_by == Collection.SortBy.UPDATED:
-                    group['items'].sort(key=lambda x: x.updated, reverse=True)
-                elif collection.sort_by == Collection.SortBy.ATTRIBUTE and collection.sort_attribute:
-                    # Task 65: Pre-fetch all sort attribute values to avoid N+1 queries
-                    sort_lookup = {}
-                    for attr_val in CollectionItemAttributeValue.objects.filter(
-                        item__in=group['items'],
-                        item_attribute=collection.sort_attribute
-                    ).select_related('item'):
-                        sort_lookup[attr_val.item_id] = attr_val.get_typed_value()
-
-                    def get_attr_value(item):
-                        value = sort_lookup.get(item.id)
-                        if value is None:
-                            return (3, '')  # Items without the attribute at the end
-                        # Handle different types for sorting
-                        if isinstance(value, (int, float)):
-                            return (0, value)  # Numbers first, sorted numerically
-                        elif isinstance(value, str):
-                            # Try to convert to number for numeric strings
-                            try:
-                                return (0, float(value))
-                            except (ValueError, TypeError):
-                                return (1, value.lower())  # Strings second, case-insensitive
-                        else:
-                            return (2, str(value))  # Others last
-
-                    group['items'].sort(key=get_attr_value)
-
-        # Add ungrouped items
-        if ungrouped_items:
-            if collection.sort_by == Collection.SortBy.NAME:
-                ungrouped_items.sort(key=lambda x: x.name.lower())
-            grouped_items.append({
-                'attribute_name': 'Other Items',
-                'attribute_value': None,
-                'items': ungrouped_items
-            })
+    facets = get_facet_summary(collection)
+    stats = {
+        'total_items': facets.total_items,
+        'in_collection_count': facets.status_count(CollectionItem.Status.IN_COLLECTION),
+        'wanted_count': facets.status_count(CollectionItem.Status.WANTED),
+        'reserved_count': facets.status_count(CollectionItem.Status.RESERVED),
+    }
+    item_type_distribution = facets.item_type_distribution()
 
-    # Pagination - handle both grouped and ungrouped views
-    items_per_page = request.GET.get('per_page', '25')
-    try:
-        items_per_page = int(items_per_page)
-        if items_per_page not in [10, 25, 50, 100]:
-            items_per_page = 25
-    except (ValueError, TypeError):
-        items_per_page = 25
-
-    # If grouping is enabled, don't paginate (show all groups)
-    if grouped_items:
-        page_obj = None
-    else:
-        # Regular pagination for ungrouped items
-        paginator = Paginator(all_items, items_per_page)
-        page_number = request.GET.get('page', 1)
+    # Task 47: Grouped collections render group headers only; each group's
+    # items are paged in via HTMX (public_collection_group_items)
+    from web.grouping import CollectionGrouping
+    from web.views.collection import get_items_per_page
 
-        try:
-            page_obj = paginator.page(page_number)
-        except PageNotAnInteger:
-            page_obj = paginator.page(1)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages)
+    items_per_page = get_items_per_page(request.GET)
+    grouping = CollectionGrouping(collection, all_items)
+    groups = grouping.get_groups() if grouping.is_active else None
+
+    # Progressive loading: Pass only item hashes, not full items
+    # Items will be loaded via HTMX as user scrolls
+    page_obj = None
+    item_hashes = None
+    if groups is None:
+        # Task 46: Cursor pagination in the collection's sort order (no OFFSET scans)
+        from web.views.collection import paginate_collection_items
+
+        page_obj = paginate_collection_items(collection, all_items, items_per_page, request.GET, count=stats['total_items'])
+        item_hashes = [item.hash for item in page_obj]
 
     fake = Faker()
     dummy_name = fake.name()
 
     # Task 62: Collect all available images for random background selection
+    # Only file paths / URLs are loaded; the storage URL is built for the chosen image
+    from django.core.files.storage import default_storage
+    from web.models import CollectionItemImage
+
     background_image_url = None
     available_images = []
 
     # Add collection images from MediaFile (uploaded images)
     for collection_image in collection.images.all():
         if collection_image.media_file and collection_image.media_file.file_exists:
-            available_images.append(collection_image.media_file.file_url)
+            available_images.append(('media', collection_image.media_file.file_path))
 
     # Add collection image_url if exists (fallback for URL-based images)
     # Skip placeholder images from placehold.co
     if collection.image_url and 'placehold.co' not in collection.image_url:
-        available_images.append(collection.image_url)
+        available_images.append(('url', collection.image_url))
 
     # Add all item images from MediaFile (uploaded images)
-    for item in all_items:
-        for item_image in item.images.all():
-            if item_image.media_file and item_image.media_file.file_exists:
-                available_images.append(item_image.media_file.file_url)
+    available_images.extend(
+        ('media', file_path) for file_path in CollectionItemImage.objects.filter(
+            item__collection=collection,
+            item__is_deleted=False,
+            media_file__file_exists=True
+        ).values_list('media_file__file_path', flat=True)
+    )
 
-        # Also add item image_url if exists (fallback for URL-based images)
-        # Skip placeholder images from placehold.co
-        if item.image_url and 'placehold.co' not in item.image_url:
-            available_images.append(item.image_url)
+    # Also add item image_url if exists (fallback for URL-based images)
+    available_images.extend(
+        ('url', image_url) for image_url in all_items.exclude(image_url__isnull=True).exclude(image_url='')
+        .exclude(image_url__contains='placehold.co').values_list('image_url', flat=True)
+    )
 
     # Select random image for background
     if available_images:
-        background_image_url = random.choice(available_images)
+        image_source, image_ref = random.choice(available_images)
+        background_image_url = default_storage.url(image_ref) if image_source == 'media' else image_ref
         logger.info(
             'public_collection_view: Selected random background image for collection "%s"',
             collection.name,
@@ -257,30 +163,10 @@ def public_collection_view(request, hash):
             }
         )
 
-    # Progressive loading: Pass only item hashes, not full items
-    # Items will be loaded via HTMX as user scrolls
-    if page_obj:
-        # Paginated view: get hashes from current page
-        item_hashes = [item.hash for item in page_obj]
-    elif grouped_items:
-        # Grouped view: extract hashes from groups
-        item_hashes_grouped = []
-        for group in grouped_items:
-            group_hashes = [item.hash for item in group['items']]
-            item_hashes_grouped.append({
-                'attribute_name': group['attribute_name'],
-                'attribute_value': group['attribute_value'],
-                'item_hashes': group_hashes
-            })
-        item_hashes = None  # Use grouped structure instead
-    else:
-        # All items view: get all hashes
-        item_hashes = [item.hash for item in all_items]
-
     context = {
         "collection": collection,
-        "item_hashes": item_hashes,  # Simple list of hashes
-        "item_hashes_grouped": item_hashes_grouped if grouped_items else None,  # Grouped structure
+        "item_hashes": item_hashes,  # Simple list of hashes (None if grouped)
+        "groups": groups,  # Group headers; items are loaded per group
         "page_obj": page_obj,  # For pagination controls (None if grouped)
         "stats": stats,
         "item_type_distribution": item_type_distribution,
@@ -292,7 +178,7 @@ def public_collection_view(request, hash):
 
     # Task 65: Log view execution time
     view_duration = time_module.time() - view_start
-    logger.info(f"[PERF] public_collection_view took {view_duration:.3f}s for collection {collection.hash} ({len(all_items)} items)")
+    logger.info(f"[PERF] public_collection_view took {view_duration:.3f}s for collection {collection.hash} ({stats['total_items']} items)")
 
     return render(request, "public/collection_public_detail.html", context)
 
@@ -627,6 +513,41 @@ def lazy_load_item_image(request, item_hash):
     })
 
 
+def public_collection_group_items(request, hash):
+    """
+    HTMX endpoint returning one page of item card placeholders for a single
+    group of a grouped public collection, plus a "load more" button when the
+    group has more items.
+    """
+    from urllib.parse import quote
+    from web.grouping import CollectionGrouping
+    from web.views.collection import get_items_per_page
+
+    collection = get_object_or_404(Collection, hash=hash)
+    if collection.visibility == Collection.Visibility.PRIVATE:
+        raise Http404("Collection not found or is private.")
+
+    group_key = request.GET.get('group', '')
+    items_per_page = get_items_per_page(request.GET)
+    page = CollectionGrouping(collection, collection.items.all()).get_group_page(
+        group_key, request.GET.get('page', 1), items_per_page
+    )
+
+    next_page_url = None
+    if page['next_page']:
+        next_page_url = '{}?group={}&page={}&per_page={}'.format(
+            reverse('public_collection_group_items', kwargs={'hash': collection.hash}),
+            quote(group_key), page['next_page'], items_per_page
+        )
+
+    return render(request, 'partials/_collection_group_items.html', {
+        'item_hashes': page['item_hashes'],
+        'card_batch_url_name': 'load_item_cards',
+        'next_page_url': next_page_url,
+        'remaining_count': page['remaining_count'],
+    })
+
+
 def load_item_card(request, item_hash):
     """
     HTMX endpoint to progressively load a single item card on scroll intersection.
@@ -651,6 +572,58 @@ def load_item_card(request, item_hash):
         hash=item_hash
     )
 
-    return render(request, 'partials/_item_public_card.html', {
-        'item': item,
+    return HttpResponse(render_item_card(request, item, 'partials/_item_public_card.html'))
+
+
+# Upper bound on hashes accepted by the batched card endpoints
+MAX_ITEM_CARD_BATCH = 50
+
+
+def get_requested_item_hashes(request):
+    """
+    Read item hashes (?h=...&h=...) for the batched card endpoints.
+    Duplicates are dropped, request order is kept, and the list is capped
+    at MAX_ITEM_CARD_BATCH.
+    """
+    hashes = []
+    for item_hash in request.GET.getlist('h'):
+        if item_hash and item_hash not in hashes:
+            hashes.append(item_hash)
+    return hashes[:MAX_ITEM_CARD_BATCH]
+
+
+def order_by_requested_hashes(items, item_hashes):
+    """Return items in the order their hashes were requested"""
+    items_by_hash = {item.hash: item for item in items}
+    return [items_by_hash[item_hash] for item_hash in item_hashes if item_hash in items_by_hash]
+
+
+def load_item_cards(request):
+    """
+    HTMX endpoint to load a batch of public item cards in one request.
+
+    The templates group placeholders into batches; each batch sends its
+    hashes when it enters the viewport and is replaced by the rendered
+    cards. All cards share one query plus one prefetch pass per relation,
+    instead of one request and five queries per card.
+    """
+    item_hashes = get_requested_item_hashes(request)
+    if not item_hashes:
+        return HttpResponseBadRequest("No items requested.")
+
+    items = CollectionItem.objects.filter(
+        hash__in=item_hashes
+    ).exclude(
+        collection__visibility=Collection.Visibility.PRIVATE
+    ).select_related(
+        'item_type', 'collection'
+    ).prefetch_related(
+        'images__media_file',
+        'attribute_values__item_attribute',
+        'item_type__attributes',
+        'links'
+    )
+
+    return render(request, 'partials/_item_card_batch.html', {
+        'cards': render_item_cards(request, order_by_requested_hashes(items, item_hashes), 'partials/_item_public_card.html'),
     })
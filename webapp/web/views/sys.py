@@ -139,12 +139,11 @@ def sys_users(request):
     elif active_filter == 'inactive':
         users = users.filter(Q(is_active=False) | Q(last_login__isnull=True))
     
-    users = users.order_by('-date_joined')
-    
-    # Pagination
-    paginator = Paginator(users, 25)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Task 46: Keyset pagination; the users table is small, so the filtered total is counted exactly
+    from web.pagination import CursorPaginator
+
+    total_count = users.count()
+    page_obj = CursorPaginator(users, 25, ('-date_joined', '-id'), params=request.GET, count=total_count).page_from_request(request.GET)
     
     # Get all groups for filter dropdown
     groups = Group.objects.all().order_by('name')
@@ -155,7 +154,7 @@ def sys_users(request):
         'group_filter': group_filter,
         'active_filter': active_filter,
         'groups': groups,
-        'total_count': users.count(),
+        'total_count': total_count,
         'debug': settings.DEBUG,
     }
     
@@ -988,6 +987,8 @@ def sys_item_attribute_update(request, attribute_id):
         # Remove any non-alphanumeric characters except underscores
         name = ''.join(char for char in name if char.isalnum() or char == '_')
             
+        type_changed = attribute.attribute_type != attribute_type
+
         attribute.name = name
         attribute.display_name = display_name
         attribute.attribute_type = attribute_type
@@ -995,6 +996,11 @@ def sys_item_attribute_update(request, attribute_id):
         attribute.help_text = help_text or None
         attribute.choices = choices
         attribute.save()
+
+        # Typed value columns depend on the attribute type
+        if type_changed:
+            resynced = attribute.sync_value_typed_columns()
+            logger.info("Resynced typed columns for %d values of attribute '%s' [%s]", resynced, attribute.name, attribute.id)
         
         logger.info("Admin user '%s' [%s] updated attribute '%s' [%s]", 
                    request.user.username, request.user.id, attribute.display_name, attribute.id)
@@ -1471,12 +1477,10 @@ def sys_media_browser(request):
             Q(file_path__icontains=search)
         )
     
-    media_files = media_files.order_by('-created')
-    
-    # Pagination
-    paginator = Paginator(media_files, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Task 46: Keyset pagination; the total is a planner estimate on PostgreSQL
+    from web.pagination import CursorPaginator, estimate_count
+
+    page_obj = CursorPaginator(media_files, 20, ('-created', '-id'), params=request.GET, count=estimate_count(media_files)).page_from_request(request.GET)
     
     # Get statistics
     stats = MediaFile.get_storage_statistics()
@@ -1496,11 +1500,7 @@ def sys_media_browser(request):
         folders = ['collections', 'items', 'avatars', 'test']
     
     # Check for abandoned files
-    abandoned_count = 0
-    try:
-        abandoned_count = check_abandoned_files()
-    except Exception as e:
-        logger.error("Error checking abandoned files: %s", str(e))
+    abandoned_count, inventory_snapshot = check_abandoned_files()
     
     context = {
         'page_obj': page_obj,
@@ -1511,9 +1511,9 @@ def sys_media_browser(request):
         'stats': stats,
         'folders': folders,
         'abandoned_count': abandoned_count,
+        'inventory_snapshot': inventory_snapshot,
         'media_types': MediaFile.MediaType.choices,
         'storage_backends': MediaFile.StorageBackend.choices,
-        'total_count': media_files.count(),
     }
     
     return render(request, 'sys/media_browser.html', context)
@@ -1595,9 +1595,8 @@ def sys_media_delete(request, media_file_hash):
         affected_collections = list(media_file.collection_images.select_related('collection').values_list('collection__name', flat=True))
         affected_items = list(media_file.item_images.select_related('item').values_list('item__name', flat=True))
         
-        # Delete from storage if it exists
-        if default_storage.exists(file_path):
-            default_storage.delete(file_path)
+        # Delete from storage if it exists (a file shared with other MediaFiles is only released)
+        if media_file.delete_file():
             logger.info("Deleted file from storage: %s", file_path)
         
         # Delete MediaFile record (CASCADE will automatically delete related records)
@@ -1665,47 +1664,44 @@ def sys_media_cleanup_abandoned(request):
 @application_admin_required
 @log_execution_time
 def sys_media_verify_all(request):
-    """Verify all media files exist in storage"""
+    """Verify media files exist in storage (oldest verification first, within a time budget)"""
     if request.method != 'POST':
         messages.error(request, 'Invalid request method')
         return redirect('sys_media_browser')
     
     try:
-        # Get all media files
-        all_files = MediaFile.objects.all()
-        total_files = all_files.count()
+        total_files = MediaFile.objects.count()
         
         if total_files == 0:
             messages.info(request, 'No media files to verify')
             return redirect('sys_media_browser')
         
-        # Verify each file
-        verified_count = 0
-        missing_count = 0
-        error_count = 0
-        
-        for media_file in all_files:
-            try:
-                if media_file.verify_file_exists():
-                    verified_count += 1
-                else:
-                    missing_count += 1
-            except Exception as e:
-                logger.error(f"Error verifying file {media_file.hash}: {str(e)}")
-                error_count += 1
+        # Concurrent checks, oldest verification first, bounded by a time budget;
+        # the rest is verified by the next run or by `manage.py verify_media_files`
+        from web.media_verification import verify_media_files
+        result = verify_media_files(budget_seconds=getattr(settings, 'MEDIA_VERIFY_REQUEST_BUDGET', 20))
+        verified_count = result['found']
+        missing_count = result['missing']
+        error_count = result['errors']
+        checked_count = result['checked'] + error_count
         
         # Log the verification results
-        logger.info("Admin user '%s' [%s] verified %d files: %d found, %d missing, %d errors", 
-                   request.user.username, request.user.id, total_files, 
-                   verified_count, missing_count, error_count)
+        logger.info("Admin user '%s' [%s] verified %d files: %d found, %d missing, %d errors, %d remaining", 
+                   request.user.username, request.user.id, checked_count, 
+                   verified_count, missing_count, error_count, result['remaining'])
         
         # Create appropriate message based on results
-        if missing_count == 0 and error_count == 0:
+        if missing_count == 0 and error_count == 0 and result['budget_exhausted']:
+            messages.success(request, f"✅ Checked {checked_count} of {total_files} files before the time limit: all {verified_count} found")
+        elif missing_count == 0 and error_count == 0:
             messages.success(request, f"✅ All {verified_count} files verified successfully!")
         elif missing_count > 0 and error_count == 0:
-            messages.warning(request, f"⚠️ Verified {total_files} files: {verified_count} found, {missing_count} missing")
+            messages.warning(request, f"⚠️ Verified {checked_count} files: {verified_count} found, {missing_count} missing")
         elif error_count > 0:
-            messages.error(request, f"❌ Verified {total_files} files: {verified_count} found, {missing_count} missing, {error_count} errors")
+            messages.error(request, f"❌ Verified {checked_count} files: {verified_count} found, {missing_count} missing, {error_count} errors")
+        
+        if result['budget_exhausted']:
+            messages.info(request, f"Time limit reached: {result['remaining']} files not verified yet. Run again to continue, or use 'manage.py verify_media_files'.")
         
         return redirect('sys_media_browser')
         
@@ -1716,104 +1712,36 @@ def sys_media_verify_all(request):
 
 
 def check_abandoned_files():
-    """Check for files in storage that don't have MediaFile records"""
-    abandoned_count = 0
-    
+    """
+    Orphaned files (in storage without MediaFile records) of the latest storage inventory.
+
+    Storage is not listed here: `manage.py storage_inventory` snapshots it
+    (see web/storage_inventory.py).
+
+    Returns:
+        Tuple of (orphan count, latest complete StorageInventorySnapshot or None)
+    """
+    from web.storage_inventory import latest_snapshot
+
     try:
-        # Get all files from storage
-        storage_files = set()
-        
-        # For different storage backends, we need different approaches
-        if hasattr(default_storage, 'bucket'):
-            # GCS storage
-            from google.cloud import storage
-            try:
-                blobs = default_storage.bucket.list_blobs()
-                for blob in blobs:
-                    # Remove the location prefix if present
-                    path = blob.name
-                    location = getattr(settings, 'GCS_LOCATION', 'media')
-                    if path.startswith(f"{location}/"):
-                        path = path[len(f"{location}/"):]
-                    storage_files.add(path)
-            except Exception as e:
-                logger.error("Error listing GCS files: %s", str(e))
-                return 0
-                
-        elif hasattr(default_storage, 'location'):
-            # Local file system storage
-            import os
-            media_root = default_storage.location
-            for root, dirs, files in os.walk(media_root):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, media_root)
-                    storage_files.add(relative_path.replace('\\', '/'))
-        
-        # Get all MediaFile paths
-        media_file_paths = set(MediaFile.objects.values_list('file_path', flat=True))
-        
-        # Find abandoned files
-        abandoned_files = storage_files - media_file_paths
-        abandoned_count = len(abandoned_files)
-        
-        return abandoned_count
-        
+        snapshot = latest_snapshot()
+        return (snapshot.orphan_count if snapshot else 0), snapshot
     except Exception as e:
         logger.error("Error checking abandoned files: %s", str(e))
-        return 0
+        return 0, None
 
 
 def cleanup_abandoned_files():
-    """Clean up abandoned files from storage"""
-    cleaned_count = 0
-    
+    """Delete the orphaned files of the latest storage inventory snapshot"""
+    from web.storage_inventory import delete_orphans, latest_snapshot
+
+    snapshot = latest_snapshot()
+    if snapshot is None:
+        return 0
+
     try:
-        # Get all files from storage
-        storage_files = set()
-        
-        if hasattr(default_storage, 'bucket'):
-            # GCS storage
-            from google.cloud import storage
-            try:
-                blobs = list(default_storage.bucket.list_blobs())
-                for blob in blobs:
-                    path = blob.name
-                    location = getattr(settings, 'GCS_LOCATION', 'media')
-                    if path.startswith(f"{location}/"):
-                        path = path[len(f"{location}/"):]
-                    storage_files.add(path)
-            except Exception as e:
-                logger.error("Error listing GCS files for cleanup: %s", str(e))
-                return 0
-                
-        elif hasattr(default_storage, 'location'):
-            # Local file system storage
-            import os
-            media_root = default_storage.location
-            for root, dirs, files in os.walk(media_root):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, media_root)
-                    storage_files.add(relative_path.replace('\\', '/'))
-        
-        # Get all MediaFile paths
-        media_file_paths = set(MediaFile.objects.values_list('file_path', flat=True))
-        
-        # Find and delete abandoned files
-        abandoned_files = storage_files - media_file_paths
-        
-        for file_path in abandoned_files:
-            try:
-                if default_storage.exists(file_path):
-                    default_storage.delete(file_path)
-                    cleaned_count += 1
-                    logger.info("Cleaned up abandoned file: %s", file_path)
-            except Exception as e:
-                logger.error("Error deleting abandoned file %s: %s", file_path, str(e))
-        
-        return cleaned_count
-        
+        result = delete_orphans(snapshot)
+        return result['deleted']
     except Exception as e:
         logger.error("Error during abandoned files cleanup: %s", str(e))
         return 0
@@ -2297,7 +2225,8 @@ def sys_import_data(request):
         'example_formats': {
             'json': 'application/json',
             'yaml': 'application/x-yaml', 
-            'yml': 'application/x-yaml'
+            'yml': 'application/x-yaml',
+            'jsonl': 'application/jsonl'
         }
     }
     
@@ -2307,6 +2236,8 @@ def sys_import_data(request):
             import_file = request.FILES.get('import_file')
             target_user_id = request.POST.get('target_user')
             download_images = request.POST.get('download_images') == 'on'
+            upsert = request.POST.get('upsert') == 'on'
+            delete_missing = upsert and request.POST.get('delete_missing') == 'on'
             
             if not import_file:
                 messages.error(request, "Please select a file to import")
@@ -2323,23 +2254,27 @@ def sys_import_data(request):
                 messages.error(request, "Selected user not found")
                 return render(request, 'sys/import_data.html', context)
             
-            # Validate file size (limit to 10MB)
+            # Get file extension
+            file_name = import_file.name.lower()
+            if file_name.endswith('.jsonl'):
+                return _sys_import_jsonl(request, context, import_file, target_user, download_images, upsert, delete_missing)
+            
+            # Validate file size (limit to 10MB; larger imports use JSON Lines)
             if import_file.size > 10 * 1024 * 1024:
-                messages.error(request, "File size too large. Maximum 10MB allowed")
+                messages.error(request, "File size too large. Maximum 10MB allowed (use JSON Lines for larger imports)")
                 return render(request, 'sys/import_data.html', context)
             
-            # Get file extension
-            file_name = import_file.name.lower()
             if file_name.endswith('.json'):
                 file_extension = 'json'
             elif file_name.endswith('.yaml') or file_name.endswith('.yml'):
                 file_extension = 'yaml'
             else:
-                messages.error(request, "Unsupported file format. Use JSON or YAML files")
+                messages.error(request, "Unsupported file format. Use JSON, YAML or JSON Lines files")
                 return render(request, 'sys/import_data.html', context)
             
             # Read file content
-            file_content = import_file.read().decode('utf-8')
+            raw_content = import_file.read()
+            file_content = raw_content.decode('utf-8')
             
             # Validate the import file
             from web.import_validator import ImportValidator
@@ -2353,22 +2288,30 @@ def sys_import_data(request):
                 messages.error(request, f"Import validation failed with {len(errors)} error(s)")
                 return render(request, 'sys/import_data.html', context)
             
-            # Store validated data in session for confirmation
+            # Calculate total items for display
+            total_items = sum(len(collection.get('items', [])) for collection in data.get('collections', []))
+            
+            # Stage the validated file for the import worker; only its path goes into the session
+            from web.import_jobs import stage_import_file
+            _discard_unconfirmed_import(request)
             request.session['import_data'] = {
-                'data': data,
+                'file_path': stage_import_file(raw_content, file_extension),
+                'file_format': file_extension,
+                'records_total': 1 + len(data.get('item_types', [])) + len(data.get('collections', [])) + total_items,
                 'target_user_id': target_user_id,
                 'download_images': download_images,
+                'upsert': upsert,
+                'delete_missing': delete_missing,
                 'file_name': import_file.name
             }
             
-            # Calculate total items for display
-            total_items = sum(len(collection.get('items', [])) for collection in data.get('collections', []))
-            
             # Show preview/confirmation page
             context.update({
                 'import_data': data,
                 'target_user': target_user,
                 'download_images': download_images,
+                'upsert': upsert,
+                'delete_missing': delete_missing,
                 'file_name': import_file.name,
                 'ready_for_import': True,
                 'total_items': total_items
@@ -2385,96 +2328,139 @@ def sys_import_data(request):
     return render(request, 'sys/import_data.html', context)
 
 
+def _discard_unconfirmed_import(request):
+    """Delete the staged file of an upload that was validated but not confirmed"""
+    from web.import_jobs import delete_staged_file
+    
+    previous = request.session.pop('import_data', None)
+    if previous and previous.get('file_path'):
+        delete_staged_file(previous['file_path'])
+
+
+def _sys_import_jsonl(request, context, import_file, target_user, download_images, upsert=False, delete_missing=False):
+    """
+    Validate a JSON Lines import file as a stream and stage it in storage for the confirm step
+    (only the file path goes into the session, never the parsed records)
+    """
+    max_bytes = getattr(settings, 'IMPORT_JSONL_MAX_BYTES', 512 * 1024 * 1024)
+    if import_file.size > max_bytes:
+        messages.error(request, f"File size too large. Maximum {max_bytes // (1024 * 1024)}MB allowed")
+        return render(request, 'sys/import_data.html', context)
+    
+    from web.import_validator import ImportValidator
+    validator = ImportValidator()
+    summary, errors = validator.validate_jsonl_stream(import_file)
+    
+    if errors:
+        context['validation_errors'] = errors
+        context['error_report'] = validator.generate_validation_report(errors)
+        if summary['error_count'] > len(errors):
+            context['error_report'] += f"... and {summary['error_count'] - len(errors)} more error(s)\n"
+        messages.error(request, f"Import validation failed with {summary['error_count']} error(s)")
+        return render(request, 'sys/import_data.html', context)
+    
+    from web.import_jobs import stage_import_file
+    import_file.seek(0)
+    
+    _discard_unconfirmed_import(request)
+    request.session['import_data'] = {
+        'file_path': stage_import_file(import_file, 'jsonl'),
+        'file_format': 'jsonl',
+        'records_total': 1 + summary['item_type_count'] + summary['collection_count'] + summary['item_count'],
+        'target_user_id': str(target_user.id),
+        'download_images': download_images,
+        'upsert': upsert,
+        'delete_missing': delete_missing,
+        'file_name': import_file.name
+    }
+    
+    context.update({
+        'import_data': summary,
+        'target_user': target_user,
+        'download_images': download_images,
+        'upsert': upsert,
+        'delete_missing': delete_missing,
+        'file_name': import_file.name,
+        'ready_for_import': True,
+        'total_items': summary['item_count']
+    })
+    
+    messages.info(request, f"Import file validated successfully ({summary['lines']} lines). Review the data below and confirm to proceed.")
+    return render(request, 'sys/import_data.html', context)
+
+
 @application_admin_required
 @require_http_methods(["POST"])
 def sys_import_data_confirm(request):
-    """Process the confirmed import"""
+    """Queue the confirmed import as an ImportJob for the import worker"""
     # Get import data from session
     import_session_data = request.session.get('import_data')
-    if not import_session_data:
+    if not import_session_data or 'file_path' not in import_session_data:
         messages.error(request, "Import session expired. Please upload the file again.")
         return redirect('sys_import_data')
     
     try:
-        from web.import_processor import ImportProcessor
+        from web.import_jobs import enqueue_import
         
-        data = import_session_data['data']
-        target_user_id = import_session_data['target_user_id']
-        download_images = import_session_data['download_images']
-        file_name = import_session_data['file_name']
-        
-        # Get target user
-        target_user = User.objects.get(id=target_user_id)
-        
-        # Process the import
-        processor = ImportProcessor()
-        result = processor.process_import(
-            data=data,
+        target_user = User.objects.get(id=import_session_data['target_user_id'])
+        job = enqueue_import(
+            file_path=import_session_data['file_path'],
+            file_name=import_session_data['file_name'],
+            file_format=import_session_data.get('file_format', 'jsonl'),
             target_user=target_user,
-            download_images=download_images,
-            admin_user=request.user
+            admin_user=request.user,
+            download_images=import_session_data['download_images'],
+            records_total=import_session_data.get('records_total', 0),
+            mode='upsert' if import_session_data.get('upsert') else '',
+            delete_missing=import_session_data.get('delete_missing', False)
         )
         
         # Clear session data
         del request.session['import_data']
         
-        # Log the import
-        logger.info("Admin user '%s' [%s] imported data from '%s' for user '%s' [%s]: %d collections, %d items, %d errors", 
-                   request.user.username, request.user.id, file_name,
-                   target_user.username, target_user.id,
-                   result['collections_created'], result['items_created'], len(result['errors']))
+        logger.info("Admin user '%s' [%s] queued import of '%s' for user '%s' [%s] (job %s)", 
+                   request.user.username, request.user.id, job.file_name,
+                   target_user.username, target_user.id, job.pk)
         
-        if result['errors']:
-            messages.warning(request, f"Import completed with warnings. Created {result['collections_created']} collections and {result['items_created']} items. {len(result['errors'])} errors occurred.")
-        else:
-            messages.success(request, f"Import completed successfully! Created {result['collections_created']} collections and {result['items_created']} items.")
-        
-        # Store detailed results for display (convert datetime objects to strings)
-        serializable_result = result.copy()
-        if 'start_time' in serializable_result and serializable_result['start_time']:
-            serializable_result['start_time'] = serializable_result['start_time'].isoformat()
-        if 'end_time' in serializable_result and serializable_result['end_time']:
-            serializable_result['end_time'] = serializable_result['end_time'].isoformat()
-        request.session['import_result'] = serializable_result
-        return redirect('sys_import_result')
+        messages.success(request, f"Import of {job.file_name} queued. Progress is shown below.")
+        return redirect('sys_import_job', job_id=job.pk)
         
     except Exception as e:
-        logger.error("Import processing error for user %s: %s", request.user.username, str(e))
-        messages.error(request, f"Import processing failed: {str(e)}")
+        logger.error("Import queueing error for user %s: %s", request.user.username, str(e))
+        messages.error(request, f"Import could not be queued: {str(e)}")
         return redirect('sys_import_data')
 
 
 @application_admin_required
-def sys_import_result(request):
-    """Display import results"""
-    result = request.session.get('import_result')
-    if not result:
-        messages.info(request, "No import results to display.")
-        return redirect('sys_import_data')
-    
-    # Convert ISO datetime strings back to datetime objects for template rendering
-    from datetime import datetime
-    if 'start_time' in result and result['start_time']:
-        try:
-            result['start_time'] = datetime.fromisoformat(result['start_time'].replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
-            pass
-    if 'end_time' in result and result['end_time']:
-        try:
-            result['end_time'] = datetime.fromisoformat(result['end_time'].replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
-            pass
+def sys_import_result(request, job_id=None):
+    """Display the progress and results of an import job (the latest one if no id is given)"""
+    from web.models import ImportJob
+    
+    jobs = ImportJob.objects.select_related('target_user', 'admin_user')
+    if job_id is None:
+        job = jobs.first()
+        if job is None:
+            messages.info(request, "No import results to display.")
+            return redirect('sys_import_data')
+    else:
+        job = get_object_or_404(jobs, pk=job_id)
     
     context = {
-        'result': result
+        'job': job,
+        'recent_jobs': jobs.exclude(pk=job.pk)[:10],
     }
-    
-    # Clear the result from session after displaying
-    del request.session['import_result']
-    
     return render(request, 'sys/import_result.html', context)
 
 
+@application_admin_required
+def sys_import_job_progress(request, job_id):
+    """HTMX partial with the current state of an import job, polled while it is running"""
+    from web.models import ImportJob
+    
+    job = get_object_or_404(ImportJob.objects.select_related('target_user'), pk=job_id)
+    return render(request, 'partials/_import_job_progress.html', {'job': job})
+
+
 @application_admin_required
 @login_required
 def content_moderation_dashboard(request):
@@ -2517,6 +2503,10 @@ def content_moderation_dashboard(request):
         content_type__startswith='image/'
     ).values('content_moderation_status').annotate(count=models.Count('id')).order_by('-count')
     
+    # Moderation job queue (processed by run_moderation_worker)
+    from web.moderation_queue import queue_depth
+    moderation_queue = queue_depth()
+    
     context = {
         # Template expects these specific variable names
         'flagged_content_count': flagged_images,
@@ -2526,6 +2516,7 @@ def content_moderation_dashboard(request):
         'recent_flagged_content': recent_flagged,
         'recent_violations': high_violation_users,
         'status_stats': status_stats,
+        'moderation_queue': moderation_queue,
         
         # Additional stats for template
         'total_content': total_images,
@@ -2670,9 +2661,8 @@ def reject_flagged_image(request, file_id):
         affected_collections = list(media_file.collection_images.select_related('collection').values_list('collection__name', flat=True))
         affected_items = list(media_file.item_images.select_related('item').values_list('item__name', flat=True))
         
-        # Delete the file from storage
-        if default_storage.exists(file_path):
-            default_storage.delete(file_path)
+        # Delete the file from storage (a file shared with other MediaFiles is only released)
+        if media_file.delete_file():
             logger.info("Deleted file from storage: %s", file_path)
         
         # Delete the MediaFile record completely from database (CASCADE will automatically delete related records)
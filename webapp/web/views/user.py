@@ -105,6 +105,35 @@ def favorites_view(request):
     logger.debug("Rendering favorites for user '%s'.", request.user.username)
     return render(request, "user/favorites.html", context)
 
+@login_required
+@log_execution_time
+def search_items_view(request):
+    """
+    Full-text search across all items of the logged-in user's collections,
+    ranked by relevance. Cards are loaded in batches via HTMX.
+    """
+    from web.search import parse_search_terms, rank_items
+
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+
+    if parse_search_terms(query):
+        results = rank_items(CollectionItem.objects.filter(collection__created_by=request.user), query)
+        paginator = Paginator(results.values_list('hash', flat=True), 25)
+        page_obj = paginator.get_page(request.GET.get('page', 1))
+
+        logger.info('search_items_view: Search returned %d items for user %s [%s]',
+                    paginator.count, request.user.username, request.user.id,
+                    extra={'function': 'search_items_view', 'action': 'search',
+                           'result_count': paginator.count, 'function_args': {'page': page_obj.number}})
+
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'item_hashes': list(page_obj.object_list) if page_obj else [],
+    }
+    return render(request, 'user/search_results.html', context)
+
 @login_required
 @log_execution_time
 def recent_activity_view(request):
@@ -114,16 +143,18 @@ def recent_activity_view(request):
     logger.info("Recent activity view accessed by user: '%s' (ID: %s)", request.user.username, request.user.id)
 
     activity_list = RecentActivity.objects.filter(created_by=request.user).select_related('created_by')
-    paginator = Paginator(activity_list, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Task 46: Keyset pagination on (created, id) instead of OFFSET/COUNT
+    from web.pagination import CursorPaginator
+
+    page_obj = CursorPaginator(activity_list, 20, ('-created', '-id'), params=request.GET).page_from_request(request.GET)
+    cursor = request.GET.get('cursor', '')
 
     # Log activity view access
-    logger.info('recent_activity_view: Recent activity list accessed - page %s by user %s [%s]',
-               page_number, request.user.username, request.user.id,
-               extra={'function': 'recent_activity_view', 'action': 'activity_view', 
-                     'page': page_number, 'total_activities': activity_list.count(),
-                     'function_args': {'page': page_number}})
+    logger.info('recent_activity_view: Recent activity list accessed (%s) by user %s [%s]',
+               'next page' if cursor else 'first page', request.user.username, request.user.id,
+               extra={'function': 'recent_activity_view', 'action': 'activity_view',
+                     'cursor': cursor, 'activities_on_page': len(page_obj),
+                     'function_args': {'cursor': cursor}})
 
     context = {
         'page_obj': page_obj,
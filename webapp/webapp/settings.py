@@ -124,6 +124,15 @@ FEATURE_FLAGS = {
     # Newsletter subscription section on main page
     'SHOW_NEWSLETTER_SUBSCRIPTION': _get_feature_flag('SHOW_NEWSLETTER_SUBSCRIPTION', dev_default=False, prod_default=False),
     
+    # Rendered item card fragment cache (see web/card_cache.py)
+    'ITEM_CARD_CACHE': _get_feature_flag('ITEM_CARD_CACHE', dev_default=True, prod_default=True),
+    
+    # Resized WebP/JPEG image variants, generated in the background (see web/image_derivatives.py)
+    'IMAGE_DERIVATIVES': _get_feature_flag('IMAGE_DERIVATIVES', dev_default=True, prod_default=True),
+    
+    # Uploads with identical content share one stored file (see web/media_dedup.py)
+    'MEDIA_DEDUPLICATION': _get_feature_flag('MEDIA_DEDUPLICATION', dev_default=True, prod_default=True),
+    
     # Database backend: SQLite (dev) vs PostgreSQL (prod)
 }
 
@@ -146,9 +155,15 @@ CONTENT_MODERATION_ACTION = env(
     default='flag_only'  # Options: flag_only, delete, soft_ban, hard_ban
 )
 
+# Detector score above which an image is flagged (a change invalidates cached verdicts)
+CONTENT_MODERATION_THRESHOLD = env.float('CONTENT_MODERATION_THRESHOLD', default=0.6)
+
 # Soft ban threshold (number of violations before account is banned)
 CONTENT_MODERATION_SOFT_BAN_THRESHOLD = env.int('CONTENT_MODERATION_SOFT_BAN_THRESHOLD', default=3)
 
+# Moderation jobs (see web/moderation_queue.py) give up after this many failed attempts
+CONTENT_MODERATION_MAX_ATTEMPTS = env.int('CONTENT_MODERATION_MAX_ATTEMPTS', default=5)
+
 # CSRF configuration
 CSRF_TRUSTED_ORIGINS = env.list('CSRF_TRUSTED_ORIGINS', default=[])
 
@@ -263,6 +278,37 @@ CACHES = {
     }
 }
 
+# Item card fragment cache: entries are versioned, so the timeout only bounds memory use
+ITEM_CARD_CACHE_ENABLED = FEATURE_FLAGS['ITEM_CARD_CACHE']
+ITEM_CARD_CACHE_TIMEOUT = env.int('ITEM_CARD_CACHE_TIMEOUT', default=60 * 60 * 24)
+
+# Image derivatives: widths (px) of the resized variants served via srcset
+# (generated by `manage.py generate_image_derivatives --watch`)
+IMAGE_DERIVATIVES_ENABLED = FEATURE_FLAGS['IMAGE_DERIVATIVES']
+IMAGE_DERIVATIVE_WIDTHS = (160, 400, 800)
+
+# Seconds the "Verify All Files" admin request may spend checking storage (see web/media_verification.py)
+MEDIA_VERIFY_REQUEST_BUDGET = env.int('MEDIA_VERIFY_REQUEST_BUDGET', default=20)
+
+# Media deduplication by SHA-256 content hash
+MEDIA_DEDUPLICATION_ENABLED = FEATURE_FLAGS['MEDIA_DEDUPLICATION']
+
+# Images downloaded from a URL (upload form, importer) are aborted beyond this size
+IMAGE_DOWNLOAD_MAX_BYTES = env.int('IMAGE_DOWNLOAD_MAX_BYTES', default=5 * 1024 * 1024)
+
+# Importer image prefetch: concurrent downloads in total and per host (see web/image_prefetch.py)
+IMPORT_IMAGE_WORKERS = env.int('IMPORT_IMAGE_WORKERS', default=16)
+IMPORT_IMAGE_PER_HOST = env.int('IMPORT_IMAGE_PER_HOST', default=4)
+
+# Items inserted per transaction by the importer (see web/import_processor.py)
+IMPORT_CHUNK_SIZE = env.int('IMPORT_CHUNK_SIZE', default=500)
+
+# Largest JSON Lines import file accepted by the sys import page (JSON/YAML files stay limited to 10MB)
+IMPORT_JSONL_MAX_BYTES = env.int('IMPORT_JSONL_MAX_BYTES', default=512 * 1024 * 1024)
+
+# Runs of an import job (run_import_worker) before it is marked as failed; each run resumes from its last checkpoint
+IMPORT_JOB_MAX_ATTEMPTS = env.int('IMPORT_JOB_MAX_ATTEMPTS', default=3)
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 